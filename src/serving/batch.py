@@ -0,0 +1,274 @@
+"""Batch endpoint that runs many sub-requests through the application's routes in one HTTP call."""
+import asyncio
+import base64
+import inspect
+import json
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+from urllib.parse import unquote, urlencode
+
+from bevy import get_container
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message
+
+from serving.auth import CredentialProvider
+from serving.body import BODY_SCOPE_KEY
+from serving.config import ConfigModel
+from serving.forms import CSRF_TOKEN_PLACEHOLDER, FORM_SCOPE_KEY, CSRFConfig
+from serving.injectors import JSON_BODIES_SCOPE_KEY
+from serving.response import ServResponse
+from serving.router import matched_endpoint
+from serving.schema import ValidationError
+
+if TYPE_CHECKING:
+    from serving.serv import Serv
+
+# Scope key holding credential check results shared by the sub-requests of a batch
+CREDENTIAL_CHECKS_SCOPE_KEY = "serving.credential_checks"
+
+# Scope keys describing the batch request itself, which sub-requests must not inherit
+_REQUEST_SCOPE_KEYS = frozenset(
+    {
+        "endpoint", "path_params", "route", "router", "query_string", "state",
+        BODY_SCOPE_KEY, FORM_SCOPE_KEY, JSON_BODIES_SCOPE_KEY,
+    }
+)
+
+# Headers describing the batch request's own body, which never apply to a sub-request
+_BODY_HEADERS = frozenset({b"content-type", b"content-length", b"content-encoding", b"transfer-encoding"})
+_UNSAFE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+@dataclass
+class BatchConfig(ConfigModel, model_key="batch"):
+    """Configuration for the batch endpoint.
+
+    - path: Path of the batch endpoint, which only accepts POST. Disabled when None.
+    - max_requests: Maximum number of sub-requests in a single batch
+    - concurrency: Maximum number of sub-requests running at the same time
+    """
+    path: str | None = None
+    max_requests: int = 50
+    concurrency: int = 8
+
+
+class BatchHandler:
+    """Runs the sub-requests of a batch through the router in branches of the batch's container.
+
+    Sub-requests see the batch request's cookies and headers, share its session and reuse its
+    credential checks, but each gets its own `Request` and `ServResponse`.
+    """
+
+    def __init__(self, serv: "Serv", config: BatchConfig):
+        self.serv = serv
+        self.config = config
+
+    async def handle(self, request: Request) -> Response:
+        # Cross-site pages cannot send JSON without a CORS preflight, so sub-requests carrying
+        # the user's cookies are never forged from a simple form or text/plain post
+        media_type = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        if media_type != "application/json":
+            raise HTTPException(415, "Batch requests must be sent as application/json")
+
+        try:
+            items = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(400, "Batch body must be a JSON array of requests") from None
+
+        if not isinstance(items, list):
+            raise HTTPException(400, "Batch body must be a JSON array of requests")
+
+        if len(items) > self.config.max_requests:
+            raise HTTPException(413, f"Batches are limited to {self.config.max_requests} requests")
+
+        container = get_container()
+        if self.serv.session_type is not None and items:
+            # Load the session once in the batch's container so every sub-request shares it
+            session = container.call(self.serv.session_type.load_session)
+            if inspect.isawaitable(session):
+                session = await session
+            container.add(self.serv.session_type, session)
+
+        request.scope[CREDENTIAL_CHECKS_SCOPE_KEY] = {}
+        csrf_config = container.get(CSRFConfig)
+        late_bound = csrf_config is not None and csrf_config.late_bound
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+
+        async def run(item: Any) -> dict[str, Any]:
+            async with semaphore:
+                return await self._run(request, container, item, late_bound)
+
+        results = await asyncio.gather(*(run(item) for item in items))
+        return Response(self.serv.json_encoder.encode(results), media_type="application/json")
+
+    async def _run(self, request: Request, container, item: Any, late_bound: bool) -> dict[str, Any]:
+        try:
+            scope, body = self._build_scope(request, item)
+        except ValueError as exc:
+            return {"status": 400, "headers": {}, "body": str(exc)}
+
+        # The batch reply waits for every sub-request and is never cancelled by a disconnect, so
+        # streams that only end when their client leaves would run forever
+        if getattr(matched_endpoint(self.serv.app.router.routes, scope), "__streaming__", False):
+            return {"status": 400, "headers": {}, "body": "Streaming routes cannot be batched"}
+
+        # Sub-requests skip the middleware stack, and batches could otherwise smuggle form posts
+        # past the CSRF check, so unsafe sub-requests always need a valid X-CSRF-Token header
+        if scope["method"] in _UNSAFE_METHODS:
+            csrf_token = Request(scope).headers.get("x-csrf-token")
+            if csrf_token is None or not container.get(CredentialProvider).validate_csrf_token(csrf_token):
+                return {"status": 400, "headers": {}, "body": "Invalid CSRF token"}
+
+        with container.branch() as sub_container:
+            sub_request = Request(scope, receive=_receive_body(body))
+            sub_container.add(Request, sub_request)
+            sub_container.add(_response := ServResponse())
+            capture = _CapturedResponse()
+
+            _response.running_coroutine = asyncio.get_running_loop().create_task(
+                self._dispatch(self.serv.app.router, scope, sub_request.receive, capture.send)
+            )
+            try:
+                await _response.running_coroutine
+            except asyncio.CancelledError:
+                if _response.response_override is None:
+                    raise
+
+            if _response.response_override is not None:
+                capture = _CapturedResponse()
+                await _response.response_override(scope, sub_request.receive, capture.send)
+            else:
+                capture.headers.update({name.lower(): value for name, value in _response.headers.items()})
+                if _response.status_code is not None:
+                    capture.status = _response.status_code
+
+        if late_bound and capture.headers.get("content-type", "").startswith("text/html"):
+            # Sub-requests skip CSRFMiddleware, which fills in late-bound tokens for normal requests
+            capture.substitute(CSRF_TOKEN_PLACEHOLDER.encode(), container.get(CredentialProvider).generate_csrf_token)
+
+        return capture.result()
+
+    async def _dispatch(self, app: ASGIApp, scope: dict, receive, send) -> None:
+        try:
+            await app(scope, receive, send)
+        except HTTPException as exc:
+            await Response(exc.detail, status_code=exc.status_code, media_type="text/plain")(scope, receive, send)
+        except ValidationError as exc:
+            await Response(str(exc), status_code=422, media_type="text/plain")(scope, receive, send)
+        except Exception:
+            logging.getLogger("serving.app").error("Unhandled exception for batched %s", scope["path"], exc_info=True)
+            await Response("Internal Server Error", status_code=500, media_type="text/plain")(scope, receive, send)
+
+    def _build_scope(self, request: Request, item: Any) -> tuple[dict, bytes]:
+        if not isinstance(item, dict):
+            raise ValueError("Each batched request must be an object")
+
+        path = item.get("path")
+        if not isinstance(path, str) or not path.startswith("/"):
+            raise ValueError("Batched requests need a path starting with '/'")
+
+        raw_path, _, query_string = path.partition("?")
+        path = unquote(raw_path)
+        if path == self.config.path:
+            raise ValueError("Batches cannot be nested")
+
+        method = str(item.get("method", "GET")).upper()
+        query = item.get("query")
+        if isinstance(query, dict):
+            query_string = urlencode(query, doseq=True)
+        elif isinstance(query, str):
+            query_string = query
+
+        headers = [(name, value) for name, value in request.scope["headers"] if name not in _BODY_HEADERS]
+        extra_headers = item.get("headers") or {}
+        if not isinstance(extra_headers, dict):
+            raise ValueError("Batched request headers must be an object")
+
+        for name, value in extra_headers.items():
+            encoded = name.lower().encode("latin-1")
+            headers = [header for header in headers if header[0] != encoded]
+            headers.append((encoded, str(value).encode("latin-1")))
+
+        body = item.get("body")
+        match body:
+            case None:
+                body = b""
+            case str():
+                body = body.encode()
+            case _:
+                body = json.dumps(body, separators=(",", ":")).encode()
+                if not any(name == b"content-type" for name, _ in headers):
+                    headers.append((b"content-type", b"application/json"))
+
+        headers.append((b"content-length", str(len(body)).encode()))
+        scope = {
+            key: value
+            for key, value in request.scope.items()
+            if key not in _REQUEST_SCOPE_KEYS
+        }
+        scope.update(
+            method=method,
+            path=path,
+            raw_path=raw_path.encode(),
+            query_string=query_string.encode(),
+            headers=headers,
+            state=dict(request.scope.get("state") or {}),
+        )
+        return scope, body
+
+
+class _CapturedResponse:
+    def __init__(self):
+        self.status = 500
+        self.headers: dict[str, str] = {}
+        self.body = bytearray()
+
+    async def send(self, message: Message) -> None:
+        match message["type"]:
+            case "http.response.start":
+                self.status = message["status"]
+                for name, value in message.get("headers", []):
+                    self.headers[name.decode("latin-1")] = value.decode("latin-1")
+            case "http.response.body":
+                self.body += message.get("body", b"")
+
+    def substitute(self, placeholder: bytes, generate_token) -> None:
+        if placeholder in self.body:
+            self.body = bytearray(self.body.replace(placeholder, generate_token().encode()))
+
+    def result(self) -> dict[str, Any]:
+        self.headers.pop("content-length", None)
+        result: dict[str, Any] = {"status": self.status, "headers": self.headers}
+        media_type = self.headers.get("content-type", "").split(";", 1)[0].strip()
+        if media_type == "application/json" or media_type.endswith("+json"):
+            try:
+                result["body"] = json.loads(self.body) if self.body else None
+                return result
+            except ValueError:
+                pass
+
+        try:
+            result["body"] = self.body.decode()
+        except UnicodeDecodeError:
+            result["body"] = base64.b64encode(self.body).decode()
+            result["encoding"] = "base64"
+
+        return result
+
+
+def _receive_body(body: bytes):
+    sent = False
+
+    async def receive() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        # Sub-requests are never disconnected, responses end when they are complete
+        await asyncio.Event().wait()
+
+    return receive
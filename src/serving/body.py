@@ -0,0 +1,117 @@
+"""Reading request bodies without holding more of them in memory than needed."""
+import hashlib
+import os
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import anyio
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+
+# Scope key holding the request body once it has been read in full, so every `Request` built on
+# the same scope shares it
+BODY_SCOPE_KEY = "serving.body"
+
+
+class BodyStream:
+    """The request body as an async iterator of chunks, read from the client as it is consumed.
+
+    Nothing is buffered, so uploads of any size can be hashed or written to disk in constant
+    memory. The body can only be iterated once, and bodies larger than max_size bytes are
+    rejected with a 413 part way through.
+
+    Raises:
+        HTTPException: 413 once more than max_size bytes have been received
+    """
+
+    def __init__(self, request: Request, max_size: int | None = None):
+        self.request = request
+        self.max_size = max_size
+        self.size = 0
+
+    @classmethod
+    def from_request(cls, request: Request, max_size: int | None = None) -> "BodyStream":
+        """Create a stream, rejecting the request up front when its Content-Length is too large."""
+        check_content_length(request, max_size)
+        return cls(request, max_size)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.request.stream():
+            if not chunk:
+                continue
+
+            self.size += len(chunk)
+            if self.max_size is not None and self.size > self.max_size:
+                raise _too_large(self.max_size)
+
+            yield chunk
+
+    async def hash(self, algorithm: str = "sha256") -> str:
+        """Consume the body, returning the hex digest of the named hashlib algorithm."""
+        digest = hashlib.new(algorithm)
+        async for chunk in self:
+            digest.update(chunk)
+
+        return digest.hexdigest()
+
+    async def save_to(self, path: str | os.PathLike[str]) -> int:
+        """Consume the body, writing it to path and returning the number of bytes written.
+
+        A partially written file is removed when the upload fails or is too large.
+        """
+        path = Path(path)
+        try:
+            async with await anyio.open_file(path, "wb") as file:
+                async for chunk in self:
+                    await file.write(chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+
+        return self.size
+
+
+def check_content_length(request: Request, max_size: int | None) -> None:
+    """Reject the request with a 413 when its declared Content-Length is above max_size.
+
+    Raises:
+        HTTPException: 400 for an invalid Content-Length, 413 when it is too large
+    """
+    if max_size is None:
+        return
+
+    try:
+        declared_size = int(request.headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPException(400, "Invalid Content-Length header") from None
+
+    if declared_size > max_size:
+        raise _too_large(max_size)
+
+
+async def read_limited_body(request: Request, max_size: int | None) -> bytes:
+    """Read the request body, rejecting it with a 413 once it is larger than max_size bytes.
+
+    The declared Content-Length is checked before anything is read and the streamed size while
+    reading, so clients that send no length or a wrong one are still cut off. The body is kept
+    on the request and its scope so later calls to `request.body()` and later reads through other
+    `Request` objects for the same request return it.
+    """
+    cached = request.scope.get(BODY_SCOPE_KEY)
+    if cached is not None:
+        request._body = cached
+
+    if hasattr(request, "_body") or max_size is None:
+        body = await request.body()
+        if max_size is not None and len(body) > max_size:
+            raise _too_large(max_size)
+    else:
+        stream = BodyStream.from_request(request, max_size)
+        body = request._body = b"".join([chunk async for chunk in stream])
+
+    request.scope[BODY_SCOPE_KEY] = body
+    return body
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(413, f"Request body is larger than {max_size} bytes")
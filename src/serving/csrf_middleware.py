@@ -1,3 +1,5 @@
+from collections.abc import AsyncIterator, Callable
+
 from bevy import Inject, auto_inject, injectable
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
@@ -5,9 +7,23 @@ from starlette.responses import PlainTextResponse
 from starlette.status import HTTP_400_BAD_REQUEST
 
 from serving.auth import CredentialProvider
+from serving.forms import (
+    CSRF_TOKEN_PLACEHOLDER,
+    CSRFConfig,
+    CSRFProtection,
+    read_request_form,
+)
+from serving.router import matched_endpoint
 
 
 class CSRFMiddleware(BaseHTTPMiddleware):
+    """Rejects unsafe requests with a forged CSRF token before any endpoint work is done.
+
+    A token sent in the X-CSRF-Token header is always checked. Without one, requests to endpoints
+    taking a CSRF protected `Form` have their form body parsed here, once, and checked against its
+    csrf_token field; the endpoint's forms then reuse that parse.
+    """
+
     @auto_inject
     @injectable
     async def dispatch(
@@ -15,16 +31,63 @@ class CSRFMiddleware(BaseHTTPMiddleware):
         request: Request,
         call_next,
         credential_provider: Inject[CredentialProvider],
+        csrf_config: Inject[CSRFConfig] = None,
     ):
         if request.method in {"POST", "PUT", "PATCH", "DELETE"}:
-            # Avoid consuming the request body here to prevent stream reuse issues.
-            # If a CSRF token is provided via header, validate it preemptively.
             header_token = request.headers.get("x-csrf-token")
             if header_token is not None:
                 if not credential_provider.validate_csrf_token(header_token):
                     return PlainTextResponse(
                         "Invalid CSRF token", status_code=HTTP_400_BAD_REQUEST
                     )
-            # Otherwise, allow downstream handlers (e.g., Form.from_request) to validate
-            # CSRF from the form body without the stream being consumed twice.
-        return await call_next(request)
+            else:
+                # Only bodies an endpoint will parse as a form are read here, so raw body
+                # endpoints still receive an untouched stream
+                endpoint = matched_endpoint(request.app.router.routes, request.scope)
+                form_types = getattr(endpoint, "__form_types__", ())
+                if any(form_type.__form_options__["csrf"] is CSRFProtection.Enabled for form_type in form_types):
+                    form = await read_request_form(request, form_types)
+                    token = form.get("csrf_token")
+                    if not token or not credential_provider.validate_csrf_token(token):
+                        return PlainTextResponse(
+                            "Invalid CSRF token", status_code=HTTP_400_BAD_REQUEST
+                        )
+
+        response = await call_next(request)
+        if csrf_config is not None and csrf_config.late_bound:
+            content_type = response.headers.get("content-type", "")
+            if content_type.startswith("text/html"):
+                # The substituted token rarely matches the placeholder's length
+                del response.headers["content-length"]
+                response.body_iterator = substitute_csrf_placeholder(
+                    response.body_iterator, credential_provider.generate_csrf_token
+                )
+
+        return response
+
+
+async def substitute_csrf_placeholder(
+    body: AsyncIterator[bytes], generate_token: Callable[[], str]
+) -> AsyncIterator[bytes]:
+    """Replace the late-bound CSRF placeholder in a response body with a freshly generated token.
+
+    A single token is generated per response, and only if the placeholder is present. The tail of
+    each chunk is held back so placeholders split across chunk boundaries are still replaced.
+    """
+    placeholder = CSRF_TOKEN_PLACEHOLDER.encode()
+    keep = len(placeholder) - 1
+    token = None
+    pending = b""
+    async for chunk in body:
+        pending += chunk
+        if placeholder in pending:
+            if token is None:
+                token = generate_token().encode()
+            pending = pending.replace(placeholder, token)
+
+        if len(pending) > keep:
+            yield pending[:-keep]
+            pending = pending[-keep:]
+
+    if pending:
+        yield pending
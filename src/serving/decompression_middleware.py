@@ -0,0 +1,146 @@
+"""Transparent decompression of request bodies sent with a Content-Encoding."""
+import zlib
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from serving.config import ConfigModel
+
+try:
+    from compression import zstd as _zstd
+except ImportError:
+    _zstd = None
+    _DECODE_ERRORS = (zlib.error, ValueError)
+else:
+    _DECODE_ERRORS = (zlib.error, ValueError, _zstd.ZstdError)
+
+# Bodies that decompress to less than this are never rejected for their compression ratio
+_RATIO_GRACE_SIZE = 64 * 1024
+
+
+@dataclass
+class DecompressionConfig(ConfigModel, model_key="decompression"):
+    """Limits applied while decompressing request bodies.
+
+    - enabled: Decompress gzip, deflate and (on Python 3.14+) zstd request bodies, other
+      encodings are rejected with 415. When disabled, bodies reach endpoints as sent.
+    - max_size: Largest decompressed body in bytes, larger bodies are rejected with 413
+    - max_ratio: Largest ratio of decompressed to compressed size, higher ratios are rejected
+      with 413 once the body is larger than 64 KiB. Unlimited when None.
+    """
+    enabled: bool = True
+    max_size: int | None = 64 * 1024 * 1024
+    max_ratio: int | None = 100
+
+
+class _ZlibDecoder:
+    def __init__(self, wbits: int):
+        self._decompressor = zlib.decompressobj(wbits)
+
+    def decompress(self, data: bytes, max_length: int | None) -> bytes:
+        return self._decompressor.decompress(data, max_length or 0)
+
+    @property
+    def finished(self) -> bool:
+        return self._decompressor.eof
+
+
+class _ZstdDecoder:
+    def __init__(self):
+        self._decompressor = _zstd.ZstdDecompressor()
+
+    def decompress(self, data: bytes, max_length: int | None) -> bytes:
+        return self._decompressor.decompress(data, max_length or -1)
+
+    @property
+    def finished(self) -> bool:
+        return self._decompressor.eof
+
+
+# Deflate is the zlib format, as RFC 9110 specifies
+_DECODERS: dict[str, Callable[[], _ZlibDecoder | _ZstdDecoder]] = {
+    "gzip": lambda: _ZlibDecoder(16 + zlib.MAX_WBITS),
+    "x-gzip": lambda: _ZlibDecoder(16 + zlib.MAX_WBITS),
+    "deflate": lambda: _ZlibDecoder(zlib.MAX_WBITS),
+}
+if _zstd is not None:
+    _DECODERS["zstd"] = _ZstdDecoder
+
+
+class DecompressionMiddleware:
+    """Decompresses request bodies as they are received, before any endpoint or injector reads them.
+
+    The Content-Encoding and Content-Length headers are removed from the request, so everything
+    downstream sees a plain body and applies its own size limits to the decompressed bytes.
+    """
+
+    def __init__(self, app: ASGIApp, config: DecompressionConfig):
+        self.app = app
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.config.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = None
+        headers = []
+        for name, value in scope["headers"]:
+            if name == b"content-encoding":
+                encoding = value.decode("latin-1").strip().lower()
+            elif name != b"content-length":
+                headers.append((name, value))
+
+        if encoding is None or encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        create_decoder = _DECODERS.get(encoding)
+        if create_decoder is None:
+            raise HTTPException(415, f"Unsupported Content-Encoding: {encoding}")
+
+        decoded = _DecodedBody(receive, create_decoder(), self.config)
+        await self.app({**scope, "headers": headers}, decoded.receive, send)
+
+
+class _DecodedBody:
+    def __init__(self, receive: Receive, decoder: _ZlibDecoder | _ZstdDecoder, config: DecompressionConfig):
+        self._receive = receive
+        self._decoder = decoder
+        self._config = config
+        self._compressed_size = 0
+        self._size = 0
+
+    async def receive(self) -> Message:
+        message = await self._receive()
+        if message["type"] != "http.request":
+            return message
+
+        chunk = message.get("body", b"")
+        self._compressed_size += len(chunk)
+        allowed = self._allowed_size()
+        try:
+            # Never inflate more than one byte past the limit, however far the input would expand
+            body = self._decoder.decompress(chunk, None if allowed is None else allowed - self._size + 1)
+        except _DECODE_ERRORS as exc:
+            raise HTTPException(400, f"Malformed compressed request body: {exc}") from None
+
+        self._size += len(body)
+        if allowed is not None and self._size > allowed:
+            raise HTTPException(413, "Decompressed request body is too large")
+
+        if not message.get("more_body", False) and not self._decoder.finished:
+            raise HTTPException(400, "Compressed request body is truncated")
+
+        return {**message, "body": body}
+
+    def _allowed_size(self) -> int | None:
+        limits = []
+        if self._config.max_size is not None:
+            limits.append(self._config.max_size)
+        if self._config.max_ratio is not None:
+            limits.append(max(_RATIO_GRACE_SIZE, self._compressed_size * self._config.max_ratio))
+
+        return min(limits, default=None)
@@ -0,0 +1,189 @@
+"""JSON encoding for route responses."""
+import importlib
+import json
+import logging
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from starlette.concurrency import run_in_threadpool
+
+from serving.config import ConfigModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+@dataclass
+class JSONConfig(ConfigModel, model_key="json"):
+    """Configuration for JSON responses.
+
+    - stream_batch_size: Number of records from `JSONStream` routes encoded into each chunk
+    - encoder: "json" for the standard library, "orjson" to use orjson when it is installed, or
+      a "module:callable" path to any function that takes a value and returns `bytes` or `str`
+    - offload_threshold: Approximate number of values in a payload above which it is encoded in
+      a worker thread instead of on the event loop
+    - msgpack: Send `JSON` route results as MessagePack to clients that prefer it in `Accept`
+    - max_body_size: Largest `JSONBody` request body in bytes, larger bodies are rejected with 413
+    - body_offload_size: Request bodies larger than this many bytes are decoded in a worker thread
+    """
+    stream_batch_size: int = 100
+    encoder: str = "json"
+    offload_threshold: int = 5000
+    msgpack: bool = True
+    max_body_size: int = 1_048_576
+    body_offload_size: int = 65_536
+
+
+def encode_json(value: Any) -> bytes:
+    """Encode a value as compact UTF-8 JSON, matching Starlette's `JSONResponse` output."""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def _orjson_encoder() -> Callable[[Any], bytes]:
+    import orjson
+
+    return orjson.dumps
+
+
+_BUILTIN_ENCODERS: dict[str, Callable[[], Callable[[Any], bytes]]] = {
+    "json": lambda: encode_json,
+    "orjson": _orjson_encoder,
+}
+
+
+def load_encoder(name: str) -> Callable[[Any], bytes]:
+    """Resolve an encoder name from `JSONConfig.encoder` to an encoding function.
+
+    Encoders that cannot be imported fall back to the standard library with a warning so a
+    missing optional package never prevents the app from starting.
+    """
+    try:
+        if name in _BUILTIN_ENCODERS:
+            return _BUILTIN_ENCODERS[name]()
+
+        module_name, _, attr = name.partition(":")
+        encode = getattr(importlib.import_module(module_name), attr)
+    except (ImportError, AttributeError, ValueError):
+        logging.getLogger("serving.encoding").warning(
+            "JSON encoder %r is not available, falling back to the standard library json module", name
+        )
+        return encode_json
+
+    def encode_to_bytes(value: Any) -> bytes:
+        result = encode(value)
+        return result.encode() if isinstance(result, str) else result
+
+    return encode_to_bytes
+
+
+def exceeds_size(value: Any, budget: int) -> bool:
+    """Cheaply estimate whether a payload holds more than `budget` values.
+
+    Containers are walked only until the budget runs out, so the check costs at most `budget`
+    steps no matter how large the payload is. Long strings count in proportion to their length.
+    """
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        budget -= 1
+        match item:
+            case dict():
+                if len(item) > budget:
+                    return True
+                stack.extend(item.values())
+            case list() | tuple():
+                if len(item) > budget:
+                    return True
+                stack.extend(item)
+            case str():
+                budget -= len(item) // 64
+
+        if budget < 0:
+            return True
+
+    return False
+
+
+class JSONEncoder:
+    """Encodes JSON route results with the configured encoder, offloading large payloads."""
+
+    def __init__(self, encode: Callable[[Any], bytes] = encode_json, offload_threshold: int = 5000):
+        self.encode = encode
+        self.offload_threshold = offload_threshold
+
+    @classmethod
+    def from_config(cls, config: JSONConfig) -> "JSONEncoder":
+        return cls(load_encoder(config.encoder), config.offload_threshold)
+
+    async def encode_async(
+        self,
+        value: Any,
+        convert: Callable[[Any], Any] | None = None,
+        encode: Callable[[Any], bytes] | None = None,
+    ) -> bytes:
+        """Encode on the event loop when small, in the threadpool when large enough to stall it.
+
+        `convert` turns the value into JSON builtins first (see `serving.schema.compile_encoder`)
+        and runs on the same side of the threadpool as the encoding. `encode` replaces the
+        configured encoder, e.g. with `serving.msgpack_codec.encode_msgpack`.
+        """
+        if exceeds_size(value, self.offload_threshold):
+            return await run_in_threadpool(self._encode, value, convert, encode or self.encode)
+
+        return self._encode(value, convert, encode or self.encode)
+
+    @staticmethod
+    def _encode(value: Any, convert: Callable[[Any], Any] | None, encode: Callable[[Any], bytes]) -> bytes:
+        return encode(value if convert is None else convert(value))
+
+
+def wants_json_array(accept: str | None) -> bool:
+    """Whether a streamed collection should be sent as a JSON array rather than NDJSON.
+
+    NDJSON is the default; clients get an array only when they accept `application/json` and do
+    not also accept NDJSON.
+    """
+    if not accept:
+        return False
+
+    media_types = {part.split(";", 1)[0].strip().lower() for part in accept.split(",")}
+    if media_types & {NDJSON_MEDIA_TYPE, "application/jsonl", "application/x-jsonlines"}:
+        return False
+
+    return "application/json" in media_types
+
+
+async def encode_json_stream(
+    records: AsyncIterator[Any],
+    *,
+    as_array: bool = False,
+    batch_size: int = 100,
+    encode: Callable[[Any], bytes] = encode_json,
+) -> AsyncIterator[bytes]:
+    """Incrementally encode records as NDJSON lines or as the items of a JSON array.
+
+    Records are encoded as they arrive and sent in batches of `batch_size`, so the collection is
+    never held in memory, neither as objects nor as one large string.
+    """
+    separator = b"," if as_array else b"\n"
+    # The opening bracket is sent with the first batch so the endpoint runs before the
+    # response starts, the same as for NDJSON
+    prefix = b"[" if as_array else b""
+    batch: list[bytes] = []
+    async for record in records:
+        batch.append(encode(record))
+        if len(batch) >= batch_size:
+            yield _join_batch(prefix, batch, separator, as_array)
+            if as_array:
+                prefix = separator
+            batch.clear()
+
+    if as_array:
+        yield (_join_batch(prefix, batch, separator, as_array) if batch or prefix == b"[" else b"") + b"]"
+    elif batch:
+        yield _join_batch(prefix, batch, separator, as_array)
+
+
+def _join_batch(prefix: bytes, batch: list[bytes], separator: bytes, as_array: bool) -> bytes:
+    # Array items are separated from the previous batch by the prefix, NDJSON lines are terminated
+    return prefix + separator.join(batch) + (b"" if as_array else separator)
@@ -1,26 +1,34 @@
 """Error handler with theming support."""
+import gzip
+from collections import OrderedDict
 from pathlib import Path
 
 from starlette.responses import HTMLResponse
-from starlette.templating import Jinja2Templates
+
+from serving.templating import create_templates
 
 
 class ErrorHandler:
     """Handles errors with themed templates."""
     
-    def __init__(self, theming_config=None, templates=None):
+    def __init__(self, theming_config=None, templates=None, cache_size: int = 0):
         """Initialize error handler with theming configuration.
         
         Args:
             theming_config: ThemingConfig object with error template settings
             templates: Jinja2Templates instance for custom templates
+            cache_size: Number of rendered error pages without details to keep, 0 to disable
         """
         self.theming_config = theming_config
         self.custom_templates = templates
+        self.cache_size = cache_size
+        self._pages: OrderedDict[tuple, tuple[bytes, bytes]] = OrderedDict()
         
-        # Setup fallback templates
+        # Setup fallback templates. They ship with the package and never change at runtime,
+        # so skip reload checks and compile the error page up front.
         fallback_dir = Path(__file__).parent / "templates"
-        self.fallback_templates = Jinja2Templates(directory=str(fallback_dir))
+        self.fallback_templates = create_templates(fallback_dir, auto_reload=False)
+        self.fallback_templates.get_template("error.html")
     
     def render_error(self, request, error_code: int, error_message: str = None, details: str = None) -> HTMLResponse:
         """Render an error page using the appropriate template.
@@ -45,29 +53,22 @@ class ErrorHandler:
             "details": details,
         }
         
+        template_path = self._custom_template_path(error_code)
+        if details is None and self._can_cache(template_path):
+            return self._render_cached(request, error_code, error_message, template_path, context)
+
         # Try to use custom template if configured
-        if self.theming_config and self.custom_templates:
-            template_path = None
-            
-            # Check for specific error code template
-            if self.theming_config.error_templates:
-                template_path = self.theming_config.error_templates.get(str(error_code))
-            
-            # Fall back to default error template if configured
-            if not template_path and self.theming_config.default_error_template:
-                template_path = self.theming_config.default_error_template
-            
-            if template_path:
-                try:
-                    return self.custom_templates.TemplateResponse(
-                        request=request,
-                        name=template_path,
-                        context=context,
-                        status_code=error_code,
-                    )
-                except Exception:
-                    # If custom template fails, fall back to built-in
-                    pass
+        if template_path:
+            try:
+                return self.custom_templates.TemplateResponse(
+                    request=request,
+                    name=template_path,
+                    context=context,
+                    status_code=error_code,
+                )
+            except Exception:
+                # If custom template fails, fall back to built-in
+                pass
         
         # Use fallback template
         return self.fallback_templates.TemplateResponse(
@@ -76,6 +77,69 @@ class ErrorHandler:
             context=context,
             status_code=error_code,
         )
+
+    def _custom_template_path(self, error_code: int) -> str | None:
+        """Find the configured custom template for an error code, if any."""
+        if not (self.theming_config and self.custom_templates):
+            return None
+
+        template_path = None
+
+        # Check for specific error code template
+        if self.theming_config.error_templates:
+            template_path = self.theming_config.error_templates.get(str(error_code))
+
+        # Fall back to default error template if configured
+        if not template_path and self.theming_config.default_error_template:
+            template_path = self.theming_config.default_error_template
+
+        return template_path
+
+    def _can_cache(self, template_path: str | None) -> bool:
+        if self.cache_size <= 0:
+            return False
+
+        if template_path is None:
+            return True
+
+        # Themes can show the request path or user data, so their pages are only reused when the
+        # theme opts in. Context processors can add per-request data, so their output never is.
+        return self.theming_config.cache_custom_error_pages and not self.custom_templates.context_processors
+
+    def _render_cached(self, request, error_code: int, error_message: str, template_path, context) -> HTMLResponse:
+        """Serve an error page without details from the cache, rendering it on the first request.
+
+        Pages are keyed by everything they depend on. The base URL is part of the key because
+        templates may build absolute URLs from the request. A gzip variant is stored alongside
+        each page and sent to clients that accept it.
+        """
+        key = (error_code, error_message, template_path, str(request.base_url))
+        page = self._pages.get(key)
+        if page is None:
+            body = self._render_body(template_path, context).encode()
+            page = self._pages[key] = (body, gzip.compress(body, mtime=0))
+            while len(self._pages) > self.cache_size:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(key)
+
+        body, compressed = page
+        headers = {"Vary": "Accept-Encoding"}
+        if _accepts_gzip(request.headers.get("accept-encoding")) and len(compressed) < len(body):
+            headers["Content-Encoding"] = "gzip"
+            body = compressed
+
+        return HTMLResponse(body, status_code=error_code, headers=headers)
+
+    def _render_body(self, template_path: str | None, context: dict) -> str:
+        if template_path:
+            try:
+                return self.custom_templates.get_template(template_path).render(context)
+            except Exception:
+                # If custom template fails, fall back to built-in
+                pass
+
+        return self.fallback_templates.get_template("error.html").render(context)
     
     def _get_default_message(self, error_code: int) -> str:
         """Get default error message for a given error code."""
@@ -94,6 +158,7 @@ class ErrorHandler:
             418: "I'm a teapot",
             422: "Unprocessable Entity",
             429: "Too Many Requests",
+            431: "Request Header Fields Too Large",
             500: "Internal Server Error",
             501: "Not Implemented",
             502: "Bad Gateway",
@@ -102,3 +167,12 @@ class ErrorHandler:
             505: "HTTP Version Not Supported",
         }
         return messages.get(error_code, "Error")
+
+
+def _accepts_gzip(accept_encoding: str | None) -> bool:
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+
+    return False
@@ -8,6 +8,8 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
 
+from serving.schema import ValidationError
+
 
 class ExceptionMiddleware(BaseHTTPMiddleware):
     """Middleware that handles exceptions and renders themed error pages."""
@@ -98,6 +100,14 @@ class ExceptionMiddleware(BaseHTTPMiddleware):
                 details=None
             )
             
+        except ValidationError as exc:
+            # Invalid input is the client's problem, tell them which fields to fix
+            return self.serv.error_handler.render_error(
+                request,
+                error_code=422,
+                details=str(exc),
+            )
+
         except Exception as exc:
             # Handle general exceptions as 500 errors; log stacktraces in all environments
             logging.getLogger('serving.app').error(
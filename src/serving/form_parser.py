@@ -0,0 +1,187 @@
+"""Form body parsing with size limits that only keeps the fields a form declares."""
+from collections.abc import AsyncIterator, Collection
+from dataclasses import dataclass
+from urllib.parse import unquote_plus
+
+import python_multipart
+from starlette.datastructures import FormData, UploadFile
+from starlette.exceptions import HTTPException
+from starlette.formparsers import MultiPartException, MultiPartParser
+from starlette.requests import Request
+
+from serving.body import BodyStream
+from serving.config import ConfigModel
+
+
+@dataclass
+class FormsConfig(ConfigModel, model_key="forms"):
+    """Limits applied when parsing form bodies, which individual `Form` classes can override.
+
+    - max_body_size: Largest form body in bytes, larger bodies are rejected with 413
+    - max_fields: Maximum number of non-file fields
+    - max_files: Maximum number of uploaded files
+    - max_part_size: Largest value of a single non-file field in bytes
+    - max_file_size: Largest single uploaded file in bytes, unlimited when None
+    - spool_size: Uploaded files larger than this many bytes are moved from memory to a temporary file
+    """
+    max_body_size: int | None = 10 * 1024 * 1024
+    max_fields: int = 1000
+    max_files: int = 100
+    max_part_size: int = 1024 * 1024
+    max_file_size: int | None = None
+    spool_size: int = 1024 * 1024
+
+
+class FormTooLargeError(MultiPartException):
+    """Raised while parsing when the form breaks one of its size or count limits."""
+
+
+async def parse_form(request: Request, config: FormsConfig, fields: Collection[str] | None = None) -> FormData:
+    """Parse a urlencoded or multipart request body within the configured limits.
+
+    Values of fields not named in fields are skipped as they stream past rather than stored,
+    all fields are kept when fields is None. Other content types give an empty form.
+
+    Raises:
+        HTTPException: 413 when a limit is exceeded, 400 when the body is malformed
+    """
+    media_type = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    if media_type not in ("multipart/form-data", "application/x-www-form-urlencoded"):
+        return FormData()
+
+    stream = BodyStream.from_request(request, config.max_body_size)
+    try:
+        if media_type == "multipart/form-data":
+            return await _MultiPartParser(request.headers, aiter(stream), config, fields).parse()
+
+        return await _UrlencodedParser(config, fields).parse(aiter(stream))
+    except FormTooLargeError as exc:
+        raise HTTPException(413, exc.message) from None
+    except MultiPartException as exc:
+        raise HTTPException(400, exc.message) from None
+
+
+class _MultiPartParser(MultiPartParser):
+    """Starlette's multipart parser with file size limits, a spool size and field filtering."""
+
+    def __init__(self, headers, stream, config: FormsConfig, fields: Collection[str] | None):
+        super().__init__(
+            headers,
+            stream,
+            max_files=config.max_files,
+            max_fields=config.max_fields,
+            max_part_size=config.max_part_size,
+        )
+        self.spool_max_size = config.spool_size
+        self.max_file_size = config.max_file_size
+        self.fields = fields
+        self._skipping = False
+        self._file_size = 0
+
+    def on_part_begin(self) -> None:
+        super().on_part_begin()
+        self._skipping = False
+        self._file_size = 0
+
+    def on_headers_finished(self) -> None:
+        try:
+            super().on_headers_finished()
+        except MultiPartException as exc:
+            if exc.message.startswith("Too many"):
+                raise FormTooLargeError(exc.message) from None
+            raise
+
+        if self.fields is not None and self._current_part.field_name not in self.fields:
+            self._skipping = True
+            if self._current_part.file is not None:
+                self._files_to_close_on_error.pop().close()
+                self._current_part.file = None
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._skipping:
+            return
+
+        size = end - start
+        if self._current_part.file is None:
+            if len(self._current_part.data) + size > self.max_part_size:
+                raise FormTooLargeError(f"Field exceeded the maximum size of {self.max_part_size} bytes")
+            self._current_part.data.extend(data[start:end])
+            return
+
+        self._file_size += size
+        if self.max_file_size is not None and self._file_size > self.max_file_size:
+            raise FormTooLargeError(f"File exceeded the maximum size of {self.max_file_size} bytes")
+        self._file_parts_to_write.append((self._current_part, data[start:end]))
+
+    def on_part_end(self) -> None:
+        if not self._skipping:
+            super().on_part_end()
+
+    async def parse(self) -> FormData:
+        try:
+            return await super().parse()
+        except HTTPException:
+            # The body limit is enforced while streaming, close any spooled uploads
+            for file in self._files_to_close_on_error:
+                file.close()
+            raise
+
+
+class _UrlencodedParser:
+    """Incremental urlencoded parsing that drops undeclared fields as soon as their name is known."""
+
+    def __init__(self, config: FormsConfig, fields: Collection[str] | None):
+        self.config = config
+        self.fields = fields
+        self.items: list[tuple[str, str | UploadFile]] = []
+        self._count = 0
+        self._name = bytearray()
+        self._value = bytearray()
+        self._keep: bool | None = None
+
+    def on_field_start(self) -> None:
+        self._count += 1
+        if self._count > self.config.max_fields:
+            raise FormTooLargeError(f"Too many fields. Maximum number of fields is {self.config.max_fields}.")
+
+        self._name.clear()
+        self._value.clear()
+        self._keep = None
+
+    def on_field_name(self, data: bytes, start: int, end: int) -> None:
+        self._name += data[start:end]
+        if len(self._name) > self.config.max_part_size:
+            raise FormTooLargeError(f"Field exceeded the maximum size of {self.config.max_part_size} bytes")
+
+    def on_field_data(self, data: bytes, start: int, end: int) -> None:
+        if self._keep is None:
+            # Names always arrive in full before any of their value
+            self._keep = self.fields is None or self._decoded_name() in self.fields
+
+        if self._keep:
+            self._value += data[start:end]
+            if len(self._value) > self.config.max_part_size:
+                raise FormTooLargeError(f"Field exceeded the maximum size of {self.config.max_part_size} bytes")
+
+    def on_field_end(self) -> None:
+        name = self._decoded_name()
+        if self.fields is None or name in self.fields:
+            self.items.append((name, unquote_plus(self._value.decode("latin-1"))))
+
+    def _decoded_name(self) -> str:
+        return unquote_plus(self._name.decode("latin-1"))
+
+    async def parse(self, stream: AsyncIterator[bytes]) -> FormData:
+        parser = python_multipart.QuerystringParser(
+            {
+                "on_field_start": self.on_field_start,
+                "on_field_name": self.on_field_name,
+                "on_field_data": self.on_field_data,
+                "on_field_end": self.on_field_end,
+            }
+        )
+        async for chunk in stream:
+            parser.write(chunk)
+
+        parser.finalize()
+        return FormData(self.items)
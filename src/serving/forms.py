@@ -1,11 +1,26 @@
+import dataclasses
+import inspect
+import typing
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, fields, replace
 from enum import Enum
-from typing import Any
-from bevy import Inject, auto_inject, injectable
+from typing import Any, get_origin
+from bevy import Inject, auto_inject, get_container, injectable
+from starlette.datastructures import FormData
 from starlette.requests import Request
 from starlette.templating import Jinja2Templates
 from markupsafe import Markup
 
 from serving.auth import CredentialProvider
+from serving.config import ConfigModel
+from serving.form_parser import FormsConfig, parse_form
+from serving.schema import ValidationError, compile_converter, sequence_item_type
+
+# Emitted by csrf() in late-bound mode and replaced with a fresh token by CSRFMiddleware.
+CSRF_TOKEN_PLACEHOLDER = "__SERVING_CSRF_TOKEN__"
+
+# Scope key holding the parsed form body, shared by CSRFMiddleware and every Form of the request
+FORM_SCOPE_KEY = "serving.form"
 
 
 class CSRFProtection(Enum):
@@ -13,18 +28,175 @@ class CSRFProtection(Enum):
     Disabled = "disabled"
 
 
+@dataclass
+class CSRFConfig(ConfigModel, model_key="csrf"):
+    """Configuration for CSRF token rendering.
+
+    - late_bound: Render a fixed placeholder from csrf() and let CSRFMiddleware substitute a
+      fresh token into HTML responses as they are sent. Pages containing forms then render to
+      identical output on every request and can be cached.
+    """
+    late_bound: bool = False
+
+
 class MissingCSRFTokenError(RuntimeError):
     """Raised when a form template fails to render a CSRF token."""
 
 
+_FORM_LIMITS = frozenset(field.name for field in fields(FormsConfig))
+
+
+@dataclass(frozen=True)
+class FormField:
+    """How one form field is read from the request.
+
+    - many: Read every value with `getlist`, as for checkbox groups and multi-selects
+    - convert: Converts each submitted string (or upload) to the field's type
+    - required: Whether the field has no default
+    - absent: Value used when the field was not submitted at all, as browsers omit unchecked
+      checkboxes and empty multi-selects
+    """
+    name: str
+    convert: Callable[[Any], Any]
+    many: bool
+    required: bool
+    absent: Callable[[], Any] | None = None
+
+
+def compile_form_fields(cls: type) -> tuple[FormField, ...]:
+    """Build the field plan of a form class from its annotations and defaults.
+
+    Raises:
+        NameError: When an annotation refers to a name that is not defined yet
+    """
+    hints = typing.get_type_hints(cls)
+    plan = []
+    for name in _form_field_names(cls):
+        hint = hints[name]
+        if hint is typing.ClassVar or get_origin(hint) is typing.ClassVar:
+            continue
+
+        item_type = sequence_item_type(hint)
+        if item_type is not None:
+            plan.append(FormField(name, compile_converter(item_type), True, not _has_default(cls, name), list))
+        else:
+            absent = bool if hint is bool else None
+            plan.append(FormField(name, compile_converter(hint), False, not _has_default(cls, name), absent))
+
+    return tuple(plan)
+
+
+def read_form_fields(plan: tuple[FormField, ...], values: Any) -> dict[str, Any]:
+    """Convert the submitted values of every field in a plan.
+
+    values is any multi-dict with `get` and `getlist`, such as `FormData` or `QueryParams`.
+
+    Raises:
+        ValidationError: Listing each missing required field and each value that failed conversion
+    """
+    result = {}
+    errors = []
+    for field in plan:
+        raw = values.getlist(field.name) if field.many else values.get(field.name)
+        if raw is None or (field.many and not raw):
+            if field.absent is not None:
+                result[field.name] = field.absent()
+            elif field.required:
+                errors.append({"field": field.name, "message": "Field required"})
+            continue
+
+        try:
+            result[field.name] = [field.convert(item) for item in raw] if field.many else field.convert(raw)
+        except ValueError as exc:
+            errors.append({"field": field.name, "message": str(exc)})
+
+    if errors:
+        raise ValidationError(errors)
+
+    return result
+
+
+async def read_request_form(request: Request, form_types: Sequence[type["Form"]]) -> FormData:
+    """Parse the request's form body for the given form classes, at most once per request.
+
+    The first form's limits apply and the fields declared by any of the forms are kept. Later
+    calls for the same request return the first parse, even through another `Request` object.
+
+    Raises:
+        HTTPException: 413 when a limit is exceeded, 400 when the body is malformed
+    """
+    form = request.scope.get(FORM_SCOPE_KEY)
+    if form is None:
+        # Looked up without injection hooks, which may be running Form.from_request themselves
+        forms_config = get_container().get(FormsConfig, default=None)
+        config = replace(forms_config or FormsConfig(), **form_types[0].__form_limits__)
+        # Only declared fields are kept, anything else in the body is skipped while parsing
+        declared = {"csrf_token"}.union(*(form_type.field_names() for form_type in form_types))
+        form = request.scope[FORM_SCOPE_KEY] = await parse_form(request, config, declared)
+
+    return form
+
+
+def _form_field_names(cls: type) -> list[str]:
+    if dataclasses.is_dataclass(cls):
+        return [field.name for field in dataclasses.fields(cls) if field.init]
+
+    # Subclassing hooks run before @dataclass has processed the class, so read the annotations
+    names = {}
+    for klass in reversed(cls.__mro__):
+        if klass is not Form and issubclass(klass, Form):
+            names.update(dict.fromkeys(inspect.get_annotations(klass)))
+
+    return list(names)
+
+
+def _has_default(cls: type, name: str) -> bool:
+    if dataclasses.is_dataclass(cls):
+        field = next(field for field in dataclasses.fields(cls) if field.name == name)
+    else:
+        # Before @dataclass has processed the class its defaults are plain class attributes
+        field = getattr(cls, name, dataclasses.MISSING)
+        if not isinstance(field, dataclasses.Field):
+            return field is not dataclasses.MISSING
+
+    return field.default is not dataclasses.MISSING or field.default_factory is not dataclasses.MISSING
+
+
 class Form:
+    """Base class for forms, configured with class keyword arguments.
+
+    - template: Template used by `render`
+    - csrf: Whether a CSRF token is rendered and required
+    - Any `FormsConfig` limit (max_body_size, max_fields, max_files, max_part_size, max_file_size,
+      spool_size) overrides the global `forms` config for this form
+    """
     __form_options__: dict[str, Any]
+    __form_limits__: dict[str, Any]
+    __form_fields__: tuple[FormField, ...] | None
 
     def __init_subclass__(
         cls, *, template: str, csrf: CSRFProtection = CSRFProtection.Enabled, **kwargs
     ):
+        limits = {name: kwargs.pop(name) for name in _FORM_LIMITS & kwargs.keys()}
         super().__init_subclass__(**kwargs)
         cls.__form_options__ = {"template": template, "csrf": csrf}
+        cls.__form_limits__ = limits
+        try:
+            cls.__form_fields__ = compile_form_fields(cls)
+        except NameError:
+            # Forward references to names defined later are resolved on first use
+            cls.__form_fields__ = None
+
+    @classmethod
+    def field_plan(cls) -> tuple[FormField, ...]:
+        if cls.__form_fields__ is None:
+            cls.__form_fields__ = compile_form_fields(cls)
+
+        return cls.__form_fields__
+
+    @classmethod
+    def field_names(cls) -> set[str]:
+        return {field.name for field in cls.field_plan()}
 
     @auto_inject
     @injectable
@@ -32,12 +204,16 @@ class Form:
         self,
         templates: Inject[Jinja2Templates],
         credential_provider: Inject[CredentialProvider],
+        csrf_config: Inject[CSRFConfig] = None,
     ) -> str:
         options = self.__form_options__
         context: dict[str, Any] = {"form": self}
 
         if options["csrf"] is CSRFProtection.Enabled:
-            token = credential_provider.generate_csrf_token()
+            if csrf_config is not None and csrf_config.late_bound:
+                token = CSRF_TOKEN_PLACEHOLDER
+            else:
+                token = credential_provider.generate_csrf_token()
             called = False
 
             def csrf() -> Markup:
@@ -67,11 +243,11 @@ class Form:
         request: Inject[Request],
         credential_provider: Inject[CredentialProvider],
     ) -> T:
-        form = await request.form()
+        form = await read_request_form(request, (cls,))
         options = cls.__form_options__
         if options["csrf"] is CSRFProtection.Enabled:
             token = form.get("csrf_token")
             if not token or not credential_provider.validate_csrf_token(token):
                 raise ValueError("Invalid CSRF token")
-        data = {k: form.get(k) for k in cls.__annotations__.keys() if k in form}
-        return cls(**data)
+
+        return cls(**read_form_fields(cls.field_plan(), form))
@@ -1,27 +1,148 @@
 import asyncio
+import dataclasses
 import inspect
-from typing import Annotated, get_args, get_origin, TypeAliasType
+import json
+import threading
+from collections.abc import Callable, Mapping
+from enum import Enum
+from typing import Annotated, Any, get_args, get_origin, TypeAliasType
 
 from bevy import Container
 from bevy.hooks import hooks
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import ImmutableMultiDict
+from starlette.exceptions import HTTPException
 from starlette.requests import Request
 from tramp.optionals import Optional
 
+from serving.body import BodyStream, read_limited_body
 from serving.config import Config, ConfigModel
-from serving.forms import Form
+from serving.encoding import JSONConfig
+from serving.forms import Form, compile_form_fields, read_form_fields
+from serving.msgpack_codec import MSGPACK_MEDIA_TYPES, decode_msgpack
+from serving.router import RouteConfig
+from serving.schema import ValidationError, compile_converter, compile_validator, sequence_item_type
 from serving.session import Session, SessionConfig
 
 type Cookie[T] = T
 type Header[T] = T
+type JSONBody[T] = T
 type PathParam[T] = T
 type QueryParam[T] = T
 type SessionParam[T] = T
 
+# Scope key holding the decoded JSONBody values of the current request, keyed by dependency
+JSON_BODIES_SCOPE_KEY = "serving.json_bodies"
+
+# Reads one parameter from the request's query params, path params, headers or cookies by name
+type ParamReader = Callable[[Mapping[str, Any], str], Any]
+
+_param_readers: dict[Any, ParamReader] = {}
+_param_readers_lock = threading.Lock()
+
 
 def is_annotated(dependency: type, expected_type: TypeAliasType) -> bool:
     return get_origin(dependency) is Annotated and get_origin(get_args(dependency)[0]) is expected_type
 
 
+def route_body_limit(container: Container, default: int | None) -> int | None:
+    """The current route's max_body_size from its configuration, or default when it has none."""
+    route_config = container.get(RouteConfig, default=None)
+    if route_config is None or route_config.max_body_size is None:
+        return default
+
+    return route_config.max_body_size
+
+
+def compile_param_reader(dependency: Any) -> ParamReader:
+    """Return a function reading the `T` of a `PathParam[T]`, `QueryParam[T]`, `Header[T]` or `Cookie[T]`.
+
+    Values are converted with `serving.schema.compile_converter`. A `list[T]` reads every
+    repeated value, and a dataclass reads each of its fields from a parameter of the same name.
+    Readers return None when the parameter is missing and are built once per dependency.
+
+    Raises:
+        ValidationError: From the returned function when a value cannot be converted, which is
+            answered with a 422
+    """
+    try:
+        return _param_readers[dependency]
+    except KeyError:
+        pass
+
+    with _param_readers_lock:
+        if dependency not in _param_readers:
+            _param_readers[dependency] = _build_param_reader(dependency)
+
+        return _param_readers[dependency]
+
+
+def request_param(annotation: Any, parameter_name: str) -> tuple[Any, str, str] | None:
+    """Describe a `PathParam`, `QueryParam`, `Header` or `Cookie` parameter annotation.
+
+    Returns the dependency, the name it is read by and the `Request` attribute it is read from, or
+    None for other annotations.
+    """
+    name = parameter_name
+    if get_origin(annotation) is Annotated:
+        annotation, name = get_args(annotation)[:2]
+
+    source = _REQUEST_PARAM_SOURCES.get(get_origin(annotation))
+    if source is None:
+        return None
+
+    return annotation, name, source
+
+
+def _build_param_reader(dependency: Any) -> ParamReader:
+    args = get_args(dependency)
+    param_type = args[0] if args else str
+    if isinstance(param_type, type) and dataclasses.is_dataclass(param_type):
+        plan = compile_form_fields(param_type)
+
+        def read_group(values: Mapping[str, Any], name: str) -> Any:
+            return param_type(**read_form_fields(plan, _multi_dict(values)))
+
+        return read_group
+
+    item_type = sequence_item_type(param_type)
+    if item_type is not None:
+        convert_item = compile_converter(item_type)
+
+        def read_list(values: Mapping[str, Any], name: str) -> list[Any] | None:
+            items = _multi_dict(values).getlist(name)
+            if not items:
+                return None
+
+            return [_converting(convert_item, item, name) for item in items]
+
+        return read_list
+
+    convert = compile_converter(param_type)
+
+    def read(values: Mapping[str, Any], name: str) -> Any:
+        value = values.get(name)
+        if not isinstance(value, str):
+            # Missing, or already converted by the route's path convertor
+            return value
+
+        return _converting(convert, value, name)
+
+    return read
+
+
+def _converting(convert: Callable[[str], Any], value: str, name: str) -> Any:
+    try:
+        return convert(value)
+    except ValueError as exc:
+        raise ValidationError([{"field": name, "message": str(exc)}]) from None
+
+
+def _multi_dict(values: Mapping[str, Any]) -> Any:
+    # Path params and cookies are plain dicts, the other sources already support getlist
+    return values if hasattr(values, "getlist") else ImmutableMultiDict(values)
+
+
 def get_parameter_default(context: dict):
     """Extract the parameter default value from the injection context.
     
@@ -40,20 +161,38 @@ def get_parameter_default(context: dict):
             return None
 
 
+_REQUEST_PARAM_SOURCES = {
+    PathParam: "path_params",
+    QueryParam: "query_params",
+    Header: "headers",
+    Cookie: "cookies",
+}
+
+
 @hooks.HANDLE_UNSUPPORTED_DEPENDENCY
 def handle_config_model_types(container: Container, dependency: type, context: dict) -> Optional:
-    must_be_collection = False
-    if get_origin(dependency) is list:
-        dependency = get_args(dependency)[0]
-        must_be_collection = True
-
+    model_type = get_args(dependency)[0] if get_origin(dependency) is list else dependency
     try:
-        if not issubclass(dependency, ConfigModel):
+        if not issubclass(model_type, ConfigModel):
             return Optional.Nothing()
     except (TypeError, AttributeError):
         # Not a class or not a subclass of Model
         return Optional.Nothing()
 
+    return Optional.Some(load_config_model(container, dependency, get_parameter_default(context)))
+
+
+def load_config_model(container: Container, dependency: Any, default: Any = None) -> Any:
+    """Load a `ConfigModel` subclass, or `list[...]` of a collection model, from the configuration.
+
+    Missing keys give default when it is not None, otherwise an empty list for collections and
+    None for single models.
+    """
+    must_be_collection = False
+    if get_origin(dependency) is list:
+        dependency = get_args(dependency)[0]
+        must_be_collection = True
+
     # Check for collection mismatch
     is_collection = getattr(dependency, "__is_collection__", False)
 
@@ -66,21 +205,19 @@ def handle_config_model_types(container: Container, dependency: type, context: d
     # It's a Model subclass, try to get and instantiate it
     config = container.get(Config)
     try:
-        model_instance = config.get(dependency.__model_key__, dependency, is_collection=is_collection)
-        return Optional.Some(model_instance)
+        return config.get(dependency.__model_key__, dependency, is_collection=is_collection)
     except KeyError:
         # Key not found in config - check for default value
-        default = get_parameter_default(context)
         if default is not None:
-            return Optional.Some(default)
+            return default
         
         # No default value available
         if is_collection:
             # Return empty list for collections when key is missing and no default
-            return Optional.Some([])
+            return []
         else:
             # For single models, return None when no default exists
-            return Optional.Some(None)
+            return None
 
 
 @hooks.HANDLE_UNSUPPORTED_DEPENDENCY
@@ -96,7 +233,7 @@ def handle_cookie_types(container: Container, dependency: type, context: dict) -
         raise ValueError(f"Missing name for Cookie dependency: {dependency}")
 
     request = container.get(Request)
-    value = request.cookies.get(name)
+    value = compile_param_reader(dependency)(request.cookies, name)
     
     if value is None:
         # Check for default value
@@ -134,6 +271,60 @@ async def handle_session_types(container: Container, dependency: type, context:
 
 
 
+@hooks.HANDLE_UNSUPPORTED_DEPENDENCY
+def handle_json_body_types(container: Container, dependency: type, context: dict) -> Optional:
+    if get_origin(dependency) is not JSONBody:
+        return Optional.Nothing()
+
+    # Hooks run outside the request's event loop, so bodies are read before the endpoint is called
+    bodies = container.get(Request).scope.get(JSON_BODIES_SCOPE_KEY, {})
+    if dependency not in bodies:
+        raise RuntimeError(f"{dependency} can only be injected as a parameter of a route endpoint")
+
+    return Optional.Some(bodies[dependency])
+
+
+async def load_json_body(request: Request, body_type: Any, config: JSONConfig, max_size: int | None) -> Any:
+    """Read, decode and validate a JSON or MessagePack request body as body_type.
+
+    Must be awaited on the request's event loop. Large bodies are decoded in a worker thread.
+
+    Raises:
+        HTTPException: 413 for bodies over max_size, 415 for other content types, 400 when malformed
+        ValidationError: When the decoded value does not match body_type
+    """
+    media_type = request.headers.get("content-type", "application/json").split(";", 1)[0].strip().lower()
+    if media_type in MSGPACK_MEDIA_TYPES:
+        decode = decode_msgpack
+    elif media_type == "application/json" or media_type.endswith("+json"):
+        decode = json.loads
+    else:
+        raise HTTPException(415, f"Expected a JSON or MessagePack body, got '{media_type}'")
+
+    body = await read_limited_body(request, max_size)
+    try:
+        if len(body) > config.body_offload_size:
+            data = await run_in_threadpool(decode, body)
+        else:
+            data = decode(body)
+    except ValueError as exc:
+        # JSONDecodeError, UnicodeDecodeError and MessagePackError are all ValueErrors
+        raise HTTPException(400, f"Malformed request body: {exc}") from exc
+
+    # Raises ValidationError, which is answered with a 422
+    return compile_validator(body_type)(data)
+
+
+
+@hooks.HANDLE_UNSUPPORTED_DEPENDENCY
+def handle_body_stream_types(container: Container, dependency: type, context: dict) -> Optional:
+    if dependency is not BodyStream:
+        return Optional.Nothing()
+
+    request = container.get(Request)
+    return Optional.Some(BodyStream.from_request(request, route_body_limit(container, None)))
+
+
 @hooks.HANDLE_UNSUPPORTED_DEPENDENCY
 def handle_header_types(container: Container, dependency: type, context: dict) -> Optional:
     name = context["injection_context"].parameter_name if "injection_context" in context else None
@@ -147,7 +338,7 @@ def handle_header_types(container: Container, dependency: type, context: dict) -
         raise ValueError(f"Missing name for Header dependency: {dependency}")
 
     request = container.get(Request)
-    value = request.headers.get(name)
+    value = compile_param_reader(dependency)(request.headers, name)
     
     if value is None:
         # Check for default value
@@ -159,41 +350,16 @@ def handle_header_types(container: Container, dependency: type, context: dict) -
 
 @hooks.HANDLE_UNSUPPORTED_DEPENDENCY
 def handle_session_param_types(container: Container, dependency: type, context: dict) -> Optional:
-    name = context["injection_context"].parameter_name if "injection_context" in context else None
-    if is_annotated(dependency, SessionParam):
-        dependency, name = get_args(dependency)
-    else:
-        origin = get_origin(dependency)
-        if origin is SessionParam:
-            # Using SessionParam[T] without Annotated override
-            pass
-        elif origin is Annotated:
-            # Support Annotated[T, SessionParam, "name"] style
-            args = get_args(dependency)
-            meta = args[1:]
-            if any(m is SessionParam for m in meta):
-                # Extract optional explicit key override from metadata
-                for m in meta:
-                    if isinstance(m, str):
-                        name = m
-                        break
-            else:
-                return Optional.Nothing()
-        else:
-            return Optional.Nothing()
+    if dependency_kind(dependency) is not DependencyKind.SessionParam:
+        return Optional.Nothing()
 
+    parameter_name = context["injection_context"].parameter_name if "injection_context" in context else None
+    name = session_param_key(dependency, parameter_name)
     if name is None:
         raise ValueError(f"Missing name for SessionParam dependency: {dependency}")
 
-    # Determine the configured Session type (default to base Session)
-    try:
-        session_config = container.get(SessionConfig)
-        session_type = session_config.session_type or Session
-    except Exception:
-        session_type = Session
-
     # Ensure session instance exists in container
-    session_instance = container.get(session_type)
+    session_instance = container.get(configured_session_type(container))
     if name in session_instance:  # type: ignore[operator]
         return Optional.Some(session_instance[name])  # type: ignore[index]
 
@@ -201,6 +367,29 @@ def handle_session_param_types(container: Container, dependency: type, context:
     return Optional.Some(default)
 
 
+def session_param_key(dependency: Any, parameter_name: str | None) -> str | None:
+    """The session key a `SessionParam` reads, an explicit `Annotated` name or else the parameter name.
+
+    Supports `SessionParam[T]`, `Annotated[SessionParam[T], "key"]` and `Annotated[T, SessionParam, "key"]`.
+    """
+    if is_annotated(dependency, SessionParam):
+        return get_args(dependency)[1]
+
+    if get_origin(dependency) is Annotated:
+        return next((item for item in get_args(dependency)[1:] if isinstance(item, str)), parameter_name)
+
+    return parameter_name
+
+
+def configured_session_type(container: Container) -> type[Session]:
+    """The `Session` subclass from the session config, the base `Session` when none is configured."""
+    try:
+        session_config = container.get(SessionConfig)
+        return session_config.session_type or Session
+    except Exception:
+        return Session
+
+
 @hooks.HANDLE_UNSUPPORTED_DEPENDENCY
 def handle_query_param_types(container: Container, dependency: type, context: dict) -> Optional:
     name = context["injection_context"].parameter_name if "injection_context" in context else None
@@ -214,7 +403,7 @@ def handle_query_param_types(container: Container, dependency: type, context: di
         raise ValueError(f"Missing name for QueryParam dependency: {dependency}")
 
     request = container.get(Request)
-    value = request.query_params.get(name)
+    value = compile_param_reader(dependency)(request.query_params, name)
     
     if value is None:
         # Check for default value
@@ -237,7 +426,7 @@ def handle_path_param_types(container: Container, dependency: type, context: dic
         raise ValueError(f"Missing name for PathParam dependency: {dependency}")
 
     request = container.get(Request)
-    value = request.path_params.get(name)
+    value = compile_param_reader(dependency)(request.path_params, name)
     
     if value is None:
         # Check for default value
@@ -245,3 +434,102 @@ def handle_path_param_types(container: Container, dependency: type, context: dic
         return Optional.Some(default)  # Return default or None
     
     return Optional.Some(value)
+
+
+class DependencyKind(Enum):
+    """The kinds of dependency Serving resolves itself, each handled by one injector hook."""
+    Cookie = "cookie"
+    Header = "header"
+    PathParam = "path_param"
+    QueryParam = "query_param"
+    JSONBody = "json_body"
+    SessionParam = "session_param"
+    BodyStream = "body_stream"
+    Form = "form"
+    Session = "session"
+    ConfigModel = "config_model"
+
+
+_ALIAS_KINDS = {
+    Cookie: DependencyKind.Cookie,
+    Header: DependencyKind.Header,
+    PathParam: DependencyKind.PathParam,
+    QueryParam: DependencyKind.QueryParam,
+    JSONBody: DependencyKind.JSONBody,
+    SessionParam: DependencyKind.SessionParam,
+}
+
+# Checked in order, so the more specific base classes come first
+_CLASS_KINDS = (
+    (BodyStream, DependencyKind.BodyStream),
+    (Form, DependencyKind.Form),
+    (Session, DependencyKind.Session),
+    (ConfigModel, DependencyKind.ConfigModel),
+)
+
+_KIND_HOOKS = {
+    DependencyKind.Cookie: handle_cookie_types,
+    DependencyKind.Header: handle_header_types,
+    DependencyKind.PathParam: handle_path_param_types,
+    DependencyKind.QueryParam: handle_query_param_types,
+    DependencyKind.JSONBody: handle_json_body_types,
+    DependencyKind.SessionParam: handle_session_param_types,
+    DependencyKind.BodyStream: handle_body_stream_types,
+    DependencyKind.Form: handle_form_types,
+    DependencyKind.Session: handle_session_types,
+    DependencyKind.ConfigModel: handle_config_model_types,
+}
+
+_dependency_kinds: dict[Any, DependencyKind | None] = {}
+
+
+def dependency_kind(dependency: Any) -> DependencyKind | None:
+    """Classify a dependency by the injector that resolves it, None when Serving does not handle it.
+
+    Results are cached per dependency.
+    """
+    try:
+        return _dependency_kinds[dependency]
+    except KeyError:
+        kind = _dependency_kinds[dependency] = _classify(dependency)
+        return kind
+    except TypeError:
+        # Unhashable annotation metadata
+        return _classify(dependency)
+
+
+def _classify(dependency: Any) -> DependencyKind | None:
+    origin = get_origin(dependency)
+    if origin is Annotated:
+        annotated_type, *metadata = get_args(dependency)
+        if get_origin(annotated_type) in _ALIAS_KINDS:
+            return _ALIAS_KINDS[get_origin(annotated_type)]
+
+        return DependencyKind.SessionParam if any(item is SessionParam for item in metadata) else None
+
+    if origin in _ALIAS_KINDS:
+        return _ALIAS_KINDS[origin]
+
+    if origin is list:
+        model_type = get_args(dependency)[0]
+        if isinstance(model_type, type) and issubclass(model_type, ConfigModel):
+            return DependencyKind.ConfigModel
+
+        return None
+
+    if isinstance(dependency, type):
+        for base, kind in _CLASS_KINDS:
+            if issubclass(dependency, base):
+                return kind
+
+    return None
+
+
+@hooks.HANDLE_UNSUPPORTED_DEPENDENCY
+def handle_serving_types(container: Container, dependency: type, context: dict) -> Optional:
+    """Dispatch to the one injector hook for the dependency's kind instead of trying every hook."""
+    kind = dependency_kind(dependency)
+    if kind is None:
+        return Optional.Nothing()
+
+    return _KIND_HOOKS[kind](container, dependency, context)
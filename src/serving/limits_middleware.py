@@ -0,0 +1,123 @@
+"""Request size and timing limits enforced before a request reaches any middleware doing real work."""
+import asyncio
+from dataclasses import dataclass
+
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from serving.config import ConfigModel
+from serving.router import matched_endpoint
+
+
+@dataclass
+class LimitsConfig(ConfigModel, model_key="limits"):
+    """Limits on every HTTP request, each disabled when None.
+
+    - max_body_size: Largest request body in bytes as sent over the wire, rejected with 413. Routes
+      setting their own max_body_size use it instead, so upload routes can accept larger bodies.
+    - max_headers: Maximum number of request headers, rejected with 431
+    - max_header_size: Largest single header (name and value) in bytes, rejected with 431
+    - max_query_length: Longest query string in bytes, rejected with 414
+    - body_timeout: Seconds to wait for each chunk of the body once an endpoint starts reading it,
+      so stalled clients cannot hold a handler forever while slow but steady uploads still finish.
+      Rejected with 408.
+    """
+    max_body_size: int | None = 100 * 1024 * 1024
+    max_headers: int | None = 100
+    max_header_size: int | None = 8 * 1024
+    max_query_length: int | None = 8 * 1024
+    body_timeout: float | None = 30.0
+
+
+class LimitsMiddleware:
+    """Rejects requests breaking the configured limits, checking headers before the app is called
+    and the body while it is received."""
+
+    def __init__(self, app: ASGIApp, config: LimitsConfig):
+        self.app = app
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_body_size = self._check_request_line_and_headers(scope)
+        if max_body_size is None and self.config.body_timeout is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, _LimitedBody(receive, max_body_size, self.config.body_timeout).receive, send)
+
+    def _check_request_line_and_headers(self, scope: Scope) -> int | None:
+        """Check the request line and headers, returning the body size limit of the request."""
+        config = self.config
+        if config.max_query_length is not None and len(scope.get("query_string", b"")) > config.max_query_length:
+            raise HTTPException(414, f"Query string is longer than {config.max_query_length} bytes")
+
+        headers = scope["headers"]
+        if config.max_headers is not None and len(headers) > config.max_headers:
+            raise HTTPException(431, f"More than {config.max_headers} request headers")
+
+        declared_size = None
+        has_body = False
+        for name, value in headers:
+            if config.max_header_size is not None and len(name) + len(value) > config.max_header_size:
+                raise HTTPException(431, f"The {name.decode('latin-1')} header is larger than {config.max_header_size} bytes")
+
+            if name == b"content-length":
+                try:
+                    declared_size = int(value)
+                except ValueError:
+                    raise HTTPException(400, "Invalid Content-Length header") from None
+
+                has_body = declared_size > 0
+            elif name == b"transfer-encoding":
+                has_body = True
+
+        # Requests without a body never reach the limit, so only they skip matching the route
+        max_body_size = self._max_body_size(scope) if has_body else config.max_body_size
+        if max_body_size is not None and declared_size is not None and declared_size > max_body_size:
+            raise HTTPException(413, f"Request body is larger than {max_body_size} bytes")
+
+        return max_body_size
+
+    def _max_body_size(self, scope: Scope) -> int | None:
+        app = scope.get("app")
+        if app is None:
+            return self.config.max_body_size
+
+        endpoint = matched_endpoint(app.router.routes, scope)
+        route_config = getattr(endpoint, "__route_config__", None)
+        if route_config is not None and route_config.max_body_size is not None:
+            return route_config.max_body_size
+
+        return self.config.max_body_size
+
+
+class _LimitedBody:
+    def __init__(self, receive: Receive, max_size: int | None, timeout: float | None):
+        self._receive = receive
+        self._max_size = max_size
+        self._timeout = timeout
+        self._size = 0
+        self._complete = False
+
+    async def receive(self) -> Message:
+        if self._complete or self._timeout is None:
+            # Once the body is in, receive only waits for the client to disconnect
+            message = await self._receive()
+        else:
+            try:
+                async with asyncio.timeout(self._timeout):
+                    message = await self._receive()
+            except TimeoutError:
+                raise HTTPException(408, "Timed out waiting for the request body") from None
+
+        if message["type"] == "http.request":
+            self._size += len(message.get("body", b""))
+            self._complete = not message.get("more_body", False)
+            if self._max_size is not None and self._size > self._max_size:
+                raise HTTPException(413, f"Request body is larger than {self._max_size} bytes")
+
+        return message
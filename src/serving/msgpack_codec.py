@@ -0,0 +1,238 @@
+"""MessagePack encoding for JSON routes and request bodies.
+
+The value model is the same as JSON's: None, bools, ints, floats, strings, lists and string
+keyed maps, plus raw bytes which MessagePack can carry natively. The `msgpack` package is used
+when it is installed, otherwise the pure Python codec below is used.
+"""
+import struct
+from typing import Any
+
+try:
+    import msgpack as _msgpack
+except ImportError:
+    _msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = frozenset({MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"})
+
+
+class MessagePackError(ValueError):
+    """Raised when data is not valid MessagePack or holds values outside the JSON value model."""
+
+
+def encode_msgpack(value: Any) -> bytes:
+    """Encode a value as MessagePack using the most compact representation for each item."""
+    if _msgpack is not None:
+        try:
+            return _msgpack.packb(value, use_bin_type=True)
+        except (TypeError, OverflowError, ValueError) as exc:
+            raise MessagePackError(str(exc)) from exc
+
+    buffer = bytearray()
+    _pack(value, buffer)
+    return bytes(buffer)
+
+
+def decode_msgpack(data: bytes | bytearray | memoryview) -> Any:
+    """Decode a single MessagePack value, rejecting trailing data."""
+    if _msgpack is not None:
+        try:
+            return _msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except Exception as exc:
+            raise MessagePackError(f"Invalid MessagePack data: {exc}") from exc
+
+    view = memoryview(data)
+    try:
+        value, offset = _unpack(view, 0)
+    except (IndexError, struct.error, UnicodeDecodeError, RecursionError) as exc:
+        raise MessagePackError(f"Invalid MessagePack data: {exc}") from exc
+
+    if offset != len(view):
+        raise MessagePackError("Invalid MessagePack data: unexpected trailing bytes")
+
+    return value
+
+
+def wants_msgpack(accept: str | None) -> bool:
+    """Whether the client prefers MessagePack over JSON.
+
+    MessagePack must be named explicitly with a quality at least as high as JSON's, so wildcard
+    Accept headers keep getting JSON.
+    """
+    if not accept:
+        return False
+
+    msgpack_quality = 0.0
+    json_quality = 0.0
+    for part in accept.split(","):
+        media_type, *params = part.split(";")
+        media_type = media_type.strip().lower()
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_quality = max(msgpack_quality, quality)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            json_quality = max(json_quality, quality)
+
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+def _pack(value: Any, buffer: bytearray) -> None:
+    match value:
+        case None:
+            buffer.append(0xC0)
+        case bool():
+            buffer.append(0xC3 if value else 0xC2)
+        case int():
+            _pack_int(value, buffer)
+        case float():
+            buffer += struct.pack(">Bd", 0xCB, value)
+        case str():
+            data = value.encode()
+            _pack_header(len(data), buffer, fix=(0xA0, 32), sizes=((0xD9, "B"), (0xDA, "H"), (0xDB, "I")))
+            buffer += data
+        case bytes() | bytearray() | memoryview():
+            data = bytes(value)
+            _pack_header(len(data), buffer, fix=None, sizes=((0xC4, "B"), (0xC5, "H"), (0xC6, "I")))
+            buffer += data
+        case list() | tuple():
+            _pack_header(len(value), buffer, fix=(0x90, 16), sizes=((0xDC, "H"), (0xDD, "I")))
+            for item in value:
+                _pack(item, buffer)
+        case dict():
+            _pack_header(len(value), buffer, fix=(0x80, 16), sizes=((0xDE, "H"), (0xDF, "I")))
+            for key, item in value.items():
+                _pack(key, buffer)
+                _pack(item, buffer)
+        case _:
+            raise MessagePackError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+def _pack_int(value: int, buffer: bytearray) -> None:
+    if 0 <= value < 0x80:
+        buffer.append(value)
+    elif -32 <= value < 0:
+        buffer.append(value & 0xFF)
+    elif value >= 0:
+        for code, fmt, limit in ((0xCC, "B", 1 << 8), (0xCD, "H", 1 << 16), (0xCE, "I", 1 << 32), (0xCF, "Q", 1 << 64)):
+            if value < limit:
+                buffer += struct.pack(f">B{fmt}", code, value)
+                return
+        raise MessagePackError("Integer is too large for MessagePack")
+    else:
+        for code, fmt, limit in ((0xD0, "b", 1 << 7), (0xD1, "h", 1 << 15), (0xD2, "i", 1 << 31), (0xD3, "q", 1 << 63)):
+            if value >= -limit:
+                buffer += struct.pack(f">B{fmt}", code, value)
+                return
+        raise MessagePackError("Integer is too small for MessagePack")
+
+
+def _pack_header(
+    length: int,
+    buffer: bytearray,
+    fix: tuple[int, int] | None,
+    sizes: tuple[tuple[int, str], ...],
+) -> None:
+    if fix is not None and length < fix[1]:
+        buffer.append(fix[0] | length)
+        return
+
+    for code, fmt in sizes:
+        if length < 1 << (8 * struct.calcsize(fmt)):
+            buffer += struct.pack(f">B{fmt}", code, length)
+            return
+
+    raise MessagePackError("Value is too large for MessagePack")
+
+
+_FIXED = {
+    0xC0: None,
+    0xC2: False,
+    0xC3: True,
+}
+_NUMBERS = {
+    0xCA: ">f", 0xCB: ">d",
+    0xCC: ">B", 0xCD: ">H", 0xCE: ">I", 0xCF: ">Q",
+    0xD0: ">b", 0xD1: ">h", 0xD2: ">i", 0xD3: ">q",
+}
+_LENGTHS = {
+    0xC4: ("bin", ">B"), 0xC5: ("bin", ">H"), 0xC6: ("bin", ">I"),
+    0xD9: ("str", ">B"), 0xDA: ("str", ">H"), 0xDB: ("str", ">I"),
+    0xDC: ("array", ">H"), 0xDD: ("array", ">I"),
+    0xDE: ("map", ">H"), 0xDF: ("map", ">I"),
+}
+
+
+def _unpack(view: memoryview, offset: int) -> tuple[Any, int]:
+    code = view[offset]
+    offset += 1
+    if code < 0x80:
+        return code, offset
+    if code >= 0xE0:
+        return code - 0x100, offset
+    if 0xA0 <= code <= 0xBF:
+        return _unpack_str(view, offset, code & 0x1F)
+    if 0x90 <= code <= 0x9F:
+        return _unpack_array(view, offset, code & 0x0F)
+    if 0x80 <= code <= 0x8F:
+        return _unpack_map(view, offset, code & 0x0F)
+    if code in _FIXED:
+        return _FIXED[code], offset
+    if code in _NUMBERS:
+        fmt = _NUMBERS[code]
+        return struct.unpack_from(fmt, view, offset)[0], offset + struct.calcsize(fmt)
+    if code in _LENGTHS:
+        kind, fmt = _LENGTHS[code]
+        length = struct.unpack_from(fmt, view, offset)[0]
+        offset += struct.calcsize(fmt)
+        match kind:
+            case "bin":
+                return _take(view, offset, length).tobytes(), offset + length
+            case "str":
+                return _unpack_str(view, offset, length)
+            case "array":
+                return _unpack_array(view, offset, length)
+            case "map":
+                return _unpack_map(view, offset, length)
+
+    raise MessagePackError(f"Unsupported MessagePack type 0x{code:02x}")
+
+
+def _take(view: memoryview, offset: int, length: int) -> memoryview:
+    if offset + length > len(view):
+        raise IndexError("data ended before the value was complete")
+
+    return view[offset:offset + length]
+
+
+def _unpack_str(view: memoryview, offset: int, length: int) -> tuple[str, int]:
+    return str(_take(view, offset, length), "utf-8"), offset + length
+
+
+def _unpack_array(view: memoryview, offset: int, length: int) -> tuple[list, int]:
+    items = []
+    for _ in range(length):
+        item, offset = _unpack(view, offset)
+        items.append(item)
+
+    return items, offset
+
+
+def _unpack_map(view: memoryview, offset: int, length: int) -> tuple[dict, int]:
+    items = {}
+    for _ in range(length):
+        key, offset = _unpack(view, offset)
+        value, offset = _unpack(view, offset)
+        try:
+            items[key] = value
+        except TypeError:
+            raise MessagePackError("Invalid MessagePack data: map keys must be hashable") from None
+
+    return items, offset
@@ -0,0 +1,219 @@
+"""Per-endpoint plans that resolve request-bound parameters without going through injector hooks.
+
+Each endpoint parameter is classified once when its route is built. Parameters Serving knows how
+to fill (request parameters, bodies, forms, sessions and config models) are then resolved
+directly on the request's event loop, and the container is only asked for the rest. Independent
+async parameters, such as a session load and a form read, are awaited concurrently.
+"""
+import asyncio
+import inspect
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, get_args
+
+from bevy import Container
+from starlette.requests import Request
+
+from serving.body import BodyStream
+from serving.encoding import JSONConfig
+from serving.injectors import (
+    JSON_BODIES_SCOPE_KEY,
+    DependencyKind,
+    compile_param_reader,
+    configured_session_type,
+    dependency_kind,
+    load_config_model,
+    load_json_body,
+    request_param,
+    session_param_key,
+)
+from serving.router import RouteConfig
+from serving.session import Session
+
+
+class Phase(Enum):
+    """When a parameter is resolved during a request, in order."""
+    Immediate = "immediate"  # Synchronous, resolved first
+    Concurrent = "concurrent"  # Awaited at the same time as the other async parameters
+    Body = "body"  # Reads the request body, awaited one after another but alongside Concurrent
+    Dependent = "dependent"  # Awaited once everything else is resolved, such as session params
+
+
+@dataclass(frozen=True)
+class ParameterPlan:
+    """How one endpoint parameter is resolved.
+
+    - resolve: Called with the request and its container, returns the value or, for every phase
+      except Immediate, an awaitable of it
+    - kind: The kind of dependency, None for the `Request` itself
+    """
+    name: str
+    kind: DependencyKind | None
+    resolve: Callable[[Request, Container], Any]
+    phase: Phase = Phase.Immediate
+
+
+class EndpointPlan:
+    """The resolution plan of an endpoint's parameters, built once per route."""
+
+    def __init__(self, endpoint: Callable, route_config: RouteConfig | None, json_config: JSONConfig):
+        self.endpoint = endpoint
+        parameters = []
+        form_types = []
+        unresolved = set()
+        for name, parameter in _signature(endpoint).parameters.items():
+            default = None if parameter.default is inspect.Parameter.empty else parameter.default
+            plan = _plan_parameter(name, parameter.annotation, default, route_config, json_config)
+            if plan is None:
+                unresolved.add(name)
+            else:
+                parameters.append(plan)
+                if plan.kind is DependencyKind.Form:
+                    form_types.append(parameter.annotation)
+
+        self.parameters = tuple(parameters)
+        self.form_types = tuple(form_types)
+        self.unresolved = frozenset(unresolved)
+        self._phases = {phase: tuple(plan for plan in parameters if plan.phase is phase) for phase in Phase}
+
+    async def arguments(self, request: Request, container: Container) -> dict[str, Any]:
+        """Resolve every planned parameter, path params not otherwise planned are passed as they are."""
+        arguments = dict(request.path_params)
+        for plan in self._phases[Phase.Immediate]:
+            arguments[plan.name] = plan.resolve(request, container)
+
+        concurrent = self._phases[Phase.Concurrent]
+        pending = [plan.resolve(request, container) for plan in concurrent]
+        if self._phases[Phase.Body]:
+            # The body can only be read once, so its readers take turns in a single chain
+            pending.append(self._read_bodies(request, container))
+
+        results = await _gather(pending)
+        arguments.update(zip((plan.name for plan in concurrent), results, strict=False))
+        if self._phases[Phase.Body]:
+            arguments.update(results[-1])
+
+        for plan in self._phases[Phase.Dependent]:
+            arguments[plan.name] = await plan.resolve(request, container)
+
+        return arguments
+
+    async def _read_bodies(self, request: Request, container: Container) -> dict[str, Any]:
+        return {plan.name: await plan.resolve(request, container) for plan in self._phases[Phase.Body]}
+
+    def call(self, container: Container, arguments: dict[str, Any]) -> Any:
+        """Call the endpoint, through the container only when parameters are left for it to inject."""
+        if self.unresolved - arguments.keys():
+            return container.call(self.endpoint, **arguments)
+
+        return self.endpoint(**arguments)
+
+
+async def _gather(pending: list[Awaitable[Any]]) -> list[Any]:
+    if len(pending) < 2:
+        # Nothing to overlap, skip creating tasks
+        return [await awaitable for awaitable in pending]
+
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in pending]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        # A failed read makes the other results useless, stop them instead of leaving them running
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+async def load_session(container: Container, session_type: type[Session]) -> Session:
+    """The request's session of session_type, loaded on the request's loop and added to the container."""
+    session = container.get(session_type, default=None)
+    if session is None:
+        session = container.call(session_type.load_session)
+        if inspect.isawaitable(session):
+            session = await session
+
+        container.add(session_type, session)
+
+    return session
+
+
+def _signature(endpoint: Callable) -> inspect.Signature:
+    try:
+        return inspect.signature(endpoint, eval_str=True)
+    except NameError:
+        # Forward references to names that do not exist yet are left to the container
+        return inspect.signature(endpoint)
+
+
+def _plan_parameter(
+    name: str, annotation: Any, default: Any, route_config: RouteConfig | None, json_config: JSONConfig
+) -> ParameterPlan | None:
+    if annotation is Request:
+        return ParameterPlan(name, None, lambda request, container: request)
+
+    kind = dependency_kind(annotation)
+    match kind:
+        case DependencyKind.Cookie | DependencyKind.Header | DependencyKind.PathParam | DependencyKind.QueryParam:
+            dependency, key, source = request_param(annotation, name)
+            read = compile_param_reader(dependency)
+
+            def resolve_param(request: Request, container: Container) -> Any:
+                value = read(getattr(request, source), key)
+                return default if value is None else value
+
+            return ParameterPlan(name, kind, resolve_param)
+
+        case DependencyKind.JSONBody:
+            max_size = json_config.max_body_size
+            if route_config is not None and route_config.max_body_size is not None:
+                max_size = route_config.max_body_size
+
+            async def resolve_json_body(request: Request, container: Container) -> Any:
+                # Injector hooks run on another thread's loop, the body must be read on this one
+                bodies = request.scope.setdefault(JSON_BODIES_SCOPE_KEY, {})
+                if annotation not in bodies:
+                    bodies[annotation] = await load_json_body(request, get_args(annotation)[0], json_config, max_size)
+
+                return bodies[annotation]
+
+            return ParameterPlan(name, kind, resolve_json_body, Phase.Body)
+
+        case DependencyKind.BodyStream:
+            max_size = None if route_config is None else route_config.max_body_size
+            return ParameterPlan(name, kind, lambda request, container: BodyStream.from_request(request, max_size))
+
+        case DependencyKind.Form:
+            async def resolve_form(request: Request, container: Container) -> Any:
+                # Added to the container so other injectables needing the form share the instance
+                form = container.get(annotation, default=None)
+                if form is None:
+                    form = await container.call(annotation.from_request)
+                    container.add(annotation, form)
+
+                return form
+
+            return ParameterPlan(name, kind, resolve_form, Phase.Body)
+
+        case DependencyKind.Session:
+            return ParameterPlan(
+                name, kind, lambda request, container: load_session(container, annotation), Phase.Concurrent
+            )
+
+        case DependencyKind.SessionParam:
+            key = session_param_key(annotation, name)
+
+            async def resolve_session_param(request: Request, container: Container) -> Any:
+                # Dependent, so a Session parameter of the same endpoint has already been loaded
+                session = await load_session(container, configured_session_type(container))
+                return session[key] if key in session else default
+
+            return ParameterPlan(name, kind, resolve_session_param, Phase.Dependent)
+
+        case DependencyKind.ConfigModel:
+            return ParameterPlan(
+                name, kind, lambda request, container: load_config_model(container, annotation, default)
+            )
+
+    # Everything else is left to the container
+    return None
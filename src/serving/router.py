@@ -1,7 +1,8 @@
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 from typing import Any, Callable, Literal, overload
 
-from starlette.routing import Route
+from starlette.routing import BaseRoute, Match, Mount, Route
 
 from serving.config import ConfigModel
 
@@ -13,16 +14,31 @@ class RouteConfig:
     path: str
     method: HTTPMethod = "GET"
     permissions: set[str] = field(default_factory=set)
+    max_body_size: int | None = None
 
     @classmethod
     def from_dict(cls, config: dict) -> "RouteConfig":
         return cls(
             path=config["path"],
             method=config.get("method", "GET"),
-            permissions=set(config.get("permissions", []))
+            permissions=set(config.get("permissions", [])),
+            max_body_size=config.get("max_body_size"),
         )
 
 
+def matched_endpoint(routes: Iterable[BaseRoute], scope: dict[str, Any]) -> Any:
+    """The endpoint the router will dispatch scope to, or None."""
+    for route in routes:
+        match, child_scope = route.matches(scope)
+        if match is Match.FULL:
+            if isinstance(route, Mount):
+                return matched_endpoint(route.routes, {**scope, **child_scope})
+
+            return child_scope.get("endpoint")
+
+    return None
+
+
 @dataclass
 class RouterConfig(ConfigModel, model_key="routers", is_collection=True):
     entrypoint: str = ""
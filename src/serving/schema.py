@@ -0,0 +1,663 @@
+"""Schemas compiled from type annotations for encoding results and validating input.
+
+Encoders are generated once per type as Python source specialised to that type's fields, so
+encoding a list of dataclasses is a comprehension of dict literals instead of a reflective
+`dataclasses.asdict` walk over every object.
+"""
+import dataclasses
+import datetime
+import decimal
+import enum
+import threading
+import types
+import typing
+import uuid
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from typing import Any, TypeAliasType, get_args, get_origin, get_type_hints
+
+type Encoder = Callable[[Any], Any]
+type Validator = Callable[[Any], Any]
+type Converter = Callable[[str], Any]
+
+_PRIMITIVES = (str, int, float, bool, types.NoneType)
+_LIST_TYPES = (list, tuple, set, frozenset, Sequence, Iterable)
+
+
+class ValidationError(ValueError):
+    """Raised when input does not satisfy a schema.
+
+    Attributes:
+        errors: One `{"field": ..., "message": ...}` entry per problem found
+    """
+
+    def __init__(self, errors: list[dict[str, str]]):
+        self.errors = errors
+        super().__init__("; ".join(f"{error['field']}: {error['message']}" for error in errors))
+
+
+@dataclasses.dataclass(frozen=True)
+class SchemaField:
+    name: str
+    type: Any
+    required: bool
+
+
+@dataclasses.dataclass(frozen=True)
+class Schema:
+    """The fields of a dataclass (or annotated class) with its compiled encoder."""
+    cls: type
+    fields: tuple[SchemaField, ...]
+    encode: Encoder
+
+    def validate(self, data: Mapping[str, Any]) -> dict[str, Any]:
+        """Select the schema's fields from data, checking that every required field is present.
+
+        Returns:
+            Keyword arguments for constructing the class
+
+        Raises:
+            ValidationError: When required fields are missing
+        """
+        values = {}
+        errors = []
+        for field in self.fields:
+            if field.name in data:
+                values[field.name] = data[field.name]
+            elif field.required:
+                errors.append({"field": field.name, "message": "Field required"})
+
+        if errors:
+            raise ValidationError(errors)
+
+        return values
+
+
+_schemas: dict[type, Schema] = {}
+_encoders: dict[Any, Encoder] = {}
+_validators: dict[Any, Validator] = {}
+_converters: dict[Any, Converter] = {}
+_lock = threading.RLock()
+
+
+def schema_for(cls: type) -> Schema:
+    """Return the compiled schema for a class, building it on first use."""
+    try:
+        return _schemas[cls]
+    except KeyError:
+        pass
+
+    with _lock:
+        if cls not in _schemas:
+            _schemas[cls] = Schema(cls, _schema_fields(cls), compile_encoder(cls))
+
+        return _schemas[cls]
+
+
+def compile_encoder(tp: Any) -> Encoder:
+    """Return a function converting values of type tp into JSON-compatible builtins.
+
+    Dataclasses become dicts, enums their values, dates ISO strings, UUIDs and decimals strings
+    and sets lists, recursively through lists, tuples, dicts and optionals. Types that hold only
+    JSON builtins compile to the identity function. Where the annotation calls for a dataclass,
+    enum, date, UUID or decimal, values of another type (such as a dict or an already formatted
+    string) are converted by inspecting them at runtime.
+    """
+    try:
+        return _encoders[tp]
+    except KeyError:
+        pass
+
+    with _lock:
+        if tp not in _encoders:
+            compiler = _Compiler()
+            expression = compiler.expression(tp, "value")
+            _encoders[tp] = compiler.build("encode", expression or "value")
+
+        return _encoders[tp]
+
+
+def to_builtins(value: Any) -> Any:
+    """Convert a value to JSON-compatible builtins by inspecting it at runtime."""
+    match value:
+        case str() | int() | float() | bool() | None:
+            return value
+        case enum.Enum():
+            return value.value
+        case dict():
+            return {_encode_key(key): to_builtins(item) for key, item in value.items()}
+        case list() | tuple() | set() | frozenset():
+            return [to_builtins(item) for item in value]
+        case datetime.date() | datetime.time():
+            return value.isoformat()
+        case uuid.UUID() | decimal.Decimal():
+            return str(value)
+        case _ if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            return compile_encoder(type(value))(value)
+        case _:
+            return value
+
+
+def _encode_key(key: Any) -> Any:
+    match key:
+        case str():
+            return key
+        case enum.Enum():
+            return key.value
+        case _:
+            return str(key)
+
+
+def compile_validator(tp: Any) -> Validator:
+    """Return a function that checks decoded JSON against type tp and converts it.
+
+    Dataclasses and TypedDicts are built from objects, enums from their values, and dates,
+    times, UUIDs and decimals from strings. Every problem is reported, with the path to the
+    offending value as the field name.
+
+    Raises:
+        ValidationError: From the returned function when the value does not match
+    """
+    try:
+        return _validators[tp]
+    except KeyError:
+        pass
+
+    with _lock:
+        if tp not in _validators:
+            check = _build_check(tp, {})
+
+            def validate(value: Any) -> Any:
+                errors: list[dict[str, str]] = []
+                result = check(value, "", errors)
+                if errors:
+                    raise ValidationError(errors)
+
+                return result
+
+            _validators[tp] = validate
+
+        return _validators[tp]
+
+
+# Checks take the value, its path and the error list, returning the converted value
+type _Check = Callable[[Any, str, list[dict[str, str]]], Any]
+
+_INVALID = object()
+
+
+def _error(errors: list[dict[str, str]], path: str, message: str) -> object:
+    errors.append({"field": path or "body", "message": message})
+    return _INVALID
+
+
+def _join(path: str, key: Any) -> str:
+    return f"{path}.{key}" if path else str(key)
+
+
+def _build_check(tp: Any, building: dict[Any, _Check]) -> _Check:
+    if tp in building:
+        # Recursive types resolve the check once it has been built
+        return lambda value, path, errors: building[tp](value, path, errors)
+
+    if isinstance(tp, TypeAliasType):
+        return _build_check(tp.__value__, building)
+
+    origin = get_origin(tp)
+    args = get_args(tp)
+    if isinstance(origin, TypeAliasType):
+        return _build_check(args[0] if args else origin.__value__, building)
+
+    if origin is typing.Annotated:
+        return _build_check(args[0], building)
+
+    if isinstance(tp, typing.TypeVar) or tp is Any or tp is object:
+        return lambda value, path, errors: value
+
+    if tp is None or tp is types.NoneType:
+        return lambda value, path, errors: None if value is None else _error(errors, path, "Expected null")
+
+    if tp in _SCALAR_CHECKS:
+        return _SCALAR_CHECKS[tp]
+
+    if origin in (typing.Union, types.UnionType):
+        return _union_check(args, building)
+
+    if origin is typing.Literal:
+        allowed = args
+        return lambda value, path, errors: (
+            value if value in allowed else _error(errors, path, f"Expected one of {list(allowed)}")
+        )
+
+    if origin in (dict, Mapping) or tp is dict:
+        return _mapping_check(args[1] if args else Any, building)
+
+    if origin in _LIST_TYPES or tp in _LIST_TYPES:
+        return _sequence_check(origin or tp, args, building)
+
+    if isinstance(tp, type):
+        if issubclass(tp, enum.Enum):
+            return _conversion_check(tp, f"Expected one of {[member.value for member in tp]}")
+        if issubclass(tp, (datetime.date, datetime.time)):
+            return _conversion_check(tp.fromisoformat, "Expected an ISO 8601 string", strings_only=True)
+        if issubclass(tp, uuid.UUID):
+            return _conversion_check(tp, "Expected a UUID", strings_only=True)
+        if issubclass(tp, decimal.Decimal):
+            return _conversion_check(lambda value: tp(str(value)), "Expected a decimal number")
+        if dataclasses.is_dataclass(tp) or typing.is_typeddict(tp):
+            return _object_check(tp, building)
+
+    return lambda value, path, errors: value
+
+
+def _scalar_check(accepts: Callable[[Any], bool], convert: Callable[[Any], Any], message: str) -> _Check:
+    def check(value: Any, path: str, errors: list[dict[str, str]]) -> Any:
+        return convert(value) if accepts(value) else _error(errors, path, message)
+
+    return check
+
+
+_SCALAR_CHECKS: dict[type, _Check] = {
+    str: _scalar_check(lambda value: isinstance(value, str), str, "Expected a string"),
+    bool: _scalar_check(lambda value: isinstance(value, bool), bool, "Expected a boolean"),
+    int: _scalar_check(lambda value: isinstance(value, int) and not isinstance(value, bool), int, "Expected an integer"),
+    float: _scalar_check(
+        lambda value: isinstance(value, (int, float)) and not isinstance(value, bool), float, "Expected a number"
+    ),
+}
+
+
+def _conversion_check(convert: Callable[[Any], Any], message: str, strings_only: bool = False) -> _Check:
+    def check(value: Any, path: str, errors: list[dict[str, str]]) -> Any:
+        if strings_only and not isinstance(value, str):
+            return _error(errors, path, message)
+
+        try:
+            return convert(value)
+        except (ValueError, TypeError, ArithmeticError):
+            return _error(errors, path, message)
+
+    return check
+
+
+def _union_check(members: tuple[Any, ...], building: dict[Any, _Check]) -> _Check:
+    nullable = any(member in (None, types.NoneType) for member in members)
+    checks = [_build_check(member, building) for member in members if member not in (None, types.NoneType)]
+
+    def check(value: Any, path: str, errors: list[dict[str, str]]) -> Any:
+        if value is None and nullable:
+            return None
+
+        attempts = []
+        for member_check in checks:
+            member_errors: list[dict[str, str]] = []
+            result = member_check(value, path, member_errors)
+            if not member_errors:
+                return result
+
+            attempts.append(member_errors)
+
+        if len(attempts) == 1:
+            # A single non-null member reports its own, more specific errors
+            errors.extend(attempts[0])
+            return _INVALID
+
+        return _error(errors, path, "Value does not match any of the allowed types")
+
+    return check
+
+
+def _mapping_check(item_type: Any, building: dict[Any, _Check]) -> _Check:
+    item_check = _build_check(item_type, building)
+
+    def check(value: Any, path: str, errors: list[dict[str, str]]) -> Any:
+        if not isinstance(value, dict):
+            return _error(errors, path, "Expected an object")
+
+        return {key: item_check(item, _join(path, key), errors) for key, item in value.items()}
+
+    return check
+
+
+def _sequence_check(origin: Any, args: tuple[Any, ...], building: dict[Any, _Check]) -> _Check:
+    if origin is tuple and args and (len(args) != 2 or args[1] is not Ellipsis):
+        # Fixed-size tuples have a type per position
+        position_checks = [_build_check(arg, building) for arg in args]
+
+        def check_fixed(value: Any, path: str, errors: list[dict[str, str]]) -> Any:
+            if not isinstance(value, list) or len(value) != len(position_checks):
+                return _error(errors, path, f"Expected an array of {len(position_checks)} items")
+
+            return tuple(
+                position_check(item, f"{path}[{index}]", errors)
+                for index, (position_check, item) in enumerate(zip(position_checks, value, strict=True))
+            )
+
+        return check_fixed
+
+    item_check = _build_check(args[0] if args else Any, building)
+    collection = origin if origin in (tuple, set, frozenset) else list
+
+    def check(value: Any, path: str, errors: list[dict[str, str]]) -> Any:
+        if not isinstance(value, list):
+            return _error(errors, path, "Expected an array")
+
+        items = [item_check(item, f"{path}[{index}]", errors) for index, item in enumerate(value)]
+        if collection is list:
+            return items
+
+        try:
+            return collection(items)
+        except TypeError:
+            return _error(errors, path, "Expected an array of hashable values")
+
+    return check
+
+
+def _object_check(cls: type, building: dict[Any, _Check]) -> _Check:
+    fields: list[tuple[str, bool, _Check]] = []
+    is_typeddict = typing.is_typeddict(cls)
+
+    def check(value: Any, path: str, errors: list[dict[str, str]]) -> Any:
+        if not isinstance(value, dict):
+            return _error(errors, path, "Expected an object")
+
+        values = {}
+        error_count = len(errors)
+        for name, required, field_check in fields:
+            field_path = _join(path, name)
+            if name in value:
+                values[name] = field_check(value[name], field_path, errors)
+            elif required:
+                _error(errors, field_path, "Field required")
+
+        if len(errors) > error_count:
+            return _INVALID
+
+        return values if is_typeddict else cls(**values)
+
+    building[cls] = check
+    for field in schema_for(cls).fields:
+        fields.append((field.name, field.required, _build_check(field.type, building)))
+
+    return check
+
+
+def compile_converter(tp: Any) -> Converter:
+    """Return a function that converts a string from a form, query string or header to type tp.
+
+    Numbers, bools ("true"/"false", "1"/"0", "yes"/"no", "on"/"off"), enums (by value or
+    name), literals, dates and times (ISO 8601), UUIDs and decimals are parsed. Optional types
+    turn empty strings into None, and other types such as `str` or `UploadFile` pass values
+    through unchanged. Converters are built once per type.
+
+    Raises:
+        ValueError: From the returned function with a message describing the expected value
+    """
+    try:
+        return _converters[tp]
+    except KeyError:
+        pass
+
+    with _lock:
+        if tp not in _converters:
+            _converters[tp] = _build_converter(tp)
+
+        return _converters[tp]
+
+
+def sequence_item_type(tp: Any) -> Any | None:
+    """The item type when tp is a list, tuple, set or sequence of values, otherwise None."""
+    tp = _unwrap(tp)
+    origin = get_origin(tp)
+    if origin in _LIST_TYPES:
+        args = get_args(tp)
+        return args[0] if args else str
+
+    if tp in _LIST_TYPES:
+        return str
+
+    return None
+
+
+def _unwrap(tp: Any) -> Any:
+    while True:
+        if isinstance(tp, TypeAliasType):
+            tp = tp.__value__
+        elif isinstance(get_origin(tp), TypeAliasType):
+            args = get_args(tp)
+            tp = args[0] if args else get_origin(tp).__value__
+        elif get_origin(tp) is typing.Annotated:
+            tp = get_args(tp)[0]
+        else:
+            return tp
+
+
+_TRUE = frozenset({"true", "1", "yes", "on"})
+_FALSE = frozenset({"false", "0", "no", "off", ""})
+
+
+def _parse_bool(value: str) -> bool:
+    lowered = value.strip().lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+
+    raise ValueError("Expected a boolean")
+
+
+def _parsing(parse: Callable[[str], Any], message: str) -> Converter:
+    def convert(value: str) -> Any:
+        try:
+            return parse(value)
+        except (ValueError, TypeError, LookupError, ArithmeticError):
+            raise ValueError(message) from None
+
+    return convert
+
+
+def _build_converter(tp: Any) -> Converter:
+    tp = _unwrap(tp)
+    origin = get_origin(tp)
+    if origin in (typing.Union, types.UnionType):
+        members = [member for member in get_args(tp) if member not in (None, types.NoneType)]
+        converters = [compile_converter(member) for member in members]
+        nullable = len(members) < len(get_args(tp))
+
+        def convert_union(value: str) -> Any:
+            if nullable and value == "":
+                return None
+
+            for convert in converters:
+                try:
+                    return convert(value)
+                except ValueError as exc:
+                    error = exc
+
+            raise error
+
+        return convert_union
+
+    if origin is typing.Literal:
+        choices = {str(choice.value if isinstance(choice, enum.Enum) else choice): choice for choice in get_args(tp)}
+        return _parsing(choices.__getitem__, f"Expected one of {list(choices)}")
+
+    if tp is bool:
+        return _parse_bool
+
+    if tp is int:
+        return _parsing(int, "Expected an integer")
+
+    if tp is float:
+        return _parsing(float, "Expected a number")
+
+    if isinstance(tp, type):
+        if issubclass(tp, enum.Enum):
+            members = {str(member.value): member for member in tp} | {member.name: member for member in tp}
+            return _parsing(members.__getitem__, f"Expected one of {[str(member.value) for member in tp]}")
+        if issubclass(tp, (datetime.date, datetime.time)):
+            return _parsing(tp.fromisoformat, "Expected an ISO 8601 value")
+        if issubclass(tp, uuid.UUID):
+            return _parsing(tp, "Expected a UUID")
+        if issubclass(tp, decimal.Decimal):
+            return _parsing(tp, "Expected a decimal number")
+
+    return lambda value: value
+
+
+def _schema_fields(cls: type) -> tuple[SchemaField, ...]:
+    hints = _type_hints(cls)
+    if typing.is_typeddict(cls):
+        return tuple(SchemaField(name, hint, name in cls.__required_keys__) for name, hint in hints.items())
+
+    if dataclasses.is_dataclass(cls):
+        return tuple(
+            SchemaField(
+                field.name,
+                hints.get(field.name, Any),
+                field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING,
+            )
+            for field in dataclasses.fields(cls)
+            if field.init
+        )
+
+    return tuple(
+        SchemaField(name, hints.get(name, Any), not hasattr(cls, name))
+        for name, annotation in vars(cls).get("__annotations__", {}).items()
+        if get_origin(annotation) is not typing.ClassVar and annotation is not typing.ClassVar
+    )
+
+
+def _type_hints(cls: type) -> dict[str, Any]:
+    try:
+        return get_type_hints(cls)
+    except Exception:
+        # Unresolvable forward references fall back to runtime conversion for those fields
+        return {}
+
+
+class _Compiler:
+    """Generates the source of an encoder, one function per dataclass so recursive types work."""
+
+    def __init__(self):
+        self.namespace: dict[str, Any] = {"_to_builtins": to_builtins, "_encode_key": _encode_key}
+        self.sources: list[str] = []
+        self.functions: dict[type, str] = {}
+        self.classes: dict[type, str] = {}
+        self.depth = 0
+
+    def build(self, name: str, expression: str) -> Encoder:
+        self.sources.append(f"def {name}(value):\n    return {expression}\n")
+        exec("\n".join(self.sources), self.namespace)
+        return self.namespace[name]
+
+    def expression(self, tp: Any, value: str) -> str | None:
+        """Return an expression converting `value` of type tp, or None when no conversion is needed."""
+        if isinstance(tp, TypeAliasType):
+            return self.expression(tp.__value__, value)
+
+        origin = get_origin(tp)
+        if isinstance(origin, TypeAliasType):
+            # Parameterised aliases such as JSON[T] are treated as the type they wrap
+            return self.expression(get_args(tp)[0] if get_args(tp) else origin.__value__, value)
+
+        if origin is typing.Annotated:
+            return self.expression(get_args(tp)[0], value)
+
+        if isinstance(tp, typing.TypeVar):
+            return self.expression(tp.__default__ if tp.has_default() else Any, value)
+
+        # Bare containers are passed through as they are, like untyped JSON results
+        if tp is Any or tp in _PRIMITIVES or tp is None or tp in (dict, list):
+            return None
+
+        if origin in (typing.Union, types.UnionType):
+            return self._union(get_args(tp), value)
+
+        if origin in (dict, Mapping):
+            return self._mapping(get_args(tp), value)
+
+        if origin in _LIST_TYPES or tp in _LIST_TYPES[2:]:
+            return self._sequence(origin or tp, get_args(tp), value)
+
+        if isinstance(tp, type):
+            if issubclass(tp, enum.Enum):
+                return self._guarded(tp, f"{value}.value", value)
+            if issubclass(tp, (datetime.date, datetime.time)):
+                return self._guarded(tp, f"{value}.isoformat()", value)
+            if issubclass(tp, (uuid.UUID, decimal.Decimal)):
+                return self._guarded(tp, f"str({value})", value)
+            if dataclasses.is_dataclass(tp):
+                return f"{self._dataclass(tp)}({value})"
+
+        return f"_to_builtins({value})"
+
+    def _union(self, members: tuple[Any, ...], value: str) -> str | None:
+        others = [member for member in members if member not in (None, types.NoneType)]
+        if len(others) == 1:
+            inner = self.expression(others[0], value)
+            return None if inner is None else f"(None if {value} is None else {inner})"
+
+        if all(self.expression(member, value) is None for member in others):
+            return None
+
+        return f"_to_builtins({value})"
+
+    def _mapping(self, args: tuple[Any, ...], value: str) -> str:
+        key_type, item_type = args or (Any, Any)
+        key, item = self._names()
+        key_expression = key if key_type is str else f"_encode_key({key})"
+        item_expression = self.expression(item_type, item) or item
+        if key_expression == key and item_expression == item:
+            return value
+
+        return f"{{{key_expression}: {item_expression} for {key}, {item} in {value}.items()}}"
+
+    def _sequence(self, origin: Any, args: tuple[Any, ...], value: str) -> str | None:
+        item_type = Any if not args or (origin is tuple and len(args) != 2) else args[0]
+        if origin is tuple and len(args) > 1 and args[1] is not Ellipsis:
+            # Fixed-size tuples have a type per position
+            return f"_to_builtins({value})"
+
+        item, _ = self._names()
+        item_expression = self.expression(item_type, item)
+        if item_expression is not None:
+            return f"[{item_expression} for {item} in {value}]"
+
+        return None if origin in (list, tuple) else f"list({value})"
+
+    def _dataclass(self, cls: type) -> str:
+        if cls in self.functions:
+            return self.functions[cls]
+
+        name = self.functions[cls] = f"_encode_{len(self.functions)}_{cls.__name__}"
+        hints = _type_hints(cls)
+        items = []
+        for field in dataclasses.fields(cls):
+            attribute = f"obj.{field.name}"
+            expression = self.expression(hints.get(field.name, Any), attribute)
+            if field.name not in hints:
+                expression = f"_to_builtins({attribute})"
+            items.append(f"{field.name!r}: {expression or attribute}")
+
+        self.sources.append(
+            f"def {name}(obj):\n"
+            f"    if not isinstance(obj, {self._class(cls)}):\n"
+            f"        return _to_builtins(obj)\n"
+            f"    return {{{', '.join(items)}}}\n"
+        )
+        return name
+
+    def _guarded(self, tp: type, expression: str, value: str) -> str:
+        return f"({expression} if isinstance({value}, {self._class(tp)}) else _to_builtins({value}))"
+
+    def _class(self, cls: type) -> str:
+        if cls not in self.classes:
+            self.classes[cls] = f"_{cls.__name__}_{len(self.classes)}"
+            self.namespace[self.classes[cls]] = cls
+
+        return self.classes[cls]
+
+    def _names(self) -> tuple[str, str]:
+        self.depth += 1
+        return f"k{self.depth}", f"v{self.depth}"
@@ -1,45 +1,85 @@
 import importlib
+import inspect
 import os
 from dataclasses import dataclass
 from inspect import get_annotations
 from pathlib import Path
-from typing import Generator
+from typing import Generator, get_args, get_origin
 
 import starlette.responses
 from bevy import get_container, get_registry
 from starlette.applications import Starlette
 from starlette.exceptions import HTTPException
 from starlette.middleware import Middleware
+from starlette.requests import Request
 from starlette.routing import Mount, Route
-from starlette.templating import Jinja2Templates
 from starlette.staticfiles import StaticFiles
 
 import serving.types
 from serving.auth import AuthConfig, AuthConfigurationError, CredentialProvider
+from serving.batch import CREDENTIAL_CHECKS_SCOPE_KEY, BatchConfig, BatchHandler
 from serving.config import Config, ConfigModel
+from serving.encoding import NDJSON_MEDIA_TYPE, JSONConfig, JSONEncoder, encode_json_stream, wants_json_array
 from serving.error_handler import ErrorHandler
 from serving.exception_handlers import http_exception_handler, general_exception_handler, not_found_handler
 from serving.exception_middleware import ExceptionMiddleware
-from serving.injectors import (
-    handle_config_model_types,
-    handle_cookie_types,
-    handle_header_types,
-    handle_path_param_types,
-    handle_query_param_types,
-    handle_form_types,
-    handle_session_types,
-    handle_session_param_types,
-)
-from serving.router import RouterConfig, Router
+from serving.form_parser import FormsConfig
+from serving.injectors import handle_serving_types
+from serving.msgpack_codec import MSGPACK_MEDIA_TYPE, encode_msgpack, wants_msgpack
+from serving.resolution import EndpointPlan
+from serving.router import RouteConfig, RouterConfig, Router
+from serving.schema import compile_encoder
 from serving.session import SessionConfig, SessionProvider, Session
 from serving.serv_middleware import ServMiddleware
+from serving.sse import Broadcaster, SSEConfig, encode_event_stream
+from serving.streaming import bytes_response, file_response, start_streaming_response
+from serving.templating import (
+    BlockNotFoundError,
+    FragmentCache,
+    create_templates,
+    install_fragment_cache,
+    preload_templates,
+    render_block,
+    stream_template,
+)
 from serving.csrf_middleware import CSRFMiddleware
+from serving.decompression_middleware import DecompressionConfig, DecompressionMiddleware
+from serving.limits_middleware import LimitsConfig, LimitsMiddleware
 
 
 @dataclass
 class TemplatesConfig(ConfigModel, model_key="templates"):
-    """Configuration for templates."""
+    """Configuration for templates.
+
+    - directory: Directory containing the application's templates
+    - fragment_cache: Whether `{% cache %}` blocks are cached. If None, defaults to False in
+      dev and True otherwise so template edits show up immediately while developing.
+    - fragment_cache_size: Maximum number of rendered fragments kept in the LRU cache
+    - partial_header: Request header (e.g. "HX-Request") that makes `Jinja2` routes render only
+      `partial_block` instead of the full page. Disabled when None.
+    - partial_block: Block rendered for partial requests
+    - auto_reload: Whether templates are checked for changes on every lookup. If None, defaults
+      to True in dev and False otherwise.
+    - preload: Compile all HTML and Jinja2 templates at startup, failing fast on syntax errors.
+      If None, defaults to False in dev and True otherwise.
+    - bytecode_cache: Directory where compiled templates are cached and shared between workers
+    - cache_size: Number of compiled templates kept in memory per worker (-1 for unbounded)
+    - stream_flush_size: Minimum number of characters buffered before `Jinja2Stream` routes
+      send a chunk
+    - minify: Collapse whitespace and remove comments from `.html` templates when they are
+      compiled, leaving `<pre>`, `<textarea>`, `<script>` and `<style>` content untouched
+    """
     directory: str = "templates"
+    fragment_cache: bool | None = None
+    fragment_cache_size: int = 512
+    partial_header: str | None = None
+    partial_block: str = "content"
+    auto_reload: bool | None = None
+    preload: bool | None = None
+    bytecode_cache: str | None = None
+    cache_size: int = 400
+    stream_flush_size: int = 8192
+    minify: bool = False
 
 
 @dataclass
@@ -70,6 +110,12 @@ class ThemingConfig(ConfigModel, model_key="theming"):
     """Configuration for theming and custom error pages."""
     error_templates: dict[str, str] | None = None  # Maps error codes to template paths
     default_error_template: str | None = None  # Default template for all errors
+    # Rendered error pages without details kept for reuse. If None, 128 outside dev and
+    # disabled in dev so template edits show up immediately.
+    error_page_cache_size: int | None = None
+    # Custom error templates are only cached when they render the same page for every request
+    # to a host, without request paths, session or user data
+    cache_custom_error_pages: bool = False
 
 
 class ConfigurationError(Exception):
@@ -101,15 +147,8 @@ class Serv:
         """
         self.registry = get_registry()
 
-        # Register the config model handler
-        handle_config_model_types.register_hook(self.registry)
-        handle_cookie_types.register_hook(self.registry)
-        handle_header_types.register_hook(self.registry)
-        handle_path_param_types.register_hook(self.registry)
-        handle_query_param_types.register_hook(self.registry)
-        handle_form_types.register_hook(self.registry)
-        handle_session_types.register_hook(self.registry)
-        handle_session_param_types.register_hook(self.registry)
+        # One hook dispatches to the injector for each kind of dependency Serving handles
+        handle_serving_types.register_hook(self.registry)
 
         self.container = self.registry.create_container()
         with self.container:
@@ -126,8 +165,14 @@ class Serv:
             # Configure sessions (optional)
             self._configure_session()
 
-            self.templates = Jinja2Templates(directory=self.container.get(TemplatesConfig).directory)
-            self.container.add(self.templates)
+            self._configure_templates()
+
+            # Configure the Server-Sent Events broadcaster
+            self._configure_sse()
+
+            # Configure JSON response encoding
+            self._configure_json()
+            self._configure_forms()
 
             # Configure error handler with theming support
             try:
@@ -135,15 +180,24 @@ class Serv:
             except (KeyError, TypeError):
                 theming_config = None
 
+            error_page_cache_size = theming_config.error_page_cache_size if theming_config else None
+            if error_page_cache_size is None:
+                is_dev = getattr(self, 'environment', 'prod') in ('dev', 'development')
+                error_page_cache_size = 0 if is_dev else 128
+
             self.error_handler = ErrorHandler(
                 theming_config=theming_config,
-                templates=self.templates if theming_config else None
+                templates=self.templates if theming_config else None,
+                cache_size=error_page_cache_size,
             )
 
             self.app = Starlette(
                 routes=self._load_routes(),
                 middleware=[
                     Middleware(ExceptionMiddleware, serv=self),
+                    # Limits apply to the body as sent, decompression has limits of its own
+                    Middleware(LimitsMiddleware, config=self.container.get(LimitsConfig)),
+                    Middleware(DecompressionMiddleware, config=self.container.get(DecompressionConfig)),
                     Middleware(ServMiddleware, serv=self),
                     Middleware(CSRFMiddleware),
                 ],
@@ -177,6 +231,7 @@ class Serv:
 
     def _configure_session(self) -> None:
         """Configure session provider and register session type (if configured)."""
+        self.session_type = None
         try:
             session_config = self.container.get(SessionConfig)
         except (KeyError, ValueError, TypeError):
@@ -188,9 +243,65 @@ class Serv:
         kwargs = dict(session_config.config or {})
         provider = self.container.call(session_config.session_provider, **kwargs)
         self.container.add(SessionProvider, provider)
+        self.session_type = session_config.session_type or Session
 
         # Session type will be provided on-demand via injector; no need to pre-register
 
+    def _configure_templates(self) -> None:
+        """Create the application's Jinja2 templates and the `{% cache %}` fragment cache."""
+        self.templates_config = templates_config = self.container.get(TemplatesConfig)
+        is_dev = getattr(self, 'environment', 'prod') in ('dev', 'development')
+        auto_reload = templates_config.auto_reload
+        if auto_reload is None:
+            auto_reload = is_dev
+
+        self.templates = create_templates(
+            templates_config.directory,
+            auto_reload=auto_reload,
+            cache_size=templates_config.cache_size,
+            bytecode_cache=templates_config.bytecode_cache,
+            minify=templates_config.minify,
+        )
+        self.container.add(self.templates)
+
+        enabled = templates_config.fragment_cache
+        if enabled is None:
+            enabled = not is_dev
+
+        self.fragment_cache = install_fragment_cache(
+            self.templates.env,
+            FragmentCache(max_size=templates_config.fragment_cache_size, enabled=enabled),
+        )
+        self.container.add(self.fragment_cache)
+
+        preload = templates_config.preload
+        if preload is None:
+            preload = not is_dev
+
+        if preload and Path(templates_config.directory).is_dir():
+            preload_templates(self.templates.env)
+
+    def _configure_sse(self) -> None:
+        """Create the application-wide SSE broadcaster so endpoints can inject it."""
+        self.sse_config = self.container.get(SSEConfig)
+        self.broadcaster = Broadcaster(
+            queue_size=self.sse_config.queue_size,
+            replay_size=self.sse_config.replay_size,
+            slow_consumer=self.sse_config.slow_consumer,
+        )
+        self.container.add(self.broadcaster)
+
+    def _configure_json(self) -> None:
+        """Create the JSON encoder used for JSON routes and make it injectable."""
+        self.json_config = self.container.get(JSONConfig)
+        self.json_encoder = JSONEncoder.from_config(self.json_config)
+        self.container.add(self.json_config)
+        self.container.add(self.json_encoder)
+
+    def _configure_forms(self) -> None:
+        """Make the global form parsing limits injectable."""
+        self.container.add(self.container.get(FormsConfig))
+
     def _load_configuration(self, working_directory: str | Path | None) -> None:
         """Load configuration from the specified working directory or in the current working directory. Which config
         file is loaded is determined by the environment setting..
@@ -215,6 +326,10 @@ class Serv:
 
     def _load_routes(self) -> list[Route]:
         routes = []
+        batch_config = self.container.get(BatchConfig)
+        if batch_config.path:
+            routes.append(Route(batch_config.path, BatchHandler(self, batch_config).handle, methods=["POST"]))
+
         try:
             routers = self.container.get(list[RouterConfig])
         except (KeyError, ValueError):
@@ -294,11 +409,36 @@ class Serv:
         module = importlib.import_module(module_name)
         return getattr(module, router_name)
 
+    @staticmethod
+    def _has_credentials(request: Request, permissions: set[str]) -> bool:
+        """Check the route's permissions, reusing results from earlier sub-requests of a batch."""
+        checks = request.scope.get(CREDENTIAL_CHECKS_SCOPE_KEY)
+        key = frozenset(permissions)
+        if checks is not None and key in checks:
+            return checks[key]
+
+        credential_provider = get_container().get(CredentialProvider)
+        allowed = get_container().call(credential_provider.has_credentials, permissions)
+        if checks is not None:
+            checks[key] = allowed
+
+        return allowed
+
     def _wrap_endpoint(self, endpoint, route_config):
+        return_type = get_annotations(endpoint).get("return")
+        convert_json = None
+        if get_origin(return_type) is serving.types.JSON:
+            # JSON[T] results are converted by an encoder generated once for T
+            convert_json = compile_encoder(get_args(return_type)[0])
+            return_type = serving.types.JSON
+
+        # Parameters are classified once here, each request then resolves them directly on its own
+        # loop, which also converts path params and parameters with defaults the container skips
+        plan = EndpointPlan(endpoint, route_config, self.json_config)
+
         async def wrapped_endpoint(request):
             permissions = set() if route_config is None else route_config.permissions
-            credential_provider = get_container().get(CredentialProvider)
-            if not get_container().call(credential_provider.has_credentials, permissions):
+            if not self._has_credentials(request, permissions):
                 # Only show permission details in development mode
                 details = None
                 if hasattr(self, 'environment') and self.environment in ('dev', 'development'):
@@ -311,22 +451,140 @@ class Serv:
                     details=details
                 )
 
-            result = await get_container().call(endpoint, **request.path_params)
-            match get_annotations(endpoint)["return"]:
+            if route_config is not None:
+                # Injectors read per-route settings such as max_body_size from the container
+                get_container().add(RouteConfig, route_config)
+
+            container = get_container()
+            arguments = await plan.arguments(request, container)
+
+            if get_origin(return_type) is serving.types.Stream:
+                # Async generator endpoints are iterated by the response rather than awaited
+                chunks = plan.call(container, arguments)
+                media_type = "text/plain" if get_args(return_type)[0] is str else "application/octet-stream"
+                return await start_streaming_response(chunks, media_type)
+
+            if return_type is serving.types.JSONStream:
+                records = plan.call(container, arguments)
+                if inspect.isawaitable(records):
+                    # Plain async endpoints may return an async iterator instead of yielding
+                    records = await records
+
+                as_array = wants_json_array(request.headers.get("accept"))
+                return await start_streaming_response(
+                    encode_json_stream(
+                        records,
+                        as_array=as_array,
+                        batch_size=self.json_config.stream_batch_size,
+                        encode=self.json_encoder.encode,
+                    ),
+                    "application/json" if as_array else NDJSON_MEDIA_TYPE,
+                    headers={"Vary": "Accept"},
+                )
+
+            if return_type is serving.types.SSE:
+                events = plan.call(container, arguments)
+                return await start_streaming_response(
+                    encode_event_stream(events, self.sse_config.heartbeat_interval),
+                    "text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                )
+
+            result = await plan.call(container, arguments)
+            match return_type:
                 case serving.types.PlainText:
                     return starlette.responses.PlainTextResponse(result)
 
                 case serving.types.JSON:
-                    return starlette.responses.JSONResponse(result)
+                    if not self.json_config.msgpack:
+                        return starlette.responses.Response(
+                            await self.json_encoder.encode_async(result, convert_json),
+                            media_type="application/json",
+                        )
+
+                    # The same value is sent as JSON or MessagePack depending on Accept
+                    headers = {"Vary": "Accept"}
+                    if wants_msgpack(request.headers.get("accept")):
+                        return starlette.responses.Response(
+                            await self.json_encoder.encode_async(result, convert_json, encode_msgpack),
+                            media_type=MSGPACK_MEDIA_TYPE,
+                            headers=headers,
+                        )
+
+                    return starlette.responses.Response(
+                        await self.json_encoder.encode_async(result, convert_json),
+                        media_type="application/json",
+                        headers=headers,
+                    )
 
                 case serving.types.HTML:
                     return starlette.responses.HTMLResponse(result)
 
+                case serving.types.Bytes:
+                    if isinstance(result, tuple):
+                        return bytes_response(*result)
+
+                    return bytes_response(result)
+
+                case serving.types.File:
+                    if isinstance(result, tuple):
+                        return file_response(*result)
+
+                    return file_response(result)
+
                 case serving.types.Jinja2:
+                    partial_header = self.templates_config.partial_header
+                    if partial_header is None:
+                        return self.templates.TemplateResponse(
+                            request,
+                            result[0],  # Template file
+                            result[1],  # Context data
+                        )
+
+                    # Partial and full renders share a URL, caches must key on the header
+                    headers = {"Vary": partial_header}
+                    if request.headers.get(partial_header):
+                        try:
+                            return starlette.responses.HTMLResponse(
+                                render_block(
+                                    self.templates,
+                                    request,
+                                    result[0],
+                                    self.templates_config.partial_block,
+                                    result[1],
+                                ),
+                                headers=headers,
+                            )
+                        except BlockNotFoundError:
+                            # Templates without the block are always rendered in full
+                            pass
+
                     return self.templates.TemplateResponse(
-                        request,
-                        result[0],  # Template file
-                        result[1],  # Context data
+                        request, result[0], result[1], headers=headers
+                    )
+
+                case serving.types.Jinja2Stream:
+                    # Errors raised before the first flush still render the normal error page
+                    return await start_streaming_response(
+                        stream_template(
+                            self.templates,
+                            request,
+                            result[0],  # Template file
+                            result[1],  # Context data
+                            flush_size=self.templates_config.stream_flush_size,
+                        ),
+                        "text/html",
+                    )
+
+                case serving.types.JinjaBlock:
+                    return starlette.responses.HTMLResponse(
+                        render_block(
+                            self.templates,
+                            request,
+                            result[0],  # Template file
+                            result[1],  # Block name
+                            result[2],  # Context data
+                        )
                     )
 
                 case _ if isinstance(result, starlette.responses.Response):
@@ -335,6 +593,15 @@ class Serv:
                 case _:
                     raise ValueError(f"Unsupported return type: {type(result)}")
 
+        # CSRFMiddleware checks the tokens of these forms before the endpoint is reached
+        wrapped_endpoint.__form_types__ = plan.form_types
+        # LimitsMiddleware lets the route's max_body_size replace the global limit
+        wrapped_endpoint.__route_config__ = route_config
+        # Batches reject streaming routes, their responses only end when the client disconnects
+        wrapped_endpoint.__streaming__ = (
+            return_type in (serving.types.SSE, serving.types.JSONStream)
+            or get_origin(return_type) is serving.types.Stream
+        )
         return wrapped_endpoint
 
     @staticmethod
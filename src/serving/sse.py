@@ -0,0 +1,236 @@
+"""Server-Sent Events support and a fan-out broadcaster for pushing events to many clients."""
+import asyncio
+import contextvars
+import json
+import logging
+import re
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from serving.config import ConfigModel
+
+type SlowConsumerPolicy = Literal["drop_oldest", "disconnect"]
+
+# The only line breaks in the event stream format, str.splitlines() also splits on others
+_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+
+@dataclass
+class SSEConfig(ConfigModel, model_key="sse"):
+    """Configuration for Server-Sent Events.
+
+    - heartbeat_interval: Seconds without events before a keep-alive comment is sent
+    - queue_size: Events buffered per subscriber before the slow consumer policy applies
+    - replay_size: Events kept per channel for `Last-Event-ID` replay
+    - slow_consumer: "drop_oldest" discards the subscriber's oldest queued event, "disconnect"
+      ends the subscriber's stream so the client reconnects and catches up through replay
+    """
+    heartbeat_interval: float = 15.0
+    queue_size: int = 100
+    replay_size: int = 100
+    slow_consumer: SlowConsumerPolicy = "drop_oldest"
+
+
+@dataclass
+class ServerSentEvent:
+    """A single event in a `text/event-stream` response.
+
+    Raises:
+        ValueError: When event or id contain a line break, which would start another field
+    """
+    data: str = ""
+    event: str | None = None
+    id: str | None = None
+    retry: int | None = None
+
+    def __post_init__(self):
+        for name in ("event", "id"):
+            value = getattr(self, name)
+            if value is not None and _LINE_BREAK.search(value):
+                raise ValueError(f"Server-sent event {name} cannot contain line breaks: {value!r}")
+
+    def encode(self) -> bytes:
+        lines = []
+        if self.event is not None:
+            lines.append(f"event: {self.event}")
+        if self.id is not None:
+            lines.append(f"id: {self.id}")
+        if self.retry is not None:
+            lines.append(f"retry: {self.retry}")
+        # Multi-line payloads are sent as consecutive data fields, which clients rejoin with "\n"
+        lines.extend(f"data: {line}" for line in _LINE_BREAK.split(self.data))
+        return ("\n".join(lines) + "\n\n").encode()
+
+    @classmethod
+    def from_value(cls, value: Any) -> "ServerSentEvent":
+        """Convert values yielded by SSE endpoints: events pass through, strings become the event
+        data and anything else is sent as compact JSON."""
+        match value:
+            case ServerSentEvent():
+                return value
+            case str():
+                return cls(data=value)
+            case _:
+                return cls(data=json.dumps(value, separators=(",", ":")))
+
+
+@dataclass(eq=False)
+class _Subscriber:
+    queue: asyncio.Queue
+    disconnected: bool = False
+
+
+@dataclass
+class _Channel:
+    replay: deque
+    subscribers: set = field(default_factory=set)
+    next_id: int = 1
+    producer: Callable[[], AsyncIterator[Any]] | None = None
+    producer_task: asyncio.Task | None = None
+
+
+class Broadcaster:
+    """Fans events out from publishers to every subscriber of a channel.
+
+    Each subscriber has its own bounded queue so a slow client never blocks publishing or other
+    clients. Recent events are kept in a per-channel ring buffer and replayed to clients that
+    reconnect with a `Last-Event-ID`. All methods must be called from the event loop.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 100,
+        replay_size: int = 100,
+        slow_consumer: SlowConsumerPolicy = "drop_oldest",
+    ):
+        self.queue_size = queue_size
+        self.replay_size = replay_size
+        self.slow_consumer = slow_consumer
+        self._channels: dict[str, _Channel] = {}
+
+    def subscriber_count(self, channel: str) -> int:
+        return len(self._channel(channel).subscribers)
+
+    def set_producer(self, channel: str, producer: Callable[[], AsyncIterator[Any]]) -> None:
+        """Attach an upstream producer to a channel.
+
+        The producer is started when the channel gains its first subscriber, everything it yields
+        is published to the channel, and it is cancelled once the last subscriber leaves. This lets
+        any number of clients share a single upstream poll or feed.
+        """
+        self._channel(channel).producer = producer
+
+    def publish(self, channel: str, data: Any, event: str | None = None) -> ServerSentEvent:
+        """Publish to every current subscriber of the channel and record it for replay."""
+        state = self._channel(channel)
+        message = ServerSentEvent.from_value(data)
+        if event is not None:
+            message.event = event
+        message.id = str(state.next_id)
+        state.next_id += 1
+        state.replay.append(message)
+
+        for subscriber in state.subscribers:
+            self._deliver(subscriber, message)
+
+        return message
+
+    async def subscribe(self, channel: str, last_event_id: str | None = None) -> AsyncIterator[ServerSentEvent]:
+        """Yield the channel's events until the consumer stops iterating or is disconnected.
+
+        Events recorded after `last_event_id` are replayed first when it is given.
+        """
+        state = self._channel(channel)
+        subscriber = _Subscriber(asyncio.Queue(maxsize=self.queue_size))
+        for message in self._replay(state, last_event_id):
+            self._deliver(subscriber, message)
+
+        state.subscribers.add(subscriber)
+        if state.producer is not None and (state.producer_task is None or state.producer_task.done()):
+            # Run in a fresh context so the shared producer does not hold on to the first
+            # subscriber's request container
+            state.producer_task = asyncio.get_running_loop().create_task(
+                self._run_producer(channel, state.producer), context=contextvars.Context()
+            )
+
+        try:
+            while not subscriber.disconnected:
+                yield await subscriber.queue.get()
+        finally:
+            state.subscribers.discard(subscriber)
+            if not state.subscribers and state.producer_task is not None:
+                state.producer_task.cancel()
+                state.producer_task = None
+
+    def _channel(self, channel: str) -> _Channel:
+        try:
+            return self._channels[channel]
+        except KeyError:
+            state = self._channels[channel] = _Channel(replay=deque(maxlen=self.replay_size))
+            return state
+
+    def _deliver(self, subscriber: _Subscriber, message: ServerSentEvent) -> None:
+        if subscriber.disconnected:
+            return
+
+        if subscriber.queue.full():
+            if self.slow_consumer == "disconnect":
+                subscriber.disconnected = True
+                return
+
+            subscriber.queue.get_nowait()
+
+        subscriber.queue.put_nowait(message)
+
+    @staticmethod
+    def _replay(state: _Channel, last_event_id: str | None) -> list[ServerSentEvent]:
+        if last_event_id is None:
+            return []
+
+        try:
+            last_id = int(last_event_id)
+        except ValueError:
+            return []
+
+        return [message for message in state.replay if int(message.id) > last_id]
+
+    async def _run_producer(self, channel: str, producer: Callable[[], AsyncIterator[Any]]) -> None:
+        try:
+            async for data in producer():
+                self.publish(channel, data)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logging.getLogger("serving.sse").error("Producer for channel %r failed", channel, exc_info=True)
+
+
+async def encode_event_stream(events: AsyncIterator[Any], heartbeat_interval: float) -> AsyncIterator[bytes]:
+    """Encode the values yielded by an SSE endpoint, sending keep-alive comments while idle."""
+    pending = asyncio.ensure_future(anext(events))
+    # Let the endpoint run up to its first suspension so headers it sets before waiting on
+    # events are in place when the response starts with the comment below
+    await asyncio.sleep(0)
+    try:
+        yield b": connected\n\n"
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=heartbeat_interval)
+            if not done:
+                yield b": ping\n\n"
+                continue
+
+            try:
+                value = pending.result()
+            except StopAsyncIteration:
+                return
+
+            yield ServerSentEvent.from_value(value).encode()
+            pending = asyncio.ensure_future(anext(events))
+    finally:
+        if not pending.done():
+            pending.cancel()
+            with suppress(asyncio.CancelledError, StopAsyncIteration):
+                await pending
+        await events.aclose()
@@ -0,0 +1,98 @@
+"""Helpers for responses whose bodies are produced incrementally or passed through unencoded."""
+import os
+from collections.abc import AsyncIterator, Iterator
+from typing import BinaryIO
+
+from starlette.concurrency import iterate_in_threadpool
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+_EMPTY = object()
+
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+async def start_streaming_response(
+    chunks: AsyncIterator[str | bytes],
+    media_type: str,
+    headers: dict[str, str] | None = None,
+) -> StreamingResponse:
+    """Create a streaming response after pulling the first chunk from the iterator.
+
+    Starting the iterator before the response exists means `set_header`/`set_status_code` calls
+    made while producing the first chunk are applied by `ServMiddleware`, and errors raised
+    before anything is yielded become regular error pages instead of truncated bodies.
+    """
+    try:
+        first = await anext(chunks)
+    except StopAsyncIteration:
+        first = _EMPTY
+
+    return StreamingResponse(_resume(first, chunks), media_type=media_type, headers=headers)
+
+
+def bytes_response(data: bytes | bytearray | memoryview, media_type: str | None = None) -> Response:
+    """Send a binary buffer as the response body without copying it.
+
+    Mutable and sliced buffers are passed on as byte-format memoryviews of the original memory,
+    so the buffer must not be modified until the response has been sent.
+    """
+    if isinstance(data, bytearray):
+        data = memoryview(data)
+    elif isinstance(data, memoryview):
+        # Length and Content-Length must be counted in bytes, not items of the view's format
+        data = data.cast("B") if data.contiguous else data.tobytes()
+
+    return Response(data, media_type=media_type or "application/octet-stream")
+
+
+def file_response(file: str | os.PathLike[str] | BinaryIO, media_type: str | None = None) -> Response:
+    """Send a file from a path or an open binary file object.
+
+    Paths are sent by `FileResponse`, which supports range requests and lets servers that
+    implement the pathsend extension use sendfile. Open files are read in the threadpool in
+    chunks from their current position and closed once the response ends.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        return FileResponse(file, media_type=media_type)
+
+    headers = {}
+    try:
+        stat = os.fstat(file.fileno())
+        headers["Content-Length"] = str(stat.st_size - file.tell())
+    except (AttributeError, OSError, ValueError):
+        # In-memory and unseekable files are sent without a length
+        pass
+
+    return StreamingResponse(
+        _close_after(iterate_in_threadpool(_read_chunks(file)), file),
+        media_type=media_type or "application/octet-stream",
+        headers=headers,
+    )
+
+
+def _read_chunks(file: BinaryIO) -> Iterator[bytes]:
+    while chunk := file.read(FILE_CHUNK_SIZE):
+        yield chunk
+
+
+async def _close_after(chunks: AsyncIterator[bytes], file: BinaryIO) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        file.close()
+
+
+async def _resume(first, chunks: AsyncIterator[str | bytes]) -> AsyncIterator[str | bytes]:
+    try:
+        if first is _EMPTY:
+            return
+
+        yield first
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        # Runs on disconnect as well, so producers can release their resources
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,376 @@
+"""Jinja2 extensions and helpers used by Serving's template layer."""
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Hashable, Iterable, Iterator
+from os import PathLike
+from pathlib import Path
+from typing import Any
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, nodes
+from jinja2.exceptions import TemplateSyntaxError
+from jinja2.ext import Extension
+from jinja2.parser import Parser
+from starlette.concurrency import iterate_in_threadpool
+from starlette.requests import Request
+from starlette.templating import Jinja2Templates
+
+
+class BlockNotFoundError(LookupError):
+    """Raised when a template does not define the block that was requested."""
+
+
+class FragmentCache:
+    """Bounded LRU cache for rendered template fragments.
+
+    Entries are keyed by the fragment name plus its vary values, can expire after a TTL and
+    can be grouped under tags so that related fragments are invalidated together.
+    """
+
+    def __init__(self, max_size: int = 512, enabled: bool = True):
+        self.max_size = max_size
+        self.enabled = enabled
+        self._entries: OrderedDict[tuple[str, Hashable], tuple[float | None, frozenset[str], str]] = OrderedDict()
+        self._tags: dict[str, set[tuple[str, Hashable]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def render(
+        self,
+        name: str,
+        render: Callable[[], str],
+        *,
+        ttl: float | None = None,
+        vary: Iterable[Any] | None = None,
+        tags: Iterable[str] | None = None,
+    ) -> str:
+        """Return the cached fragment for name/vary, calling render to fill the cache on a miss."""
+        if not self.enabled:
+            return render()
+
+        key = (name, self._vary_key(vary))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+
+                self._remove(key)
+
+        value = render()
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        entry_tags = frozenset(tags or ())
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, entry_tags, value)
+            for tag in entry_tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+        return value
+
+    def invalidate(self, name: str) -> None:
+        """Remove every cached variant of the named fragment."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == name]:
+                self._remove(key)
+
+    def invalidate_tags(self, *tags: str) -> None:
+        """Remove every fragment that was cached under any of the given tags."""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key: tuple[str, Hashable]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    @staticmethod
+    def _vary_key(vary: Iterable[Any] | None) -> Hashable:
+        if vary is None:
+            return ()
+
+        values = tuple(vary)
+        try:
+            hash(values)
+        except TypeError:
+            return repr(values)
+
+        return values
+
+
+class FragmentCacheExtension(Extension):
+    """Adds the `{% cache "key", ttl=60, vary=[...], tags=[...] %}...{% endcache %}` tag.
+
+    The cache used is `environment.fragment_cache`, which Serving replaces with a configured
+    `FragmentCache` when it builds the application's templates.
+    """
+
+    tags = {"cache"}
+    options = frozenset({"ttl", "vary", "tags"})
+
+    def __init__(self, environment: Environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=FragmentCache())
+
+    def parse(self, parser: Parser) -> nodes.Node:
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        kwargs = []
+        while parser.stream.skip_if("comma"):
+            option = parser.stream.expect("name")
+            if option.value not in self.options:
+                parser.fail(
+                    f"Unknown cache option '{option.value}', expected one of {sorted(self.options)}",
+                    option.lineno,
+                    TemplateSyntaxError,
+                )
+            parser.stream.expect("assign")
+            kwargs.append(nodes.Keyword(option.value, parser.parse_expression(), lineno=option.lineno))
+
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method("_render_fragment", [key], kwargs, lineno=lineno)
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_fragment(
+        self,
+        name: str,
+        ttl: float | None = None,
+        vary: Iterable[Any] | None = None,
+        tags: Iterable[str] | None = None,
+        *,
+        caller: Callable[[], str],
+    ) -> str:
+        return self.environment.fragment_cache.render(name, caller, ttl=ttl, vary=vary, tags=tags)
+
+
+_MINIFY_TOKENS = re.compile(
+    r"""
+    (?P<raw>\{%-?\s*raw\s*-?%\}.*?\{%-?\s*endraw\s*-?%\})
+    | (?P<jinja>\{\{.*?\}\}|\{%.*?%\}|\{\#.*?\#\})
+    | (?P<preserve><(?P<tag>pre|textarea|script|style)\b.*?</(?P=tag)\s*>)
+    | (?P<comment><!--.*?-->)
+    | (?P<element><[a-z][^\s/>]*(?:"[^"]*"|'[^']*'|\{\{.*?\}\}|\{%.*?%\}|[^>"'])*>)
+    """,
+    re.DOTALL | re.IGNORECASE | re.VERBOSE,
+)
+# Inside tags only the whitespace between attributes is collapsed, never quoted values
+_ATTRIBUTE_TOKENS = re.compile(r"""("[^"]*"|'[^']*'|\{\{.*?\}\}|\{%.*?%\}|\{\#.*?\#\})|\s+""", re.DOTALL)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def minify_html(source: str) -> str:
+    """Collapse whitespace and drop comments from HTML template source.
+
+    Runs of whitespace become their newlines when they contain any and a single space
+    otherwise, so text never runs together and Jinja2 error line numbers still match the
+    source. Jinja2 tags, `{% raw %}` blocks, quoted attribute values and the contents of
+    `<pre>`, `<textarea>`, `<script>` and `<style>` are left untouched, as are conditional
+    comments and comments containing Jinja2 tags.
+    """
+    parts: list[str] = []
+    text: list[str] = []
+    position = 0
+    for match in _MINIFY_TOKENS.finditer(source):
+        text.append(source[position:match.start()])
+        position = match.end()
+        if match["comment"] is not None:
+            comment = match["comment"]
+            if not comment.startswith("<!--[if") and "{" not in comment:
+                # Removed comments let the whitespace on either side collapse together
+                text.append("\n" * comment.count("\n"))
+                continue
+
+        parts.append(_collapse_whitespace("".join(text)))
+        if match["element"] is not None:
+            parts.append(_ATTRIBUTE_TOKENS.sub(lambda token: token[1] or _collapse_whitespace(token[0]), match["element"]))
+        else:
+            parts.append(match.group())
+        text.clear()
+
+    text.append(source[position:])
+    parts.append(_collapse_whitespace("".join(text)))
+    return "".join(parts)
+
+
+def _collapse_whitespace(text: str) -> str:
+    return _WHITESPACE.sub(lambda match: "\n" * match.group().count("\n") or " ", text)
+
+
+class HTMLMinifyExtension(Extension):
+    """Minifies HTML templates as Jinja2 compiles them, so rendering pays nothing for it.
+
+    Only templates whose names end in `.html` or `.htm` (optionally followed by a Jinja2
+    suffix such as `.j2`) are minified.
+    """
+
+    suffixes = (".html", ".htm")
+    template_suffixes = ("", ".j2", ".jinja", ".jinja2")
+
+    def preprocess(self, source: str, name: str | None, filename: str | None = None) -> str:
+        if name is None or not _is_html_template(name):
+            return source
+
+        return minify_html(source)
+
+
+def _is_html_template(name: str) -> bool:
+    return any(
+        name.endswith(suffix + template_suffix)
+        for suffix in HTMLMinifyExtension.suffixes
+        for template_suffix in HTMLMinifyExtension.template_suffixes
+    )
+
+
+def _is_preloadable(name: str) -> bool:
+    if any(part.startswith(".") for part in name.split("/")):
+        return False
+
+    # Other files, such as client-side templates, may not be valid Jinja2
+    return _is_html_template(name) or name.endswith(HTMLMinifyExtension.template_suffixes[1:])
+
+
+def create_templates(
+    directory: str | PathLike[str],
+    *,
+    auto_reload: bool = True,
+    cache_size: int = 400,
+    bytecode_cache: str | PathLike[str] | None = None,
+    minify: bool = False,
+) -> Jinja2Templates:
+    """Build `Jinja2Templates` over a directory with explicit environment settings.
+
+    Args:
+        directory: Template directory
+        auto_reload: Whether Jinja2 stats template files on every lookup to pick up edits
+        cache_size: Number of compiled templates kept in memory, -1 for unbounded
+        bytecode_cache: Directory for compiled template bytecode shared between workers
+        minify: Strip HTML whitespace and comments when templates are compiled
+    """
+    cache = None
+    if bytecode_cache is not None:
+        Path(bytecode_cache).mkdir(parents=True, exist_ok=True)
+        # Bytecode is keyed on the template source, which minifying does not change
+        pattern = "__jinja2_%s.min.cache" if minify else "__jinja2_%s.cache"
+        cache = FileSystemBytecodeCache(str(bytecode_cache), pattern)
+
+    env = Environment(
+        loader=FileSystemLoader(directory),
+        autoescape=True,
+        auto_reload=auto_reload,
+        cache_size=cache_size,
+        bytecode_cache=cache,
+        extensions=[HTMLMinifyExtension] if minify else (),
+    )
+    return Jinja2Templates(env=env)
+
+
+def preload_templates(environment: Environment) -> list[str]:
+    """Compile every HTML (`.html`, `.htm`) or Jinja2 (`.j2`, `.jinja`, `.jinja2`) template the
+    environment's loader can find, skipping hidden files and other assets.
+
+    Compilation errors such as `TemplateSyntaxError` propagate so broken templates are reported
+    at startup rather than on the first request that uses them.
+
+    Returns:
+        The names of the templates that were loaded
+    """
+    names = environment.list_templates(filter_func=_is_preloadable)
+    for name in names:
+        environment.get_template(name)
+
+    return names
+
+
+def install_fragment_cache(environment: Environment, cache: FragmentCache) -> FragmentCache:
+    """Register the `{% cache %}` tag on an environment and back it with the given cache."""
+    environment.add_extension(FragmentCacheExtension)
+    environment.fragment_cache = cache
+    return cache
+
+
+def render_block(
+    templates: Jinja2Templates,
+    request: Request,
+    name: str,
+    block: str,
+    context: dict[str, Any],
+) -> str:
+    """Render a single `{% block %}` of a template with the same context a full render would get.
+
+    Only the block's own body is rendered, so layouts the template extends are skipped entirely.
+
+    Raises:
+        BlockNotFoundError: When the template does not define the block
+    """
+    template = templates.get_template(name)
+    try:
+        render = template.blocks[block]
+    except KeyError:
+        raise BlockNotFoundError(f"Template '{name}' does not define a block named '{block}'") from None
+
+    return "".join(render(template.new_context(_template_context(templates, request, context))))
+
+
+def stream_template(
+    templates: Jinja2Templates,
+    request: Request,
+    name: str,
+    context: dict[str, Any],
+    flush_size: int = 8192,
+) -> AsyncIterator[str]:
+    """Render a template incrementally, yielding output as it is produced.
+
+    Rendering runs in the threadpool so the event loop is never blocked. Output is buffered
+    until at least `flush_size` characters are ready to avoid sending many tiny chunks. The
+    template is looked up eagerly so a missing template fails before the response starts.
+    """
+    template = templates.get_template(name)
+    generator = template.generate(_template_context(templates, request, context))
+    return iterate_in_threadpool(_buffer_chunks(generator, flush_size))
+
+
+def _buffer_chunks(chunks: Iterator[str], flush_size: int) -> Iterator[str]:
+    buffer: list[str] = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= flush_size:
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+
+    if buffer:
+        yield "".join(buffer)
+
+
+def _template_context(templates: Jinja2Templates, request: Request, context: dict[str, Any]) -> dict[str, Any]:
+    """Build the context `TemplateResponse` would render with: the request plus context processors."""
+    context = dict(context)
+    context.setdefault("request", request)
+    for processor in templates.context_processors:
+        context.update(processor(request))
+
+    return context
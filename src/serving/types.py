@@ -1,4 +1,21 @@
-type JSON = dict | list | str | int | float | bool | None
+from collections.abc import AsyncIterator
+from os import PathLike
+from typing import TYPE_CHECKING, BinaryIO
+
+if TYPE_CHECKING:
+    from serving.sse import ServerSentEvent
+
+# JSON[T] declares the structure of the result, e.g. JSON[list[User]] for a list of dataclasses
+type JSON[T = dict | list | str | int | float | bool | None] = T
 type PlainText = str
 type HTML = str
 type Jinja2 = tuple[str, dict]
+type JinjaBlock = tuple[str, str, dict]
+type Jinja2Stream = tuple[str, dict]
+type Stream[T: (bytes, str)] = AsyncIterator[T]
+type SSE = AsyncIterator[ServerSentEvent | str | dict | list]
+type JSONStream = AsyncIterator[JSON]
+# Raw bodies, optionally paired with a media type: data or (data, media_type)
+type Bytes = bytes | bytearray | memoryview | tuple[bytes | bytearray | memoryview, str]
+# A path sent by the server or an open binary file streamed and closed: file or (file, media_type)
+type File = str | PathLike[str] | BinaryIO | tuple[str | PathLike[str] | BinaryIO, str]
@@ -0,0 +1,216 @@
+import asyncio
+import base64
+from pathlib import Path
+
+import pytest
+from starlette.testclient import TestClient
+
+from serving.auth import HMACCredentialProvider
+from serving.forms import CSRF_TOKEN_PLACEHOLDER
+from serving.injectors import JSONBody, PathParam, QueryParam
+from serving.response import redirect, set_header, set_status_code
+from serving.router import Router
+from serving.serv import Serv
+from serving.session import Session
+from serving.types import HTML, JSON, SSE, Bytes, PlainText
+
+app = Router()
+checks: list[set[str]] = []
+
+
+class CountingCredentialProvider:
+    def __init__(self, *, csrf_secret: str):
+        self.hmac = HMACCredentialProvider(csrf_secret=csrf_secret)
+
+    def __getattr__(self, name):
+        return getattr(self.hmac, name)
+
+    def has_credentials(self, permissions: set[str]) -> bool:
+        checks.append(permissions)
+        return "admin" not in permissions
+
+
+@app.route("/items/{item_id}")
+async def item(item_id: PathParam[str], verbose: QueryParam[str]) -> JSON:
+    return {"id": item_id, "verbose": verbose}
+
+
+@app.route("/items", methods={"POST"})
+async def create_item(body: JSONBody[dict]) -> JSON:
+    set_status_code(201)
+    set_header("Location", f"/items/{body['id']}")
+    return body
+
+
+@app.route("/greeting")
+async def greeting() -> PlainText:
+    return "hello"
+
+
+@app.route("/form")
+async def form() -> HTML:
+    return f'<input name="csrf_token" value="{CSRF_TOKEN_PLACEHOLDER}">'
+
+
+@app.route("/logo")
+async def logo() -> Bytes:
+    return b"\x89PNG\xff", "image/png"
+
+
+@app.route("/old")
+async def old() -> PlainText:
+    redirect("/greeting")
+    return "never sent"
+
+
+@app.route("/admin")
+async def admin() -> JSON:
+    return {}
+
+
+@app.route("/fails")
+async def fails() -> JSON:
+    raise RuntimeError("boom")
+
+
+@app.route("/session")
+async def session(session: Session) -> JSON:
+    return {"id": id(session)}
+
+
+@app.route("/events")
+async def events() -> SSE:
+    while True:
+        yield "tick"
+        await asyncio.sleep(1)
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> TestClient:
+    (tmp_path / "serving.prod.yaml").write_text(
+        """
+auth:
+  credential_provider: tests.serving.test_batch:CountingCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+session:
+  session_provider: serving.session:InMemorySessionProvider
+  config: {}
+
+csrf:
+  late_bound: true
+
+batch:
+  path: /batch
+  max_requests: 10
+  concurrency: 2
+
+routers:
+  - entrypoint: tests.serving.test_batch:app
+    routes:
+      - path: /admin
+        permissions: [admin]
+"""
+    )
+    return TestClient(Serv(working_directory=tmp_path, environment="prod").app)
+
+
+def csrf_headers() -> dict[str, str]:
+    return {"X-CSRF-Token": HMACCredentialProvider(csrf_secret="test-secret").generate_csrf_token()}
+
+
+def test_batch_dispatches_sub_requests_in_order(client):
+    response = client.post(
+        "/batch",
+        headers=csrf_headers(),
+        json=[
+            {"path": "/items/1"},
+            {"path": "/items/2?verbose=yes"},
+            {"path": "/items/3%20b", "query": {"verbose": "query"}},
+            {"method": "POST", "path": "/items", "body": {"id": 4}},
+            {"path": "/greeting"},
+            {"path": "/logo"},
+        ],
+    )
+
+    assert response.status_code == 200
+    first, second, third, created, text, binary = response.json()
+    assert first["status"] == 200
+    assert first["body"] == {"id": "1", "verbose": None}
+    assert second["body"]["verbose"] == "yes"
+    assert third["body"] == {"id": "3 b", "verbose": "query"}
+    assert created["status"] == 201
+    assert created["headers"]["location"] == "/items/4"
+    assert created["body"] == {"id": 4}
+    assert text["body"] == "hello"
+    assert base64.b64decode(binary["body"]) == b"\x89PNG\xff"
+    assert binary["encoding"] == "base64"
+
+
+def test_batch_reports_errors_per_request(client):
+    response = client.post(
+        "/batch",
+        json=[
+            {"path": "/missing"},
+            {"path": "/admin"},
+            {"path": "/fails"},
+            {"path": "/old"},
+            {"path": "/batch"},
+            {"path": "no-slash"},
+        ],
+    )
+
+    assert [result["status"] for result in response.json()] == [404, 401, 500, 307, 400, 400]
+
+
+def test_batch_shares_session_and_credential_checks(client):
+    checks.clear()
+
+    results = client.post("/batch", json=[{"path": "/session"}, {"path": "/session"}, {"path": "/items/1"}]).json()
+
+    assert results[0]["body"] == results[1]["body"]
+    assert checks == [set()]
+
+
+def test_batch_fills_in_late_bound_csrf_tokens(client):
+    html = client.post("/batch", json=[{"path": "/form"}]).json()[0]["body"]
+
+    assert CSRF_TOKEN_PLACEHOLDER not in html
+    assert 'value="' in html
+
+
+def test_batch_requires_json_content_type(client):
+    response = client.post(
+        "/batch",
+        content=b'[{"method": "POST", "path": "/items", "body": {"id": 1}}]',
+        headers={"Content-Type": "text/plain"},
+    )
+
+    assert response.status_code == 415
+
+
+def test_unsafe_sub_requests_require_csrf_token(client):
+    item = {"method": "POST", "path": "/items", "body": {"id": 1}}
+
+    assert client.post("/batch", json=[item]).json()[0]["status"] == 400
+    forged = {**item, "headers": {"X-CSRF-Token": "forged.token"}}
+    assert client.post("/batch", json=[forged]).json()[0]["status"] == 400
+    assert client.post("/batch", json=[item], headers=csrf_headers()).json()[0]["status"] == 201
+
+
+@pytest.mark.parametrize(
+    "body, status",
+    [
+        ({"path": "/items/1"}, 400),
+        ([{"path": "/items/1"}] * 11, 413),
+    ],
+)
+def test_batch_rejects_invalid_batches(client, body, status):
+    assert client.post("/batch", json=body).status_code == status
+
+
+def test_streaming_routes_are_rejected(client):
+    results = client.post("/batch", json=[{"path": "/events"}, {"path": "/greeting"}]).json()
+
+    assert [result["status"] for result in results] == [400, 200]
@@ -0,0 +1,99 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+from starlette.testclient import TestClient
+
+from serving.body import BodyStream
+from serving.injectors import JSONBody, PathParam
+from serving.router import Router
+from serving.serv import Serv
+from serving.types import JSON
+
+upload_directory = Path()
+
+app = Router()
+
+
+@app.route("/digest", methods={"POST"})
+async def digest(body: BodyStream) -> JSON:
+    return {"sha256": await body.hash(), "size": body.size}
+
+
+@app.route("/limited", methods={"POST"})
+async def limited(body: BodyStream) -> JSON:
+    return {"sha256": await body.hash()}
+
+
+@app.route("/files/{name}", methods={"POST"})
+async def save(name: PathParam[str], body: BodyStream) -> JSON:
+    return {"written": await body.save_to(upload_directory / name)}
+
+
+@app.route("/limited-json", methods={"POST"})
+async def limited_json(data: JSONBody[dict]) -> JSON:
+    return data
+
+
+@pytest.fixture
+def client(tmp_path: Path, monkeypatch) -> TestClient:
+    monkeypatch.setattr(f"{__name__}.upload_directory", tmp_path)
+    (tmp_path / "serving.prod.yaml").write_text(
+        """
+auth:
+  credential_provider: serving.auth:HMACCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+routers:
+  - entrypoint: tests.serving.test_body:app
+    routes:
+      - path: /limited
+        max_body_size: 16
+      - path: /files/{name}
+        max_body_size: 16
+      - path: /limited-json
+        max_body_size: 16
+"""
+    )
+    return TestClient(Serv(working_directory=tmp_path, environment="prod").app)
+
+
+def chunked(data: bytes, size: int = 5):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_hash_streams_the_body(client):
+    data = b"0123456789" * 1000
+    response = client.post("/digest", content=chunked(data, 999))
+
+    assert response.json() == {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+
+
+def test_route_limit_uses_content_length(client):
+    assert client.post("/limited", content=b"small").status_code == 200
+    assert client.post("/limited", content=b"x" * 17).status_code == 413
+
+
+def test_route_limit_applies_while_streaming(client):
+    assert client.post("/limited", content=chunked(b"x" * 40)).status_code == 413
+
+
+def test_save_to_writes_the_file(client, tmp_path):
+    response = client.post("/files/upload.bin", content=chunked(b"abcdefghij"))
+
+    assert response.json() == {"written": 10}
+    assert (tmp_path / "upload.bin").read_bytes() == b"abcdefghij"
+
+
+def test_save_to_removes_partial_files(client, tmp_path):
+    response = client.post("/files/big.bin", content=chunked(b"x" * 40))
+
+    assert response.status_code == 413
+    assert not (tmp_path / "big.bin").exists()
+
+
+def test_route_limit_overrides_json_limit(client):
+    assert client.post("/limited-json", json={"a": 1}).json() == {"a": 1}
+    assert client.post("/limited-json", json={"a": "x" * 20}).status_code == 413
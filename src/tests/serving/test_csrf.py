@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+from starlette.testclient import TestClient
+
+import serving.form_parser
+import serving.forms
+from serving.auth import HMACCredentialProvider
+from serving.body import BodyStream
+from serving.csrf_middleware import substitute_csrf_placeholder
+from serving.forms import CSRF_TOKEN_PLACEHOLDER, Form
+from serving.router import Router
+from serving.serv import Serv
+from serving.types import HTML, JSON
+
+app = Router()
+handled: list[str] = []
+
+
+@dataclass
+class CommentForm(Form, template="comment.html"):
+    body: str = ""
+
+
+@app.route("/comment")
+async def comment() -> HTML:
+    return CommentForm().render()
+
+
+@app.route("/comment", methods={"POST"})
+async def post_comment(form: CommentForm) -> JSON:
+    handled.append(form.body)
+    return {"body": form.body}
+
+
+@app.route("/upload", methods={"POST"})
+async def upload(body: BodyStream) -> JSON:
+    return {"size": len(b"".join([chunk async for chunk in body]))}
+
+
+def make_serv(tmp_path: Path, late_bound: bool) -> Serv:
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "comment.html").write_text("<form>{{ csrf() }}</form>")
+    (tmp_path / "serving.prod.yaml").write_text(
+        f"""
+auth:
+  credential_provider: serving.auth:HMACCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+templates:
+  directory: {tmp_path / "templates"}
+
+csrf:
+  late_bound: {str(late_bound).lower()}
+
+routers:
+  - entrypoint: tests.serving.test_csrf:app
+"""
+    )
+    return Serv(working_directory=tmp_path, environment="prod")
+
+
+def extract_token(html: str) -> str:
+    return html.split('value="', 1)[1].split('"', 1)[0]
+
+
+def test_late_bound_csrf_token_is_substituted_per_response(tmp_path):
+    serv = make_serv(tmp_path, late_bound=True)
+    client = TestClient(serv.app)
+
+    first = client.get("/comment")
+    second = client.get("/comment")
+
+    assert CSRF_TOKEN_PLACEHOLDER not in first.text
+    first_token, second_token = extract_token(first.text), extract_token(second.text)
+    assert first_token != second_token
+    provider = HMACCredentialProvider(csrf_secret="test-secret")
+    assert provider.validate_csrf_token(first_token)
+    assert provider.validate_csrf_token(second_token)
+
+
+def test_late_bound_form_render_emits_placeholder(tmp_path):
+    serv = make_serv(tmp_path, late_bound=True)
+
+    with serv.container.branch():
+        html = CommentForm().render()
+
+    assert extract_token(html) == CSRF_TOKEN_PLACEHOLDER
+
+
+def test_csrf_token_is_rendered_inline_by_default(tmp_path):
+    serv = make_serv(tmp_path, late_bound=False)
+
+    with serv.container.branch():
+        html = CommentForm().render()
+
+    assert CSRF_TOKEN_PLACEHOLDER not in html
+    assert HMACCredentialProvider(csrf_secret="test-secret").validate_csrf_token(extract_token(html))
+
+
+@pytest.mark.parametrize("token", [None, "forged.token"])
+def test_form_posts_with_bad_tokens_are_rejected_before_the_endpoint(tmp_path, token):
+    client = TestClient(make_serv(tmp_path, late_bound=False).app)
+    handled.clear()
+    data = {"body": "hi"} if token is None else {"body": "hi", "csrf_token": token}
+
+    response = client.post("/comment", data=data)
+
+    assert response.status_code == 400
+    assert handled == []
+
+
+def test_form_body_is_parsed_once(tmp_path, monkeypatch):
+    client = TestClient(make_serv(tmp_path, late_bound=False).app)
+    token = HMACCredentialProvider(csrf_secret="test-secret").generate_csrf_token()
+    parses = []
+    parse_form = serving.form_parser.parse_form
+
+    async def counting_parse_form(*args):
+        parses.append(1)
+        return await parse_form(*args)
+
+    monkeypatch.setattr(serving.forms, "parse_form", counting_parse_form)
+
+    response = client.post("/comment", data={"body": "hi", "csrf_token": token})
+
+    assert response.json() == {"body": "hi"}
+    assert len(parses) == 1
+
+
+def test_raw_body_endpoints_are_not_read_by_the_middleware(tmp_path):
+    client = TestClient(make_serv(tmp_path, late_bound=False).app)
+
+    response = client.post("/upload", data={"field": "x" * 10})
+
+    assert response.json() == {"size": len("field=" + "x" * 10)}
+
+
+@pytest.mark.asyncio
+async def test_substitution_handles_placeholder_split_across_chunks():
+    placeholder = CSRF_TOKEN_PLACEHOLDER.encode()
+    generated = []
+
+    async def body():
+        yield b"<a>" + placeholder[:5]
+        yield placeholder[5:] + b"</a>" + placeholder
+        yield b"<b>"
+
+    def generate_token():
+        generated.append(1)
+        return "tok"
+
+    result = b"".join([chunk async for chunk in substitute_csrf_placeholder(body(), generate_token)])
+
+    assert result == b"<a>tok</a>tok<b>"
+    assert len(generated) == 1
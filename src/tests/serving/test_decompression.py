@@ -0,0 +1,94 @@
+import gzip
+import json
+import random
+import zlib
+from pathlib import Path
+
+import pytest
+from starlette.testclient import TestClient
+
+from serving.body import BodyStream
+from serving.injectors import JSONBody
+from serving.router import Router
+from serving.serv import Serv
+from serving.types import JSON
+
+app = Router()
+
+
+@app.route("/sync", methods={"POST"})
+async def sync(data: JSONBody[dict]) -> JSON:
+    return {"records": len(data["records"])}
+
+
+@app.route("/raw", methods={"POST"})
+async def raw(body: BodyStream) -> JSON:
+    return {"size": len(b"".join([chunk async for chunk in body]))}
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> TestClient:
+    (tmp_path / "serving.prod.yaml").write_text(
+        """
+auth:
+  credential_provider: serving.auth:HMACCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+decompression:
+  max_size: 200000
+  max_ratio: 50
+
+routers:
+  - entrypoint: tests.serving.test_decompression:app
+"""
+    )
+    return TestClient(Serv(working_directory=tmp_path, environment="prod").app)
+
+
+def chunked(data: bytes, size: int = 100):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def payload(records: int) -> bytes:
+    return json.dumps({"records": [{"id": index, "name": f"record {index}"} for index in range(records)]}).encode()
+
+
+@pytest.mark.parametrize("encoding, compress", [("gzip", gzip.compress), ("deflate", zlib.compress)])
+def test_compressed_json_bodies_are_decoded(client, encoding, compress):
+    body = compress(payload(500))
+    headers = {"Content-Type": "application/json", "Content-Encoding": encoding}
+
+    response = client.post("/sync", content=chunked(body), headers=headers)
+
+    assert response.json() == {"records": 500}
+
+
+def test_uncompressed_bodies_pass_through(client):
+    assert client.post("/raw", content=b"x" * 10).json() == {"size": 10}
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        gzip.compress(random.Random(0).randbytes(300_000)),  # larger than max_size
+        gzip.compress(b"\0" * 100_000),  # compresses far more than max_ratio
+    ],
+)
+def test_zip_bombs_get_413(client, body):
+    response = client.post("/raw", content=chunked(body), headers={"Content-Encoding": "gzip"})
+
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize(
+    "headers, body, status",
+    [
+        ({"Content-Encoding": "br"}, b"data", 415),
+        ({"Content-Encoding": "gzip"}, b"not gzip", 400),
+        ({"Content-Encoding": "gzip"}, gzip.compress(b"x" * 1000)[:-10], 400),
+    ],
+)
+def test_invalid_encodings(client, headers, body, status):
+    assert client.post("/raw", content=body, headers=headers).status_code == status
@@ -1,16 +1,39 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import date
+from enum import Enum
 from pathlib import Path
+from typing import Any
 from urllib.parse import urlencode
 
 import pytest
 from bevy import Inject, auto_inject, injectable
 from bevy.registries import Registry
+from starlette.exceptions import HTTPException
 from starlette.requests import Request
 from starlette.templating import Jinja2Templates
+from starlette.testclient import TestClient
 
 from serving.auth import CredentialProvider
+from serving.form_parser import FormsConfig, parse_form
 from serving.forms import CSRFProtection, Form, MissingCSRFTokenError
 from serving.injectors import handle_form_types
+from serving.router import Router
+from serving.schema import ValidationError
+from serving.serv import Serv
+from serving.types import JSON
+
+app = Router()
+
+
+@dataclass
+class Attachment(Form, template="attachment.html", csrf=CSRFProtection.Disabled, max_file_size=64):
+    title: str
+    upload: Any
+
+
+@app.route("/attachments", methods={"POST"})
+async def create_attachment(form: Attachment) -> JSON:
+    return {"title": form.title, "size": len(await form.upload.read())}
 
 
 class DummyCredentialProvider:
@@ -318,3 +341,224 @@ def test_form_injection_new_instance_per_branch(tmp_path):
     assert form1.name == "one"
     assert form2.name == "two"
     assert form1 is not form2
+
+
+@pytest.mark.asyncio
+async def test_from_request_reports_missing_required_fields(tmp_path):
+    (tmp_path / "signup.html").write_text("")
+    container = setup_container(tmp_path)
+
+    @dataclass
+    class Signup(Form, template="signup.html", csrf=CSRFProtection.Disabled):
+        username: str
+        email: str
+        newsletter: str = "no"
+
+    body = urlencode({"username": "alice"}).encode()
+    headers = [
+        (b"content-type", b"application/x-www-form-urlencoded"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": headers}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    request = Request(scope, receive=receive)
+
+    with container.branch():
+        with pytest.raises(ValidationError) as exc_info:
+            await Signup.from_request(request)
+
+    assert exc_info.value.errors == [{"field": "email", "message": "Field required"}]
+
+
+def make_request(body: bytes, content_type: str, chunk_size: int | None = None) -> Request:
+    chunks = [body] if chunk_size is None else [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    headers = [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+
+    async def receive():
+        chunk = chunks.pop(0) if chunks else b""
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers}, receive=receive)
+
+
+def multipart_body(*parts: tuple[str, bytes, str | None]) -> tuple[bytes, str]:
+    body = b""
+    for name, value, filename in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        body += f"--boundary\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + value + b"\r\n"
+    return body + b"--boundary--\r\n", "multipart/form-data; boundary=boundary"
+
+
+class Color(Enum):
+    Red = "red"
+    Blue = "blue"
+
+
+@dataclass
+class Preferences(Form, template="preferences.html", csrf=CSRFProtection.Disabled):
+    age: int
+    color: Color
+    born: date
+    subscribed: bool
+    tags: list[str]
+    scores: list[int] = field(default_factory=list)
+    nickname: str | None = None
+
+
+class TestFormFields:
+    def test_plan_is_compiled_when_the_class_is_defined(self):
+        plan = {field.name: field for field in Preferences.__form_fields__}
+
+        assert list(plan) == ["age", "color", "born", "subscribed", "tags", "scores", "nickname"]
+        assert plan["tags"].many and plan["scores"].many
+        assert plan["age"].required and not plan["nickname"].required
+
+    @pytest.mark.asyncio
+    async def test_values_are_coerced_to_annotations(self, tmp_path):
+        container = setup_container(tmp_path)
+        body = urlencode(
+            [
+                ("age", "42"), ("color", "blue"), ("born", "1990-05-01"), ("subscribed", "on"),
+                ("tags", "a"), ("tags", "b"), ("scores", "1"), ("scores", "2"), ("nickname", ""),
+            ]
+        ).encode()
+
+        with container.branch():
+            form = await Preferences.from_request(make_request(body, "application/x-www-form-urlencoded"))
+
+        assert form == Preferences(42, Color.Blue, date(1990, 5, 1), True, ["a", "b"], [1, 2], None)
+
+    @pytest.mark.asyncio
+    async def test_missing_checkboxes_and_multi_selects(self, tmp_path):
+        container = setup_container(tmp_path)
+        body = urlencode({"age": "1", "color": "red", "born": "2000-01-01"}).encode()
+
+        with container.branch():
+            form = await Preferences.from_request(make_request(body, "application/x-www-form-urlencoded"))
+
+        assert form.subscribed is False
+        assert form.tags == [] and form.scores == []
+
+    @pytest.mark.asyncio
+    async def test_conversion_errors_are_reported_per_field(self, tmp_path):
+        container = setup_container(tmp_path)
+        body = urlencode([("age", "old"), ("color", "green"), ("born", "2000-01-01"), ("scores", "x")]).encode()
+
+        with container.branch():
+            with pytest.raises(ValidationError) as exc_info:
+                await Preferences.from_request(make_request(body, "application/x-www-form-urlencoded"))
+
+        assert [error["field"] for error in exc_info.value.errors] == ["age", "color", "scores"]
+        assert exc_info.value.errors[0]["message"] == "Expected an integer"
+
+
+class TestFormLimits:
+    @pytest.mark.asyncio
+    async def test_multipart_keeps_declared_fields_and_spools_files(self, tmp_path):
+        container = setup_container(tmp_path)
+
+        @dataclass
+        class Upload(Form, template="upload.html", csrf=CSRFProtection.Disabled, spool_size=8):
+            title: str
+            attachment: Any
+
+        body, content_type = multipart_body(
+            ("title", b"report", None),
+            ("attachment", b"x" * 100, "report.txt"),
+            ("unexpected", b"y" * 100, "other.txt"),
+            ("extra", b"ignored", None),
+        )
+        with container.branch():
+            form = await Upload.from_request(make_request(body, content_type, chunk_size=7))
+
+        assert form.title == "report"
+        assert form.attachment.filename == "report.txt"
+        assert form.attachment.file._rolled
+        assert await form.attachment.read() == b"x" * 100
+
+    @pytest.mark.asyncio
+    async def test_urlencoded_skips_undeclared_fields(self):
+        config = FormsConfig(max_part_size=10)
+        body = urlencode({"name": "alice", "ignored": "z" * 100}).encode()
+
+        form = await parse_form(make_request(body, "application/x-www-form-urlencoded", 9), config, {"name"})
+
+        assert list(form.multi_items()) == [("name", "alice")]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "config, chunk_size",
+        [
+            (FormsConfig(max_body_size=10), None),
+            (FormsConfig(max_part_size=4), None),
+            (FormsConfig(max_fields=0), None),
+            (FormsConfig(max_file_size=50), 16),
+            (FormsConfig(max_files=0), None),
+        ],
+    )
+    async def test_limits_reject_with_413(self, config, chunk_size):
+        body, content_type = multipart_body(("title", b"report", None), ("attachment", b"x" * 100, "a.txt"))
+
+        with pytest.raises(HTTPException) as exc_info:
+            await parse_form(make_request(body, content_type, chunk_size), config)
+
+        assert exc_info.value.status_code == 413
+
+    @pytest.mark.asyncio
+    async def test_form_limits_override_config(self, tmp_path):
+        container = setup_container(tmp_path)
+        container.add(FormsConfig(max_body_size=None))
+
+        @dataclass
+        class Comment(Form, template="comment.html", csrf=CSRFProtection.Disabled, max_body_size=16):
+            text: str
+
+        body = urlencode({"text": "x" * 40}).encode()
+        with container.branch():
+            with pytest.raises(HTTPException) as exc_info:
+                await Comment.from_request(make_request(body, "application/x-www-form-urlencoded"))
+
+        assert exc_info.value.status_code == 413
+        assert Comment.__form_limits__ == {"max_body_size": 16}
+
+
+class TestFormRoutes:
+    @pytest.fixture
+    def client(self, tmp_path: Path) -> TestClient:
+        (tmp_path / "serving.prod.yaml").write_text(
+            """
+auth:
+  credential_provider: serving.auth:HMACCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+forms:
+  max_body_size: 1024
+
+routers:
+  - entrypoint: tests.serving.test_forms:app
+"""
+        )
+        return TestClient(Serv(working_directory=tmp_path, environment="prod").app)
+
+    def test_multipart_upload_is_parsed_on_the_request_loop(self, client):
+        body, content_type = multipart_body(("title", b"notes", None), ("upload", b"x" * 40, "notes.txt"))
+
+        def chunks():
+            for start in range(0, len(body), 16):
+                yield body[start:start + 16]
+
+        response = client.post("/attachments", content=chunks(), headers={"Content-Type": content_type})
+
+        assert response.json() == {"title": "notes", "size": 40}
+
+    @pytest.mark.parametrize("size", [100, 2000])
+    def test_oversized_forms_get_413(self, client, size):
+        body, content_type = multipart_body(("title", b"notes", None), ("upload", b"x" * size, "notes.txt"))
+
+        response = client.post("/attachments", content=body, headers={"Content-Type": content_type})
+
+        assert response.status_code == 413
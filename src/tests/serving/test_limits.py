@@ -0,0 +1,144 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from starlette.exceptions import HTTPException
+from starlette.testclient import TestClient
+
+from serving.body import BodyStream
+from serving.limits_middleware import LimitsConfig, LimitsMiddleware
+from serving.router import Router
+from serving.serv import Serv
+from serving.types import JSON
+
+app = Router()
+
+
+@app.route("/upload", methods={"POST"})
+async def upload(body: BodyStream) -> JSON:
+    return {"size": len(b"".join([chunk async for chunk in body]))}
+
+
+@app.route("/large", methods={"POST"})
+async def large(body: BodyStream) -> JSON:
+    return {"size": len(b"".join([chunk async for chunk in body]))}
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> TestClient:
+    (tmp_path / "serving.prod.yaml").write_text(
+        """
+auth:
+  credential_provider: serving.auth:HMACCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+limits:
+  max_body_size: 100
+  max_headers: 20
+  max_header_size: 200
+  max_query_length: 50
+
+routers:
+  - entrypoint: tests.serving.test_limits:app
+    routes:
+      - path: /large
+        method: POST
+        max_body_size: 1000
+"""
+    )
+    return TestClient(Serv(working_directory=tmp_path, environment="prod").app)
+
+
+def chunked(data: bytes, size: int = 10):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_requests_within_limits_pass(client):
+    assert client.post("/upload?a=1", content=chunked(b"x" * 100)).json() == {"size": 100}
+
+
+@pytest.mark.parametrize("content", [b"x" * 1000, chunked(b"x" * 1000)])
+def test_route_body_limits_replace_the_global_limit(client, content):
+    assert client.post("/large", content=content).json() == {"size": 1000}
+    assert client.post("/large", content=b"x" * 1001).status_code == 413
+
+
+@pytest.mark.parametrize(
+    "kwargs, status",
+    [
+        ({"content": b"x" * 101}, 413),
+        ({"content": chunked(b"x" * 101)}, 413),
+        ({"url": "/upload?q=" + "a" * 50}, 414),
+        ({"headers": {"X-Large": "a" * 200}}, 431),
+        ({"headers": {f"X-Header-{index}": "a" for index in range(20)}}, 431),
+    ],
+)
+def test_limit_violations_get_themed_errors(client, kwargs, status):
+    response = client.post(kwargs.pop("url", "/upload"), **kwargs)
+
+    assert response.status_code == status
+    assert response.headers["content-type"].startswith("text/html")
+
+
+def trickle(chunks: int, delay: float, stall: float = 0):
+    remaining = [chunks]
+
+    async def receive():
+        remaining[0] -= 1
+        await asyncio.sleep(stall if remaining[0] == 0 else delay)
+        return {"type": "http.request", "body": b"x", "more_body": remaining[0] > 0}
+
+    return receive
+
+
+@pytest.mark.asyncio
+async def test_slow_but_steady_bodies_are_not_timed_out():
+    received = []
+
+    async def app(scope, receive, send):
+        while (message := await receive()).get("more_body"):
+            received.append(message)
+
+    middleware = LimitsMiddleware(app, LimitsConfig(body_timeout=0.05))
+    scope = {"type": "http", "headers": [], "query_string": b""}
+
+    # Takes twice body_timeout in total, but no chunk is late
+    await middleware(scope, trickle(10, 0.01, stall=0.01), None)
+
+    assert len(received) == 9
+
+
+@pytest.mark.asyncio
+async def test_stalled_bodies_time_out_with_408():
+    async def app(scope, receive, send):
+        while (await receive()).get("more_body"):
+            pass
+
+    middleware = LimitsMiddleware(app, LimitsConfig(body_timeout=0.05))
+    scope = {"type": "http", "headers": [], "query_string": b""}
+
+    with pytest.raises(HTTPException) as exc_info:
+        await middleware(scope, trickle(3, 0.01, stall=0.2), None)
+
+    assert exc_info.value.status_code == 408
+
+
+@pytest.mark.asyncio
+async def test_waiting_for_disconnect_is_not_timed():
+    messages = [{"type": "http.request", "body": b"x", "more_body": False}, {"type": "http.disconnect"}]
+    received = []
+
+    async def app(scope, receive, send):
+        received.append(await receive())
+        received.append(await receive())
+
+    async def receive():
+        if len(messages) == 1:
+            await asyncio.sleep(0.1)
+        return messages.pop(0)
+
+    await LimitsMiddleware(app, LimitsConfig(body_timeout=0.05))({"type": "http", "headers": []}, receive, None)
+
+    assert received[-1] == {"type": "http.disconnect"}
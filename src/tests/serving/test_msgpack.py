@@ -0,0 +1,209 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+from starlette.testclient import TestClient
+
+from serving import msgpack_codec
+from serving.injectors import JSONBody
+from serving.msgpack_codec import (
+    MessagePackError,
+    decode_msgpack,
+    encode_msgpack,
+    wants_msgpack,
+)
+from serving.router import Router
+from serving.serv import Serv
+from serving.types import JSON
+
+
+@dataclass
+class Point:
+    x: float
+    y: float
+    label: str = ""
+
+
+app = Router()
+
+
+@app.route("/readings")
+async def readings() -> JSON:
+    return {"sensor": "a1", "values": [1, -3, 300, 2.5]}
+
+
+@app.route("/points", methods={"POST"})
+async def create_point(point: JSONBody[Point]) -> JSON:
+    return {"x": point.x, "y": point.y, "label": point.label}
+
+
+@app.route("/echo", methods={"POST"})
+async def echo(body: JSONBody[dict]) -> JSON:
+    return body
+
+
+@pytest.fixture(params=["pure", "package"])
+def codec(request, monkeypatch):
+    if request.param == "pure":
+        monkeypatch.setattr(msgpack_codec, "_msgpack", None)
+    elif msgpack_codec._msgpack is None:
+        pytest.skip("msgpack is not installed")
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        True,
+        False,
+        0,
+        127,
+        128,
+        -1,
+        -32,
+        -33,
+        -129,
+        70000,
+        -70000,
+        2**40,
+        -(2**40),
+        2**64 - 1,
+        1.5,
+        "",
+        "héllo",
+        "x" * 40,
+        "y" * 70000,
+        b"\x00\x01",
+        [1, [2, "three"]],
+        list(range(20)),
+        {"a": {"b": None}},
+        {str(n): n for n in range(20)},
+    ],
+)
+def test_round_trip(codec, value):
+    assert decode_msgpack(encode_msgpack(value)) == value
+
+
+def test_compact_encoding(codec):
+    assert encode_msgpack({"a": [1, -1, None]}) == b"\x81\xa1a\x93\x01\xff\xc0"
+
+
+def test_tuples_encode_as_arrays(codec):
+    assert decode_msgpack(encode_msgpack((1, 2))) == [1, 2]
+
+
+@pytest.mark.parametrize("data", [b"\x92\x01", b"\xc1", b"\x01\x02", b"\xa3ab"])
+def test_invalid_data(codec, data):
+    with pytest.raises(MessagePackError):
+        decode_msgpack(data)
+
+
+def test_unsupported_values(codec):
+    with pytest.raises(MessagePackError):
+        encode_msgpack({"a": object()})
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, False),
+        ("*/*", False),
+        ("application/json", False),
+        ("application/msgpack", True),
+        ("application/x-msgpack, application/json;q=0.5", True),
+        ("application/json, application/msgpack;q=0.5", False),
+        ("application/msgpack;q=0", False),
+    ],
+)
+def test_wants_msgpack(accept, expected):
+    assert wants_msgpack(accept) is expected
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> TestClient:
+    (tmp_path / "serving.prod.yaml").write_text(
+        """
+auth:
+  credential_provider: serving.auth:HMACCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+json:
+  max_body_size: 64
+  body_offload_size: 16
+
+routers:
+  - entrypoint: tests.serving.test_msgpack:app
+"""
+    )
+    return TestClient(Serv(working_directory=tmp_path, environment="prod").app)
+
+
+def test_json_route_negotiates_msgpack(client):
+    response = client.get("/readings", headers={"Accept": "application/msgpack"})
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+    assert decode_msgpack(response.content) == {"sensor": "a1", "values": [1, -3, 300, 2.5]}
+
+    response = client.get("/readings")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"sensor": "a1", "values": [1, -3, 300, 2.5]}
+
+
+def test_json_body_accepts_json_and_msgpack(client):
+    response = client.post("/points", json={"x": 1, "y": 2})
+    assert response.json() == {"x": 1, "y": 2, "label": ""}
+
+    response = client.post(
+        "/points",
+        content=encode_msgpack({"x": 1.5, "y": -2, "label": "a"}),
+        headers={"Content-Type": "application/msgpack"},
+    )
+    assert response.json() == {"x": 1.5, "y": -2, "label": "a"}
+
+
+@pytest.mark.parametrize(
+    "path, content, content_type, status",
+    [
+        ("/echo", b"{", "application/json", 400),
+        ("/echo", b"\xc1", "application/msgpack", 400),
+        ("/echo", b"a=1", "application/x-www-form-urlencoded", 415),
+        ("/points", b'{"x": 1}', "application/json", 422),
+    ],
+)
+def test_json_body_errors(client, path, content, content_type, status):
+    response = client.post(path, content=content, headers={"Content-Type": content_type})
+
+    assert response.status_code == status
+
+
+def test_json_body_size_limit(client):
+    response = client.post("/echo", json={"text": "x" * 40})
+    assert response.json() == {"text": "x" * 40}
+
+    response = client.post("/echo", json={"text": "x" * 100})
+    assert response.status_code == 413
+
+
+def test_json_body_size_limit_without_content_length(client):
+    def chunks():
+        yield b'{"text": "'
+        yield b"x" * 100
+        yield b'"}'
+
+    response = client.post("/echo", content=chunks(), headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 413
+
+
+def test_json_body_streamed_in_chunks(client):
+    body = b'{"text": "' + b"x" * 40 + b'"}'
+
+    def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    response = client.post("/echo", content=chunks(), headers={"Content-Type": "application/json"})
+
+    assert response.json() == {"text": "x" * 40}
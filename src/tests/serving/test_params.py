@@ -0,0 +1,108 @@
+import uuid
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Annotated
+
+import pytest
+from starlette.testclient import TestClient
+
+from serving.injectors import (
+    Cookie,
+    Header,
+    PathParam,
+    QueryParam,
+    compile_param_reader,
+)
+from serving.router import Router
+from serving.serv import Serv
+from serving.types import JSON
+
+app = Router()
+
+
+class Sort(Enum):
+    Newest = "newest"
+    Oldest = "oldest"
+
+
+@dataclass
+class Page:
+    offset: int = 0
+    limit: int = 20
+
+
+@app.route("/orders/{order_id}")
+async def order(
+    order_id: PathParam[uuid.UUID],
+    sort: QueryParam[Sort],
+    verbose: QueryParam[bool] = False,
+    version: Annotated[Header[int], "x-api-version"] = 1,
+    visits: Cookie[int] = 0,
+) -> JSON:
+    return {"id": str(order_id), "sort": sort.value, "verbose": verbose, "version": version, "visits": visits}
+
+
+@app.route("/orders")
+async def orders(ids: QueryParam[list[int]], page: QueryParam[Page]) -> JSON:
+    return {"ids": ids, "offset": page.offset, "limit": page.limit}
+
+
+@app.route("/numbered/{number:int}")
+async def numbered(number: PathParam[int]) -> JSON:
+    return {"number": number}
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> TestClient:
+    (tmp_path / "serving.prod.yaml").write_text(
+        """
+auth:
+  credential_provider: serving.auth:HMACCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+routers:
+  - entrypoint: tests.serving.test_params:app
+"""
+    )
+    return TestClient(Serv(working_directory=tmp_path, environment="prod").app)
+
+
+def test_params_are_converted_to_their_types(client):
+    order_id = uuid.uuid4()
+    client.cookies.set("visits", "3")
+
+    response = client.get(f"/orders/{order_id}?sort=oldest&verbose=yes", headers={"X-API-Version": "2"})
+
+    assert response.json() == {"id": str(order_id), "sort": "oldest", "verbose": True, "version": 2, "visits": 3}
+
+
+def test_missing_params_use_defaults(client):
+    assert client.get(f"/orders/{uuid.uuid4()}?sort=Newest").json()["verbose"] is False
+
+
+def test_lists_and_grouped_params(client):
+    assert client.get("/orders?ids=1&ids=2&limit=5").json() == {"ids": [1, 2], "offset": 0, "limit": 5}
+
+
+def test_path_convertor_values_pass_through(client):
+    assert client.get("/numbered/7").json() == {"number": 7}
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/orders/not-a-uuid?sort=newest",
+        f"/orders/{uuid.UUID(int=0)}?sort=sideways",
+        f"/orders/{uuid.UUID(int=0)}?sort=newest&verbose=maybe",
+        "/orders?ids=1&ids=x",
+        "/orders?offset=first",
+    ],
+)
+def test_invalid_values_get_422(client, url):
+    assert client.get(url).status_code == 422
+
+
+def test_readers_are_cached():
+    assert compile_param_reader(QueryParam[list[int]]) is compile_param_reader(QueryParam[list[int]])
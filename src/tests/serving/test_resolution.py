@@ -0,0 +1,188 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Annotated
+
+import pytest
+from bevy.registries import Registry
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+
+from serving.auth import AuthConfig
+from serving.body import BodyStream
+from serving.encoding import JSONConfig
+from serving.forms import Form
+from serving.injectors import (
+    Cookie,
+    DependencyKind,
+    Header,
+    JSONBody,
+    PathParam,
+    QueryParam,
+    SessionParam,
+    dependency_kind,
+)
+from serving.resolution import EndpointPlan
+from serving.router import RouterConfig
+from serving.session import InMemorySessionProvider, Session, SessionConfig
+
+
+@dataclass
+class Signup(Form, template="signup.html"):
+    email: str
+
+
+@pytest.mark.parametrize(
+    "dependency, kind",
+    [
+        (Cookie[str], DependencyKind.Cookie),
+        (Annotated[Header[int], "x-version"], DependencyKind.Header),
+        (PathParam[int], DependencyKind.PathParam),
+        (QueryParam[list[int]], DependencyKind.QueryParam),
+        (JSONBody[dict], DependencyKind.JSONBody),
+        (SessionParam[str], DependencyKind.SessionParam),
+        (Annotated[str, SessionParam, "user_id"], DependencyKind.SessionParam),
+        (BodyStream, DependencyKind.BodyStream),
+        (Signup, DependencyKind.Form),
+        (Session, DependencyKind.Session),
+        (AuthConfig, DependencyKind.ConfigModel),
+        (list[RouterConfig], DependencyKind.ConfigModel),
+        (Request, None),
+        (str, None),
+        (list[int], None),
+        (Annotated[str, "metadata"], None),
+    ],
+)
+def test_dependencies_are_classified_by_kind(dependency, kind):
+    assert dependency_kind(dependency) is kind
+
+
+def make_request(path_params: dict[str, str], query_string: bytes = b"") -> Request:
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": query_string}
+    return Request({**scope, "path_params": path_params})
+
+
+class NoCallContainer:
+    def call(self, *args, **kwargs):
+        raise AssertionError("The endpoint should be called directly")
+
+
+@pytest.mark.asyncio
+async def test_fully_planned_endpoints_skip_the_container():
+    def endpoint(request: Request, item_id: PathParam[int], verbose: QueryParam[bool] = False, slug=None):
+        return request, item_id, verbose, slug
+
+    plan = EndpointPlan(endpoint, None, JSONConfig())
+    request = make_request({"item_id": "7", "slug": "seven"}, b"verbose=on")
+
+    arguments = await plan.arguments(request, NoCallContainer())
+
+    assert plan.call(NoCallContainer(), arguments) == (request, 7, True, "seven")
+    assert plan.unresolved == {"slug"}
+
+
+@pytest.mark.asyncio
+async def test_unplanned_parameters_are_injected_by_the_container():
+    class Greeter:
+        greeting = "hello"
+
+    container = Registry().create_container()
+    container.add(Greeter())
+
+    def endpoint(item_id: PathParam[int], greeter: Greeter):
+        return item_id, greeter.greeting
+
+    plan = EndpointPlan(endpoint, None, JSONConfig())
+    arguments = await plan.arguments(make_request({"item_id": "1"}), container)
+
+    assert plan.call(container, arguments) == (1, "hello")
+    assert [parameter.name for parameter in plan.parameters] == ["item_id"]
+
+
+def test_form_types_are_collected():
+    def endpoint(form: Signup, body: BodyStream):
+        pass
+
+    assert EndpointPlan(endpoint, None, JSONConfig()).form_types == (Signup,)
+
+
+class SlowSession(Session):
+    loaded = None
+
+    @classmethod
+    async def load_session(cls):
+        # Only finishes once the body is being read, so it deadlocks unless both run at the same time
+        await cls.loaded.wait()
+        return cls("token", {"user_id": "u1"}, None)
+
+
+def make_body_request(body: bytes, started: asyncio.Event) -> Request:
+    async def receive():
+        started.set()
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": [], "query_string": b"", "path_params": {}}
+    return Request(scope, receive)
+
+
+@pytest.mark.asyncio
+async def test_session_loads_overlap_body_reads():
+    SlowSession.loaded = asyncio.Event()
+
+    def endpoint(session: SlowSession, data: JSONBody[dict]):
+        return session, data
+
+    container = Registry().create_container()
+    plan = EndpointPlan(endpoint, None, JSONConfig())
+    request = make_body_request(b'{"a": 1}', SlowSession.loaded)
+
+    arguments = await asyncio.wait_for(plan.arguments(request, container), 1)
+
+    assert arguments["data"] == {"a": 1}
+    assert isinstance(arguments["session"], SlowSession)
+    assert container.get(SlowSession) is arguments["session"]
+
+
+@pytest.mark.asyncio
+async def test_session_params_are_read_after_the_session_loads():
+    class UserSession(Session):
+        @classmethod
+        async def load_session(cls):
+            await asyncio.sleep(0)
+            return cls("token", {"user_id": "u1"}, None)
+
+    def endpoint(user_id: SessionParam[str], missing: SessionParam[str] = "default", session: UserSession = None):
+        return user_id, missing
+
+    container = Registry().create_container()
+    container.add(SessionConfig(session_provider=InMemorySessionProvider, session_type=UserSession))
+    plan = EndpointPlan(endpoint, None, JSONConfig())
+    phases = {parameter.name: parameter.phase.name for parameter in plan.parameters}
+    arguments = await plan.arguments(make_request({}), container)
+
+    assert phases == {"user_id": "Dependent", "missing": "Dependent", "session": "Concurrent"}
+    assert plan.call(container, arguments) == ("u1", "default")
+
+
+@pytest.mark.asyncio
+async def test_failures_cancel_the_other_parameters():
+    cancelled = asyncio.Event()
+
+    class HangingSession(Session):
+        @classmethod
+        async def load_session(cls):
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+    def endpoint(session: HangingSession, data: JSONBody[dict]):
+        pass
+
+    plan = EndpointPlan(endpoint, None, JSONConfig())
+    request = make_body_request(b"not json", asyncio.Event())
+
+    with pytest.raises(HTTPException):
+        await asyncio.wait_for(plan.arguments(request, Registry().create_container()), 1)
+
+    await asyncio.wait_for(cancelled.wait(), 1)
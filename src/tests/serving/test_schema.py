@@ -0,0 +1,251 @@
+import datetime
+import enum
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Literal, NotRequired, TypedDict
+
+import pytest
+from starlette.testclient import TestClient
+
+from serving.router import Router
+from serving.schema import (
+    ValidationError,
+    compile_converter,
+    compile_encoder,
+    compile_validator,
+    schema_for,
+    to_builtins,
+)
+from serving.serv import Serv
+from serving.types import JSON
+
+
+class Role(enum.Enum):
+    ADMIN = "admin"
+    MEMBER = "member"
+
+
+@dataclass
+class Tag:
+    name: str
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    role: Role
+    tags: list[Tag] = field(default_factory=list)
+    joined: datetime.date | None = None
+
+
+@dataclass
+class Node:
+    name: str
+    children: "list[Node]" = field(default_factory=list)
+
+
+class Order(TypedDict):
+    id: uuid.UUID
+    status: Literal["open", "closed"]
+    total: Decimal
+    note: NotRequired[str]
+
+
+app = Router()
+
+
+@app.route("/users")
+async def users() -> JSON[list[User]]:
+    return [User(1, "alice", Role.ADMIN, [Tag("staff")], datetime.date(2024, 5, 1)), User(2, "bob", Role.MEMBER)]
+
+
+@app.route("/users/raw")
+async def raw_users() -> JSON[list[User]]:
+    return [{"id": 1, "name": "alice", "role": "admin", "joined": "2024-05-01"}]
+
+
+@app.route("/invalid")
+async def invalid() -> JSON:
+    raise ValidationError([{"field": "name", "message": "Field required"}])
+
+
+class TestCompileEncoder:
+    def test_list_of_dataclasses(self):
+        encode = compile_encoder(list[User])
+
+        assert encode([User(1, "alice", Role.ADMIN, [Tag("staff")], datetime.date(2024, 5, 1))]) == [
+            {"id": 1, "name": "alice", "role": "admin", "tags": [{"name": "staff"}], "joined": "2024-05-01"}
+        ]
+
+    def test_recursive_dataclass(self):
+        tree = Node("root", [Node("leaf")])
+
+        assert compile_encoder(Node)(tree) == {"name": "root", "children": [{"name": "leaf", "children": []}]}
+
+    def test_containers_and_scalars(self):
+        key = uuid.UUID(int=1)
+        encode = compile_encoder(dict[uuid.UUID, set[Decimal]])
+
+        assert encode({key: {Decimal("1.5")}}) == {str(key): ["1.5"]}
+
+    def test_builtins_compile_to_identity(self):
+        value = {"a": [1, 2]}
+
+        assert compile_encoder(dict[str, list[int]])(value) is value
+        assert compile_encoder(JSON)(value) is value
+
+    def test_encoders_are_cached_per_type(self):
+        assert compile_encoder(list[User]) is compile_encoder(list[User])
+
+    def test_values_not_matching_the_annotation_convert_at_runtime(self):
+        encode = compile_encoder(list[User])
+
+        assert encode([{"id": 1, "role": Role.ADMIN}]) == [{"id": 1, "role": "admin"}]
+        assert encode([User(1, "alice", "admin", [{"name": "staff"}], "2024-05-01")]) == [
+            {"id": 1, "name": "alice", "role": "admin", "tags": [{"name": "staff"}], "joined": "2024-05-01"}
+        ]
+        assert compile_encoder(dict[str, Decimal])({"total": 5}) == {"total": 5}
+
+    def test_unannotated_values_convert_at_runtime(self):
+        assert to_builtins({"user": Tag("x"), Role.MEMBER: (1, 2)}) == {"user": {"name": "x"}, "member": [1, 2]}
+
+
+class TestSchema:
+    def test_fields_know_required(self):
+        assert [(f.name, f.required) for f in schema_for(User).fields] == [
+            ("id", True),
+            ("name", True),
+            ("role", True),
+            ("tags", False),
+            ("joined", False),
+        ]
+
+    def test_validate_collects_missing_fields(self):
+        with pytest.raises(ValidationError) as exc_info:
+            schema_for(User).validate({"name": "alice", "extra": 1})
+
+        assert [error["field"] for error in exc_info.value.errors] == ["id", "role"]
+
+    def test_validate_selects_declared_fields(self):
+        assert schema_for(Tag).validate({"name": "x", "extra": 1}) == {"name": "x"}
+
+
+class TestCompileValidator:
+    def test_builds_nested_dataclasses(self):
+        user = compile_validator(User)(
+            {"id": 1, "name": "alice", "role": "admin", "tags": [{"name": "staff"}], "joined": "2024-05-01"}
+        )
+
+        assert user == User(1, "alice", Role.ADMIN, [Tag("staff")], datetime.date(2024, 5, 1))
+
+    def test_reports_field_paths(self):
+        with pytest.raises(ValidationError) as exc_info:
+            compile_validator(User)({"id": True, "name": "alice", "role": "owner", "tags": [{"name": "a"}, {}]})
+
+        assert exc_info.value.errors == [
+            {"field": "id", "message": "Expected an integer"},
+            {"field": "role", "message": "Expected one of ['admin', 'member']"},
+            {"field": "tags[1].name", "message": "Field required"},
+        ]
+
+    def test_recursive_types(self):
+        tree = compile_validator(Node)({"name": "root", "children": [{"name": "leaf"}]})
+
+        assert tree == Node("root", [Node("leaf")])
+        with pytest.raises(ValidationError, match=r"children\[0\]\.children\[0\]\.name"):
+            compile_validator(Node)({"name": "a", "children": [{"name": "b", "children": [{"name": 3}]}]})
+
+    def test_typed_dicts(self):
+        order_id = uuid.uuid4()
+        validate = compile_validator(Order)
+
+        assert validate({"id": str(order_id), "status": "open", "total": "9.50"}) == {
+            "id": order_id,
+            "status": "open",
+            "total": Decimal("9.50"),
+        }
+        with pytest.raises(ValidationError) as exc_info:
+            validate({"id": "nope", "status": "lost", "note": 1})
+
+        assert [error["field"] for error in exc_info.value.errors] == ["id", "status", "total", "note"]
+
+    def test_containers_and_unions(self):
+        assert compile_validator(dict[str, list[float]])({"a": [1, 2.5]}) == {"a": [1.0, 2.5]}
+        assert compile_validator(tuple[int, str])([1, "a"]) == (1, "a")
+        assert compile_validator(set[int])([1, 1, 2]) == {1, 2}
+        assert compile_validator(int | None)(None) is None
+        with pytest.raises(ValidationError, match=r"a\[1\]: Expected a number"):
+            compile_validator(dict[str, list[float]])({"a": [1, "x"]})
+
+    def test_validators_are_cached(self):
+        assert compile_validator(User) is compile_validator(User)
+
+
+class TestCompileConverter:
+    def test_scalars(self):
+        assert compile_converter(int)("42") == 42
+        assert compile_converter(float)("2.5") == 2.5
+        assert compile_converter(bool)("off") is False
+        assert compile_converter(Decimal)("1.10") == Decimal("1.10")
+        assert compile_converter(datetime.date)("2024-02-29") == datetime.date(2024, 2, 29)
+        assert compile_converter(Literal["a", "b"])("b") == "b"
+        assert compile_converter(str | None)("") is None
+        assert compile_converter(int | str)("x") == "x"
+
+    @pytest.mark.parametrize(
+        "tp, value, message",
+        [
+            (int, "4.2", "Expected an integer"),
+            (bool, "maybe", "Expected a boolean"),
+            (datetime.date, "yesterday", "Expected an ISO 8601 value"),
+        ],
+    )
+    def test_invalid_values(self, tp, value, message):
+        with pytest.raises(ValueError, match=message):
+            compile_converter(tp)(value)
+
+    def test_converters_are_cached(self):
+        assert compile_converter(int | None) is compile_converter(int | None)
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> TestClient:
+    (tmp_path / "serving.prod.yaml").write_text(
+        """
+auth:
+  credential_provider: serving.auth:HMACCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+routers:
+  - entrypoint: tests.serving.test_schema:app
+"""
+    )
+    return TestClient(Serv(working_directory=tmp_path, environment="prod").app)
+
+
+def test_typed_json_route(client):
+    response = client.get("/users")
+
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == [
+        {"id": 1, "name": "alice", "role": "admin", "tags": [{"name": "staff"}], "joined": "2024-05-01"},
+        {"id": 2, "name": "bob", "role": "member", "tags": [], "joined": None},
+    ]
+
+
+def test_typed_json_route_accepts_builtins(client):
+    response = client.get("/users/raw")
+
+    assert response.status_code == 200
+    assert response.json() == [{"id": 1, "name": "alice", "role": "admin", "joined": "2024-05-01"}]
+
+
+def test_validation_error_renders_422(client):
+    response = client.get("/invalid")
+
+    assert response.status_code == 422
+    assert "name: Field required" in response.text
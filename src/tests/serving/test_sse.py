@@ -0,0 +1,179 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from starlette.testclient import TestClient
+
+from serving.response import set_header
+from serving.router import Router
+from serving.serv import Serv
+from serving.sse import Broadcaster, ServerSentEvent, encode_event_stream
+from serving.types import SSE
+
+app = Router()
+
+
+@app.route("/events")
+async def events(broadcaster: Broadcaster) -> SSE:
+    set_header("X-Stream", "events")
+    yield ServerSentEvent(data="hello", event="greeting", id="1")
+    yield {"count": broadcaster.subscriber_count("dash")}
+    yield "line one\nline two"
+
+
+async def take(iterator, count):
+    return [await anext(iterator) for _ in range(count)]
+
+
+class TestServerSentEvent:
+    def test_encode_all_fields(self):
+        event = ServerSentEvent(data="a\nb", event="update", id="7", retry=1000)
+        assert event.encode() == b"event: update\nid: 7\nretry: 1000\ndata: a\ndata: b\n\n"
+
+    def test_only_sse_line_breaks_split_data(self):
+        event = ServerSentEvent(data="a\r\nb\rc\x1cd\u2028e\n")
+        assert event.encode() == "data: a\ndata: b\ndata: c\x1cd\u2028e\ndata: \n\n".encode()
+
+    @pytest.mark.parametrize("field", ["event", "id"])
+    def test_line_breaks_in_fields_are_rejected(self, field):
+        with pytest.raises(ValueError, match="line breaks"):
+            ServerSentEvent(data="x", **{field: "update\ndata: injected"})
+
+    def test_from_value(self):
+        assert ServerSentEvent.from_value("hi").data == "hi"
+        assert ServerSentEvent.from_value({"a": [1, 2]}).data == '{"a":[1,2]}'
+
+
+class TestBroadcaster:
+    async def test_publish_fans_out_to_all_subscribers(self):
+        broadcaster = Broadcaster()
+        first = broadcaster.subscribe("dash")
+        second = broadcaster.subscribe("dash")
+        pending = [asyncio.ensure_future(take(first, 2)), asyncio.ensure_future(take(second, 2))]
+        await asyncio.sleep(0)
+
+        broadcaster.publish("dash", "one")
+        broadcaster.publish("dash", {"n": 2}, event="count")
+
+        for received in await asyncio.gather(*pending):
+            assert [(e.id, e.event, e.data) for e in received] == [("1", None, "one"), ("2", "count", '{"n":2}')]
+        await first.aclose()
+        await second.aclose()
+        assert broadcaster.subscriber_count("dash") == 0
+
+    async def test_last_event_id_replays_from_ring_buffer(self):
+        broadcaster = Broadcaster(replay_size=3)
+        for n in range(5):
+            broadcaster.publish("dash", str(n))
+
+        subscription = broadcaster.subscribe("dash", last_event_id="3")
+        assert [e.data for e in await take(subscription, 2)] == ["3", "4"]
+
+        subscription = broadcaster.subscribe("dash", last_event_id="0")
+        assert [e.id for e in await take(subscription, 3)] == ["3", "4", "5"]
+
+    async def test_slow_consumer_drops_oldest(self):
+        broadcaster = Broadcaster(queue_size=2)
+        subscription = broadcaster.subscribe("dash")
+        waiter = asyncio.ensure_future(anext(subscription))
+        await asyncio.sleep(0)
+        broadcaster.publish("dash", "0")
+        assert (await waiter).data == "0"
+
+        for n in range(1, 5):
+            broadcaster.publish("dash", str(n))
+
+        assert [e.data for e in await take(subscription, 2)] == ["3", "4"]
+
+    async def test_slow_consumer_disconnect_policy_ends_stream(self):
+        broadcaster = Broadcaster(queue_size=1, slow_consumer="disconnect")
+        subscription = broadcaster.subscribe("dash")
+        waiter = asyncio.ensure_future(anext(subscription))
+        await asyncio.sleep(0)
+        broadcaster.publish("dash", "0")
+        await waiter
+
+        broadcaster.publish("dash", "1")
+        broadcaster.publish("dash", "2")
+
+        with pytest.raises(StopAsyncIteration):
+            await anext(subscription)
+        assert broadcaster.subscriber_count("dash") == 0
+
+    async def test_producer_is_shared_and_cancelled_with_last_subscriber(self):
+        broadcaster = Broadcaster()
+        started, cancelled = [], []
+
+        async def producer():
+            started.append(1)
+            try:
+                for n in range(3):
+                    yield n
+                await asyncio.Event().wait()
+            finally:
+                cancelled.append(1)
+
+        broadcaster.set_producer("ticks", producer)
+        first = broadcaster.subscribe("ticks")
+        second = broadcaster.subscribe("ticks")
+        received = await asyncio.gather(take(first, 3), take(second, 3))
+
+        assert [[e.data for e in r] for r in received] == [["0", "1", "2"]] * 2
+        assert started == [1]
+
+        await first.aclose()
+        assert cancelled == []
+        await second.aclose()
+        await asyncio.sleep(0)
+        assert cancelled == [1]
+
+
+async def test_encode_event_stream_sends_heartbeats_while_idle():
+    release = asyncio.Event()
+    closed = []
+
+    async def events():
+        try:
+            await release.wait()
+            yield "done"
+        finally:
+            closed.append(1)
+
+    stream = encode_event_stream(events(), heartbeat_interval=0.01)
+    assert await anext(stream) == b": connected\n\n"
+    assert await anext(stream) == b": ping\n\n"
+    release.set()
+    chunk = await anext(stream)
+    while chunk == b": ping\n\n":
+        chunk = await anext(stream)
+    assert chunk == b"data: done\n\n"
+
+    await stream.aclose()
+    assert closed == [1]
+
+
+def test_sse_route(tmp_path: Path):
+    (tmp_path / "serving.prod.yaml").write_text(
+        """
+auth:
+  credential_provider: serving.auth:HMACCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+routers:
+  - entrypoint: tests.serving.test_sse:app
+"""
+    )
+    client = TestClient(Serv(working_directory=tmp_path, environment="prod").app)
+
+    response = client.get("/events")
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["x-stream"] == "events"
+    assert response.text == (
+        ": connected\n\n"
+        "event: greeting\nid: 1\ndata: hello\n\n"
+        'data: {"count":0}\n\n'
+        "data: line one\ndata: line two\n\n"
+    )
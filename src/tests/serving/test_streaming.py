@@ -0,0 +1,308 @@
+import array
+import json
+import threading
+from pathlib import Path
+
+import pytest
+from starlette.testclient import TestClient
+
+from serving import streaming
+from serving.encoding import (
+    JSONEncoder,
+    encode_json,
+    encode_json_stream,
+    exceeds_size,
+    load_encoder,
+    wants_json_array,
+)
+from serving.injectors import QueryParam
+from serving.response import set_header, set_status_code
+from serving.router import Router
+from serving.serv import Serv
+from serving.streaming import start_streaming_response
+from serving.types import Bytes, File, JSONStream, Stream
+
+app = Router()
+closed = []
+
+
+@app.route("/export")
+async def export() -> Stream[bytes]:
+    set_header("Content-Disposition", 'attachment; filename="export.csv"')
+    set_status_code(201)
+    try:
+        for n in range(3):
+            yield f"{n},{n * n}\n".encode()
+    finally:
+        closed.append("export")
+
+
+@app.route("/text")
+async def text() -> Stream[str]:
+    yield "hello "
+    yield "world"
+
+
+@app.route("/empty")
+async def empty() -> Stream[bytes]:
+    return
+    yield
+
+
+@app.route("/fails")
+async def fails() -> Stream[bytes]:
+    raise RuntimeError("boom")
+    yield
+
+
+@app.route("/records")
+async def records() -> JSONStream:
+    for n in range(3):
+        yield {"id": n, "name": f"item-{n}"}
+
+
+@app.route("/no-records")
+async def no_records() -> JSONStream:
+    async def empty():
+        return
+        yield
+
+    return empty()
+
+
+PIXELS = bytearray(b"\x89PNG" + bytes(range(256)) * 4)
+opened = []
+
+
+@app.route("/image")
+async def image() -> Bytes:
+    return PIXELS, "image/png"
+
+
+@app.route("/raw")
+async def raw() -> Bytes:
+    return memoryview(PIXELS)[4:8]
+
+
+@app.route("/words")
+async def words() -> Bytes:
+    return memoryview(array.array("H", [1, 2, 3]))
+
+
+@app.route("/report")
+async def report(path: QueryParam[str]) -> File:
+    return Path(path), "text/csv"
+
+
+@app.route("/handle")
+async def handle(path: QueryParam[str]) -> File:
+    file = open(path, "rb")
+    file.read(2)
+    opened.append(file)
+    return file
+
+
+@pytest.fixture
+def client(tmp_path: Path) -> TestClient:
+    (tmp_path / "serving.prod.yaml").write_text(
+        """
+auth:
+  credential_provider: serving.auth:HMACCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+routers:
+  - entrypoint: tests.serving.test_streaming:app
+"""
+    )
+    return TestClient(Serv(working_directory=tmp_path, environment="prod").app)
+
+
+def test_bytes_stream_applies_headers_set_before_first_chunk(client):
+    closed.clear()
+
+    response = client.get("/export")
+
+    assert response.status_code == 201
+    assert response.content == b"0,0\n1,1\n2,4\n"
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["content-disposition"] == 'attachment; filename="export.csv"'
+    assert closed == ["export"]
+
+
+def test_str_stream_is_plain_text(client):
+    response = client.get("/text")
+
+    assert response.text == "hello world"
+    assert response.headers["content-type"].startswith("text/plain")
+
+
+def test_empty_stream(client):
+    response = client.get("/empty")
+
+    assert response.status_code == 200
+    assert response.content == b""
+
+
+def test_error_before_first_chunk_renders_error_page(client):
+    response = client.get("/fails")
+
+    assert response.status_code == 500
+    assert "Internal Server Error" in response.text
+
+
+async def test_start_streaming_response_closes_iterator_when_abandoned():
+    events = []
+
+    async def chunks():
+        try:
+            yield b"a"
+            yield b"b"
+        finally:
+            events.append("closed")
+
+    response = await start_streaming_response(chunks(), "application/octet-stream")
+    body = response.body_iterator
+    assert await anext(body) == b"a"
+    await body.aclose()
+
+    assert events == ["closed"]
+
+
+def test_json_stream_defaults_to_ndjson(client):
+    response = client.get("/records")
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["vary"] == "Accept"
+    assert response.text == (
+        '{"id":0,"name":"item-0"}\n{"id":1,"name":"item-1"}\n{"id":2,"name":"item-2"}\n'
+    )
+
+
+def test_json_stream_as_array_when_json_is_accepted(client):
+    response = client.get("/records", headers={"Accept": "application/json"})
+
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == [{"id": n, "name": f"item-{n}"} for n in range(3)]
+
+
+def test_json_stream_from_returned_iterator(client):
+    assert client.get("/no-records", headers={"Accept": "application/json"}).json() == []
+    assert client.get("/no-records").content == b""
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, False),
+        ("*/*", False),
+        ("application/json", True),
+        ("application/json, application/x-ndjson", False),
+        ("text/html;q=0.9, application/json;q=0.8", True),
+    ],
+)
+def test_wants_json_array(accept, expected):
+    assert wants_json_array(accept) is expected
+
+
+@pytest.mark.parametrize("as_array", [False, True])
+async def test_encode_json_stream_batches(as_array):
+    async def records():
+        for n in range(5):
+            yield n
+
+    chunks = [chunk async for chunk in encode_json_stream(records(), as_array=as_array, batch_size=2)]
+
+    if as_array:
+        assert chunks == [b"[0,1", b",2,3", b",4]"]
+    else:
+        assert chunks == [b"0\n1\n", b"2\n3\n", b"4\n"]
+
+
+async def test_encode_json_stream_array_ending_on_batch_boundary():
+    async def records():
+        for n in range(4):
+            yield n
+
+    chunks = [chunk async for chunk in encode_json_stream(records(), as_array=True, batch_size=2)]
+
+    assert b"".join(chunks) == b"[0,1,2,3]"
+
+
+def upper_encoder(value):
+    return json.dumps(value).upper()
+
+
+class TestJSONEncoder:
+    def test_load_builtin_encoder(self):
+        assert load_encoder("json") is encode_json
+        assert encode_json({"a": [1, "é"]}) == '{"a":[1,"é"]}'.encode()
+
+    def test_load_import_path_accepts_str_results(self):
+        encode = load_encoder("tests.serving.test_streaming:upper_encoder")
+        assert encode({"a": "b"}) == b'{"A": "B"}'
+
+    def test_missing_encoder_falls_back_to_stdlib(self, caplog):
+        assert load_encoder("not_a_real_module:dumps") is encode_json
+        assert "falling back" in caplog.text
+
+    @pytest.mark.parametrize(
+        "value, budget, expected",
+        [
+            ({"a": 1}, 10, False),
+            (list(range(100)), 50, True),
+            ([[1, 2], [3, 4]], 7, False),
+            ([[1, 2], [3, 4]], 6, True),
+            ("x" * 6400, 50, True),
+        ],
+    )
+    def test_exceeds_size(self, value, budget, expected):
+        assert exceeds_size(value, budget) is expected
+
+    async def test_large_payloads_encode_off_loop(self):
+        threads = []
+
+        def encode(value):
+            threads.append(threading.get_ident())
+            return encode_json(value)
+
+        encoder = JSONEncoder(encode, offload_threshold=10)
+        assert await encoder.encode_async([1, 2]) == b"[1,2]"
+        assert await encoder.encode_async(list(range(20))) == encode_json(list(range(20)))
+        assert threads[0] == threading.get_ident()
+        assert threads[1] != threading.get_ident()
+
+
+def test_bytes_routes_pass_buffers_through(client):
+    response = client.get("/image")
+    assert response.headers["content-type"] == "image/png"
+    assert response.content == bytes(PIXELS)
+
+    response = client.get("/raw")
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.content == bytes(range(4))
+
+    response = client.get("/words")
+    assert response.headers["content-length"] == "6"
+    assert response.content == array.array("H", [1, 2, 3]).tobytes()
+
+
+def test_file_route_sends_path(client, tmp_path):
+    (tmp_path / "report.csv").write_text("a,b\n1,2\n")
+
+    response = client.get("/report", params={"path": str(tmp_path / "report.csv")})
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text == "a,b\n1,2\n"
+
+
+def test_file_route_streams_and_closes_handle(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(streaming, "FILE_CHUNK_SIZE", 3)
+    (tmp_path / "data.bin").write_bytes(b"0123456789")
+    opened.clear()
+
+    response = client.get("/handle", params={"path": str(tmp_path / "data.bin")})
+
+    assert response.content == b"23456789"
+    assert response.headers["content-length"] == "8"
+    assert opened[0].closed
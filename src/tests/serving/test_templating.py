@@ -0,0 +1,368 @@
+import tempfile
+import traceback
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from jinja2 import DictLoader, Environment, TemplateSyntaxError
+from starlette.testclient import TestClient
+
+from serving.router import Router
+from serving.serv import Serv
+from serving.templating import (
+    FragmentCache,
+    create_templates,
+    install_fragment_cache,
+    minify_html,
+    stream_template,
+)
+from serving.types import Jinja2, Jinja2Stream, JinjaBlock
+
+app = Router()
+
+
+@app.route("/page")
+async def page() -> Jinja2:
+    return "page.html", {"items": ["a", "b"]}
+
+
+@app.route("/plain")
+async def plain() -> Jinja2:
+    return "plain.html", {}
+
+
+@app.route("/stream")
+async def stream() -> Jinja2Stream:
+    return "page.html", {"items": range(3)}
+
+
+@app.route("/broken-stream")
+async def broken_stream() -> Jinja2Stream:
+    return "broken.html", {}
+
+
+@app.route("/block")
+async def block() -> JinjaBlock:
+    return "page.html", "content", {"items": ["c"]}
+
+
+def make_serv(tmp_path: Path, templates_yaml: str = "") -> Serv:
+    templates_dir = tmp_path / "templates"
+    templates_dir.mkdir()
+    (templates_dir / "base.html").write_text("<html><nav>menu</nav>{% block content %}{% endblock %}</html>")
+    (templates_dir / "page.html").write_text(
+        '{% extends "base.html" %}{% block content %}<ul>{% for i in items %}<li>{{ i }}</li>{% endfor %}</ul>'
+        "{% endblock %}"
+    )
+    (templates_dir / "plain.html").write_text("<p>no blocks</p>")
+    (templates_dir / "broken.html").write_text("<h1>hi</h1>{{ 1 / 0 }}")
+    (tmp_path / "serving.prod.yaml").write_text(
+        f"""
+auth:
+  credential_provider: serving.auth:HMACCredentialProvider
+  config:
+    csrf_secret: test-secret
+
+templates:
+  directory: {templates_dir}
+{templates_yaml}
+
+routers:
+  - entrypoint: tests.serving.test_templating:app
+"""
+    )
+    return Serv(working_directory=tmp_path, environment="prod")
+
+
+def make_env(templates: dict[str, str], cache: FragmentCache | None = None) -> Environment:
+    env = Environment(loader=DictLoader(templates), autoescape=True)
+    install_fragment_cache(env, FragmentCache() if cache is None else cache)
+    return env
+
+
+class TestFragmentCache:
+    def test_cache_tag_reuses_rendered_fragment(self):
+        calls = []
+        env = make_env({"page.html": '{% cache "nav" %}{{ load() }}{% endcache %}|{{ user }}'})
+
+        def load():
+            calls.append(1)
+            return f"nav-{len(calls)}"
+
+        template = env.get_template("page.html")
+        assert template.render(load=load, user="alice") == "nav-1|alice"
+        assert template.render(load=load, user="bob") == "nav-1|bob"
+        assert len(calls) == 1
+
+    def test_vary_values_are_part_of_key(self):
+        env = make_env({"page.html": '{% cache "menu", vary=[lang] %}{{ lang }}{% endcache %}'})
+        template = env.get_template("page.html")
+
+        assert template.render(lang="en") == "en"
+        assert template.render(lang="fr") == "fr"
+        assert len(env.fragment_cache) == 2
+
+    def test_ttl_expires_entries(self):
+        counter = iter(range(10))
+        env = make_env({"page.html": '{% cache "c", ttl=60 %}{{ next() }}{% endcache %}'})
+        template = env.get_template("page.html")
+
+        with patch("serving.templating.time.monotonic", return_value=100.0):
+            assert template.render(next=lambda: next(counter)) == "0"
+            assert template.render(next=lambda: next(counter)) == "0"
+
+        with patch("serving.templating.time.monotonic", return_value=200.0):
+            assert template.render(next=lambda: next(counter)) == "1"
+
+    def test_invalidate_tags_and_names(self):
+        counter = iter(range(10))
+        env = make_env({
+            "page.html": '{% cache "a", tags=["menus"] %}{{ next() }}{% endcache %}'
+                         '{% cache "b" %}{{ next() }}{% endcache %}',
+        })
+        template = env.get_template("page.html")
+
+        def render():
+            return template.render(next=lambda: next(counter))
+
+        assert render() == "01"
+        env.fragment_cache.invalidate_tags("menus")
+        assert render() == "21"
+        env.fragment_cache.invalidate("b")
+        assert render() == "23"
+
+    def test_lru_is_bounded(self):
+        env = make_env(
+            {"page.html": '{% cache "item", vary=[n] %}{{ n }}{% endcache %}'},
+            FragmentCache(max_size=2),
+        )
+        template = env.get_template("page.html")
+        for n in range(5):
+            template.render(n=n)
+
+        assert len(env.fragment_cache) == 2
+
+    def test_disabled_cache_bypasses(self):
+        counter = iter(range(10))
+        env = make_env(
+            {"page.html": '{% cache "c" %}{{ next() }}{% endcache %}'},
+            FragmentCache(enabled=False),
+        )
+        template = env.get_template("page.html")
+
+        assert template.render(next=lambda: next(counter)) == "0"
+        assert template.render(next=lambda: next(counter)) == "1"
+        assert len(env.fragment_cache) == 0
+
+    def test_cached_fragment_keeps_autoescaping(self):
+        env = make_env({"page.html": '{% cache "c" %}<b>{{ value }}</b>{% endcache %}'})
+        assert env.get_template("page.html").render(value="<i>") == "<b>&lt;i&gt;</b>"
+
+    def test_unknown_option_is_syntax_error(self):
+        env = make_env({"page.html": '{% cache "c", ttls=1 %}{% endcache %}'})
+        with pytest.raises(TemplateSyntaxError, match="Unknown cache option"):
+            env.get_template("page.html")
+
+
+class TestServFragmentCache:
+    @pytest.fixture(autouse=True)
+    def disable_auth(self):
+        with patch("serving.serv.Serv._configure_auth", MagicMock()):
+            yield
+
+    @pytest.mark.parametrize(
+        "environment, expected",
+        [("dev", False), ("prod", True)],
+    )
+    def test_fragment_cache_defaults_by_environment(self, environment, expected):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            (Path(tmpdir) / f"serving.{environment}.yaml").write_text("templates:\n  fragment_cache_size: 8\n")
+            serv = Serv(working_directory=tmpdir, environment=environment)
+
+            assert serv.fragment_cache.enabled is expected
+            assert serv.fragment_cache.max_size == 8
+            assert serv.templates.env.fragment_cache is serv.fragment_cache
+            assert serv.container.get(FragmentCache) is serv.fragment_cache
+
+
+class TestBlockRendering:
+    def test_jinja_block_return_type_renders_only_block(self, tmp_path):
+        client = TestClient(make_serv(tmp_path).app)
+
+        response = client.get("/block")
+
+        assert response.status_code == 200
+        assert response.text == "<ul><li>c</li></ul>"
+        assert response.headers["content-type"].startswith("text/html")
+
+    def test_full_page_without_partial_header_config(self, tmp_path):
+        client = TestClient(make_serv(tmp_path).app)
+
+        response = client.get("/page", headers={"HX-Request": "true"})
+
+        assert response.text == "<html><nav>menu</nav><ul><li>a</li><li>b</li></ul></html>"
+        assert "vary" not in response.headers
+
+    def test_partial_header_renders_configured_block(self, tmp_path):
+        client = TestClient(make_serv(tmp_path, "  partial_header: HX-Request").app)
+
+        partial = client.get("/page", headers={"HX-Request": "true"})
+        full = client.get("/page")
+
+        assert partial.text == "<ul><li>a</li><li>b</li></ul>"
+        assert full.text == "<html><nav>menu</nav><ul><li>a</li><li>b</li></ul></html>"
+        assert partial.headers["vary"] == full.headers["vary"] == "HX-Request"
+
+    def test_partial_header_falls_back_to_full_render_without_block(self, tmp_path):
+        client = TestClient(make_serv(tmp_path, "  partial_header: HX-Request").app)
+
+        response = client.get("/plain", headers={"HX-Request": "true"})
+
+        assert response.text == "<p>no blocks</p>"
+
+
+class TestProductionTemplates:
+    @pytest.fixture(autouse=True)
+    def disable_auth(self):
+        with patch("serving.serv.Serv._configure_auth", MagicMock()):
+            yield
+
+    def write_config(self, tmp_path: Path, environment: str, extra: str = "") -> Path:
+        templates_dir = tmp_path / "templates"
+        templates_dir.mkdir(exist_ok=True)
+        (templates_dir / "index.html").write_text("{{ 1 + 1 }}")
+        (tmp_path / f"serving.{environment}.yaml").write_text(
+            f"templates:\n  directory: {templates_dir}\n{extra}"
+        )
+        return templates_dir
+
+    def test_prod_defaults_disable_auto_reload_and_preload(self, tmp_path):
+        self.write_config(tmp_path, "prod")
+        serv = Serv(working_directory=tmp_path, environment="prod")
+
+        assert serv.templates.env.auto_reload is False
+        assert "index.html" in [template.name for template in serv.templates.env.cache.values()]
+
+    def test_preload_skips_files_that_are_not_templates(self, tmp_path):
+        templates_dir = self.write_config(tmp_path, "prod")
+        (templates_dir / "row.mustache").write_text("{{#rows}}{{/rows}}")
+        (templates_dir / "app.js").write_text("const t = `{{ value }`;")
+        (templates_dir / "email.txt.j2").write_text("Hi {{ name }}")
+
+        serv = Serv(working_directory=tmp_path, environment="prod")
+
+        loaded = {template.name for template in serv.templates.env.cache.values()}
+        assert loaded == {"index.html", "email.txt.j2"}
+
+    def test_dev_defaults_keep_auto_reload_and_lazy_loading(self, tmp_path):
+        self.write_config(tmp_path, "dev")
+        serv = Serv(working_directory=tmp_path, environment="dev")
+
+        assert serv.templates.env.auto_reload is True
+        assert len(serv.templates.env.cache) == 0
+
+    def test_preload_fails_fast_on_syntax_errors(self, tmp_path):
+        templates_dir = self.write_config(tmp_path, "prod")
+        (templates_dir / "broken.html").write_text("{% if %}")
+
+        with pytest.raises(TemplateSyntaxError):
+            Serv(working_directory=tmp_path, environment="prod")
+
+    def test_bytecode_cache_and_cache_size(self, tmp_path):
+        bytecode_dir = tmp_path / "bytecode"
+        self.write_config(
+            tmp_path, "prod", f"  bytecode_cache: {bytecode_dir}\n  cache_size: 50\n"
+        )
+        serv = Serv(working_directory=tmp_path, environment="prod")
+
+        assert serv.templates.env.cache.capacity == 50
+        assert any(bytecode_dir.iterdir())
+
+
+class TestStreamingTemplates:
+    async def test_stream_template_flushes_buffered_chunks(self, tmp_path):
+        (tmp_path / "rows.html").write_text("{% for i in items %}<li>{{ i }}</li>{% endfor %}")
+        templates = create_templates(tmp_path)
+        request = MagicMock()
+
+        chunks = [
+            chunk
+            async for chunk in stream_template(templates, request, "rows.html", {"items": range(4)}, flush_size=18)
+        ]
+
+        assert "".join(chunks) == "<li>0</li><li>1</li><li>2</li><li>3</li>"
+        assert chunks == ["<li>0</li><li>1</li>", "<li>2</li><li>3</li>"]
+
+    def test_jinja2_stream_route(self, tmp_path):
+        client = TestClient(make_serv(tmp_path, "  stream_flush_size: 4").app)
+
+        response = client.get("/stream")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/html")
+        assert "content-length" not in response.headers
+        assert response.text == "<html><nav>menu</nav><ul><li>0</li><li>1</li><li>2</li></ul></html>"
+
+    def test_jinja2_stream_error_before_first_flush_renders_error_page(self, tmp_path):
+        client = TestClient(make_serv(tmp_path).app, raise_server_exceptions=False)
+
+        response = client.get("/broken-stream")
+
+        assert response.status_code == 500
+        assert "<h1>hi</h1>" not in response.text
+
+
+class TestMinify:
+    def test_collapses_whitespace_and_strips_comments(self):
+        source = "<div>\n    <!-- note -->\n    <p>Hello   {{ name }}</p>  <span> x </span>\n</div>"
+
+        assert minify_html(source) == "<div>\n\n<p>Hello {{ name }}</p> <span> x </span>\n</div>"
+
+    def test_collapses_whitespace_between_attributes_only(self):
+        source = '<div   title="a   b"\n   class="{% if x %}  y  {% endif %}"  data-v=\'{{ "c  d" }}\'>  z</div>'
+
+        assert minify_html(source) == '<div title="a   b"\nclass="{% if x %}  y  {% endif %}" data-v=\'{{ "c  d" }}\'> z</div>'
+
+    def test_keeps_line_numbers(self, tmp_path):
+        source = "<ul>\n\n  <!-- one\n  two -->\n  <li>\n    {{ items }}\n  </li>\n</ul>"
+
+        assert minify_html(source).count("\n") == source.count("\n")
+
+        (tmp_path / "page.html").write_text("<div>\n\n\n  <p>\n\n {{ 1 / 0 }}</p>\n</div>")
+        templates = create_templates(tmp_path, minify=True)
+        with pytest.raises(ZeroDivisionError) as exc_info:
+            templates.get_template("page.html").render()
+
+        frames = traceback.extract_tb(exc_info.value.__traceback__)
+        assert [frame.lineno for frame in frames if frame.filename.endswith("page.html")] == [6]
+
+    @pytest.mark.parametrize(
+        "source",
+        [
+            "<pre>\n  a   b\n</pre>",
+            "<textarea name='t'>  keep\n\n  this</textarea>",
+            "<script>\n  if (a  <  b) {}\n</script>",
+            "<style>\n  p  { color: red }\n</style>",
+            "{% raw %}  {{ x }}   {% endraw %}",
+            "{{ '   spaced   ' }}",
+            "<!--[if IE]>  <p>old</p>  <![endif]-->",
+            "<!-- {% block extra %}{% endblock %} -->",
+        ],
+    )
+    def test_preserves_content(self, source):
+        assert minify_html(source) == source
+
+    def test_applies_to_html_templates_at_compile_time(self, tmp_path):
+        (tmp_path / "page.html").write_text("<p>\n  {{ text }}\n</p>")
+        (tmp_path / "email.txt").write_text("Hi\n\n  {{ text }}")
+        templates = create_templates(tmp_path, minify=True)
+
+        assert templates.get_template("page.html").render(text="a   b") == "<p>\na   b\n</p>"
+        assert templates.get_template("email.txt").render(text="x") == "Hi\n\n  x"
+
+    def test_serv_minify_setting(self, tmp_path):
+        assert "serving.templating.HTMLMinifyExtension" not in make_serv(tmp_path).templates.env.extensions
+
+        (tmp_path / "minified").mkdir()
+        serv = make_serv(tmp_path / "minified", "  minify: true")
+        assert "serving.templating.HTMLMinifyExtension" in serv.templates.env.extensions
@@ -1,3 +1,4 @@
+import gzip
 import tempfile
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -7,6 +8,7 @@ import pytest
 from serving.config import Config
 from serving.error_handler import ErrorHandler
 from serving.serv import Serv, ThemingConfig
+from serving.templating import create_templates
 
 
 class TestThemingConfig:
@@ -87,6 +89,90 @@ class TestErrorHandler:
         assert response.status_code == 404
 
 
+class TestErrorPageCache:
+    def make_request(self, accept_encoding: str = "", base_url: str = "http://testserver/"):
+        request = MagicMock()
+        request.base_url = base_url
+        request.headers = {"accept-encoding": accept_encoding}
+        return request
+
+    def test_pages_without_details_are_rendered_once(self):
+        handler = ErrorHandler(cache_size=8)
+
+        with patch.object(handler, "_render_body", wraps=handler._render_body) as render:
+            first = handler.render_error(self.make_request(), 404)
+            second = handler.render_error(self.make_request(), 404)
+            handler.render_error(self.make_request(), 500)
+
+        assert render.call_count == 2
+        assert first.body == second.body
+        assert first.status_code == 404
+        assert first.headers["vary"] == "Accept-Encoding"
+        assert b"Not Found" in first.body
+
+    def test_gzip_variant(self):
+        handler = ErrorHandler(cache_size=8)
+
+        plain = handler.render_error(self.make_request(), 404)
+        compressed = handler.render_error(self.make_request("br, gzip;q=0.5"), 404)
+        refused = handler.render_error(self.make_request("gzip;q=0"), 404)
+
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(compressed.body) == plain.body
+        assert "content-encoding" not in refused.headers
+
+    def test_details_and_hosts_are_not_shared(self):
+        handler = ErrorHandler(cache_size=8)
+
+        with patch.object(handler, "_render_body", wraps=handler._render_body) as render:
+            handler.render_error(self.make_request(), 404)
+            handler.render_error(self.make_request(base_url="http://other/"), 404)
+            response = handler.render_error(self.make_request(), 404, details="Missing /x")
+
+        assert render.call_count == 2
+        assert b"Missing /x" in response.body
+
+    def test_cache_is_bounded(self):
+        handler = ErrorHandler(cache_size=2)
+
+        for code in (400, 404, 500):
+            handler.render_error(self.make_request(), code)
+
+        assert [key[0] for key in handler._pages] == [404, 500]
+
+    def test_custom_templates_are_not_cached_by_default(self, tmp_path):
+        (tmp_path / "error.html").write_text("{{ error_code }} at {{ request.url.path }}")
+        theming = ThemingConfig(default_error_template="error.html")
+        handler = ErrorHandler(theming_config=theming, templates=create_templates(tmp_path), cache_size=8)
+        requests = [self.make_request(), self.make_request()]
+        requests[0].url.path, requests[1].url.path = "/private/alice", "/private/bob"
+
+        bodies = [bytes(handler.render_error(request, 404).body) for request in requests]
+
+        assert bodies == [b"404 at /private/alice", b"404 at /private/bob"]
+        assert not handler._pages
+
+    def test_themes_can_opt_in_to_caching(self, tmp_path):
+        (tmp_path / "error.html").write_text("{{ error_code }}")
+        theming = ThemingConfig(default_error_template="error.html", cache_custom_error_pages=True)
+        handler = ErrorHandler(theming_config=theming, templates=create_templates(tmp_path), cache_size=8)
+
+        with patch.object(handler, "_render_body", wraps=handler._render_body) as render:
+            handler.render_error(self.make_request(), 404)
+            response = handler.render_error(self.make_request(), 404)
+
+        assert render.call_count == 1
+        assert response.body == b"404"
+
+    @pytest.mark.parametrize("environment, size", [("prod", 128), ("dev", 0)])
+    def test_serv_enables_cache_outside_dev(self, tmp_path, environment, size):
+        (tmp_path / f"serving.{environment}.yaml").write_text("environment: test\n")
+        with patch("serving.serv.Serv._configure_auth", MagicMock()):
+            serv = Serv(working_directory=tmp_path, environment=environment)
+
+        assert serv.error_handler.cache_size == size
+
+
 class TestServWithTheming:
     @pytest.fixture(autouse=True)
     def disable_auth(self):